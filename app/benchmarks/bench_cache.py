@@ -0,0 +1,62 @@
+"""Microbenchmark for CacheService get/put/evict cost as the cache grows.
+
+Fills a cache to N entries, then times a steady-state mix of hits, misses
+and evicting puts.  Per-operation cost should stay flat from 1k to 1M.
+
+Usage (from ``app/``)::
+
+    python benchmarks/bench_cache.py
+    python benchmarks/bench_cache.py --sizes 1000 10000 --ops 50000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_service import CacheService  # noqa: E402
+
+PAYLOAD = "x" * 256
+
+
+def _time_per_op(fn, ops: int) -> float:
+    start = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def bench(size: int, ops: int) -> dict:
+    cache = CacheService(max_items=size, max_size_mb=1e9)
+    for i in range(size):
+        cache.put(f"k{i}", PAYLOAD, "application/json")
+
+    step = max(1, size // ops)
+    return {
+        "size": size,
+        "get_hit_us": _time_per_op(lambda i: cache.get(f"k{(i * step) % size}"), ops),
+        "get_miss_us": _time_per_op(lambda i: cache.get(f"missing{i}"), ops),
+        "put_evict_us": _time_per_op(lambda i: cache.put(f"n{i}", PAYLOAD, "application/json"), ops),
+        "size_mb": round(cache.size_mb, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--ops", type=int, default=100_000)
+    args = parser.parse_args()
+
+    logging.getLogger("cache_service").setLevel(logging.WARNING)
+
+    print(f"{'entries':>10} {'get hit':>10} {'get miss':>10} {'put+evict':>10}  (us/op)")
+    for size in args.sizes:
+        r = bench(size, args.ops)
+        print(f"{r['size']:>10} {r['get_hit_us']:>10.3f} {r['get_miss_us']:>10.3f} {r['put_evict_us']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Replay a request trace through each cache eviction policy and compare them.
+
+The trace is either recorded from a running server (start it with
+``CACHE_TRACE_PATH=/path/trace.jsonl``; every cache lookup and store is
+logged with the entry's size, compute cost and TTL) or synthetic: Zipf
+distributed keys over a mix of chart types with typical sizes and compute
+costs, plus a share of short-lived "current sky" transit charts.
+
+Each lookup is replayed against a :class:`cache_backends.MemoryBackend`
+with the given limits, on the trace's own clock, so TTLs expire as they
+did.  The report gives, per policy with and without TTLs honoured, the hit
+ratio, the byte hit ratio and the compute time hits saved (the sum of the
+recorded cost of every hit) against the time spent recomputing misses.
+
+Usage (from ``app/``)::
+
+    python benchmarks/bench_eviction.py --cache-mb 5
+    python benchmarks/bench_eviction.py --trace /tmp/trace.jsonl --cache-mb 50 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_backends import POLICIES, MemoryBackend  # noqa: E402
+
+# (chart type, share of requests, typical stored bytes, typical compute seconds)
+SYNTHETIC_MIX = [
+    ("birth_json", 0.40, 4_000, 0.02),
+    ("birth_svg", 0.20, 40_000, 0.08),
+    ("synastry_svg", 0.10, 60_000, 0.15),
+    ("solar_return_json", 0.12, 6_000, 0.60),
+    ("lunar_return_json", 0.08, 6_000, 0.30),
+    ("current_sky_json", 0.10, 8_000, 0.05),
+]
+CURRENT_SKY_TTL = 3600.0
+
+
+def synthetic_trace(requests: int, keys: int, zipf: float, rate: float, seed: int) -> list[tuple]:
+    """``(time, key, size, cost, ttl)`` per request."""
+    rng = random.Random(seed)
+    cum_weights = list(accumulate(1 / (rank + 1) ** zipf for rank in range(keys)))
+    shares = list(accumulate(share for _, share, _, _ in SYNTHETIC_MIX))
+    profiles = {}
+    trace = []
+    for i in range(requests):
+        now = i / rate
+        kind = rng.choices(SYNTHETIC_MIX, cum_weights=shares)[0]
+        name, _, size, cost = kind
+        if name == "current_sky_json":
+            # A few locations, each asking for the sky of the current ten minutes.
+            key = f"sky-{int(now // 600)}-{rng.randrange(50)}"
+            trace.append((now, key, size, cost, CURRENT_SKY_TTL))
+            continue
+        key = f"{name}-{rng.choices(range(keys), cum_weights=cum_weights)[0]}"
+        if key not in profiles:
+            profiles[key] = (int(size * rng.uniform(0.5, 1.5)), cost * rng.uniform(0.5, 1.5))
+        trace.append((now, key, *profiles[key], None))
+    return trace
+
+
+def load_trace(path: str) -> list[tuple]:
+    """Lookups of a recorded trace as ``(time, key, size, cost, ttl)``.
+
+    Size, cost and TTL come from the key's store records; lookups of keys
+    never stored in the trace (cached before recording began) are skipped.
+    """
+    records = []
+    stored = {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            record = json.loads(line)
+            records.append(record)
+            if record["op"] == "put":
+                stored.setdefault(record["key"], (record["size"], record["cost"], record["ttl"]))
+    trace = [
+        (record["t"], record["key"], *stored[record["key"]])
+        for record in records
+        if record["op"] == "get" and record["key"] in stored
+    ]
+    skipped = sum(1 for record in records if record["op"] == "get" and record["key"] not in stored)
+    if skipped:
+        print(f"Skipped {skipped} lookups of keys the trace never stores", file=sys.stderr)
+    return trace
+
+
+def replay(trace: list[tuple], policy: str, max_items: int, max_bytes: float, honour_ttl: bool) -> dict:
+    clock = [0.0]
+    backend = MemoryBackend(policy=policy, clock=lambda: clock[0])
+    hits = hit_bytes = total_bytes = 0
+    saved = spent = 0.0
+    for now, key, size, cost, ttl in trace:
+        clock[0] = now
+        total_bytes += size
+        if backend.get(key) is not None:
+            hits += 1
+            hit_bytes += size
+            saved += cost
+            continue
+        spent += cost
+        expires_at = now + ttl if honour_ttl and ttl is not None else None
+        backend.put(
+            key,
+            {"variants": {}, "media_type": "", "last_used": now, "size": size, "cost": cost, "expires_at": expires_at},
+        )
+        backend.evict(max_items, max_bytes)
+    return {
+        "policy": policy,
+        "ttl": honour_ttl,
+        "hit_ratio": hits / len(trace),
+        "byte_hit_ratio": hit_bytes / total_bytes if total_bytes else 0.0,
+        "saved_cpu_s": saved,
+        "recompute_cpu_s": spent,
+        "expired": backend.expired,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trace", help="JSONL trace recorded with CACHE_TRACE_PATH (default: synthetic)")
+    parser.add_argument("--requests", type=int, default=200_000, help="Synthetic trace length")
+    parser.add_argument("--keys", type=int, default=20_000, help="Distinct keys per chart type in the synthetic trace")
+    parser.add_argument("--zipf", type=float, default=0.9, help="Zipf exponent of the synthetic key popularity")
+    parser.add_argument("--rate", type=float, default=20.0, help="Synthetic requests per second")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cache-mb", type=float, default=5.0)
+    parser.add_argument("--max-items", type=int, default=10**9)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        trace = synthetic_trace(args.requests, args.keys, args.zipf, args.rate, args.seed)
+    if not trace:
+        raise SystemExit("The trace has no replayable lookups")
+
+    results = [
+        replay(trace, policy, args.max_items, args.cache_mb * 1024 * 1024, honour_ttl)
+        for policy in POLICIES
+        for honour_ttl in (False, True)
+    ]
+    if args.json:
+        print(json.dumps({"requests": len(trace), "cache_mb": args.cache_mb, "results": results}, indent=2))
+        return
+    print(f"{len(trace)} requests, {args.cache_mb:g}MB cache")
+    print(f"{'policy':>8} {'ttl':>5} {'hit ratio':>10} {'byte hits':>10} {'saved cpu s':>12} {'recompute s':>12}")
+    for r in results:
+        print(
+            f"{r['policy']:>8} {'yes' if r['ttl'] else 'no':>5} {r['hit_ratio']:10.1%} {r['byte_hit_ratio']:10.1%}"
+            f" {r['saved_cpu_s']:12.1f} {r['recompute_cpu_s']:12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
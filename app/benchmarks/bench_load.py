@@ -0,0 +1,556 @@
+"""End-to-end load and soak test for the chart endpoints.
+
+Drives the app with a weighted mix of endpoints, a target cache hit ratio
+and one or more concurrency levels, and reports throughput and p50/p95/p99
+latency per level.  The app runs in-process (through httpx's ASGI
+transport), under gunicorn on localhost (``--gunicorn WORKERS``, using this
+directory's ``gunicorn.conf.py``), or at ``--url`` if it is already
+running.  No external services are needed.
+
+Hits come from a fixed set of hot subjects requested once during warm-up;
+misses use a fresh subject each time.  The observed ratio is read from the
+``Server-Timing`` header.  A level with more hits than ``--hit-ratio`` plus
+``--hit-ratio-tolerance`` fails the run (misses are landing on cached
+subjects); one with that many fewer gets a warning.
+
+``--soak SECONDS`` then keeps the load going while sampling the server's
+RSS, the response cache (``/cache/info``) and the entries under
+``CHART_OUTPUT_DIR``, and exits with status 1 if RSS grows by more than
+``--max-rss-growth-mb``, the cache exceeds ``max_size_mb``, temp
+directories are left behind, or (in-process) the cache's size accounting
+disagrees with the bytes it actually holds.  Admin endpoints are enabled
+for the in-process and gunicorn modes; with ``--url`` they must be on for
+the cache checks.
+
+Usage (from ``app/``)::
+
+    python benchmarks/bench_load.py
+    python benchmarks/bench_load.py --concurrency 1 8 32 --requests 500 --hit-ratio 0.9
+    python benchmarks/bench_load.py --mix birth=3 synastry=1 --svg-ratio 1 --soak 300 --cache-max-mb 5
+    SVG_RENDER_MODE=file python benchmarks/bench_load.py --gunicorn 2 --soak 120
+    python benchmarks/bench_load.py --url http://127.0.0.1:8000 --requests 1000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import httpx  # noqa: E402
+
+from bench_serialization import PARAMS, SUBJECT_1  # noqa: E402
+from normalization import COORDINATE_PRECISION  # noqa: E402
+
+PATHS = {
+    "birth": "/gen/birth",
+    "synastry": "/gen/synastry",
+    "transit": "/gen/transit",
+    "solar_return": "/gen/solar-return",
+    "lunar_return": "/gen/lunar-return",
+    "composite": "/gen/composite",
+    "timeline": "/gen/transit/timeline",
+}
+BASE_PARAMS = {**PARAMS, "timeline": {**SUBJECT_1, "start": "2024-01-01", "end": "2024-12-31"}}
+DEFAULT_MIX = ["birth=4", "synastry=2", "transit=2", "solar_return=1", "lunar_return=1", "composite=1"]
+
+_CACHE_RESULT = re.compile(r'cache;desc="([^"]*)"')
+
+
+# ---------------------------------------------------------------------------
+# Workload
+# ---------------------------------------------------------------------------
+
+
+class Workload:
+    """Random requests following the endpoint mix and target hit ratio."""
+
+    def __init__(self, mix: dict[str, float], svg_ratio: float, hit_ratio: float, hot_keys: int, seed: int):
+        self.types = list(mix)
+        self.weights = list(mix.values())
+        self.svg_ratio = svg_ratio
+        self.hit_ratio = hit_ratio
+        self.hot_keys = hot_keys
+        self.rng = random.Random(seed)
+        self._next_cold = hot_keys
+
+    @staticmethod
+    def request(chart_type: str, variant: int, svg: bool) -> tuple[str, dict]:
+        """Path and query for *chart_type*, with the subject moved *variant* steps north.
+
+        A step is the smallest coordinate change the service still tells
+        apart (``COORDINATE_PRECISION``); anything finer would round onto a
+        hot subject and turn every miss into a hit.
+        """
+        params = dict(BASE_PARAMS[chart_type])
+        for key in ("lat", "lat1"):
+            if key in params:
+                params[key] = round(params[key] + variant * 10**-COORDINATE_PRECISION, COORDINATE_PRECISION)
+        if svg and chart_type != "timeline":
+            params["svg"] = "true"
+        return PATHS[chart_type], params
+
+    def hot_set(self) -> list[tuple[str, dict]]:
+        """Every request that counts as a hit once warmed up."""
+        formats = [False] if self.svg_ratio <= 0 else [True] if self.svg_ratio >= 1 else [False, True]
+        return [
+            self.request(chart_type, variant, svg)
+            for chart_type in self.types
+            for variant in range(self.hot_keys)
+            for svg in formats
+        ]
+
+    def next(self) -> tuple[str, dict]:
+        chart_type = self.rng.choices(self.types, self.weights)[0]
+        svg = self.rng.random() < self.svg_ratio
+        if self.rng.random() < self.hit_ratio:
+            variant = self.rng.randrange(self.hot_keys)
+        else:
+            variant = self._next_cold
+            self._next_cold += 1
+        return self.request(chart_type, variant, svg)
+
+
+def _parse_mix(items: list[str]) -> dict[str, float]:
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in PATHS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name} (choose from {', '.join(PATHS)})")
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+# ---------------------------------------------------------------------------
+# Server under test
+# ---------------------------------------------------------------------------
+
+
+def _rss_mb(pid: int) -> float:
+    """Resident memory of *pid* and all its descendants, in MB (Linux /proc)."""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as fh:
+                total_kb += next(int(line.split()[1]) for line in fh if line.startswith("VmRSS:"))
+            with open(f"/proc/{current}/task/{current}/children") as fh:
+                pending.extend(int(child) for child in fh.read().split())
+        except (FileNotFoundError, ProcessLookupError, StopIteration):
+            continue
+    return total_kb / 1024
+
+
+def _self_rss_mb() -> float:
+    if os.path.exists("/proc/self/status"):
+        return _rss_mb(os.getpid())
+    # Peak rather than current RSS, but still shows growth.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class InProcessServer:
+    """The app imported into this process and called through ASGI."""
+
+    label = "in-process"
+
+    def __enter__(self):
+        os.environ.setdefault("ENABLE_ADMIN_ENDPOINTS", "true")
+        import main
+
+        self.main = main
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def client(self, concurrency: int) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.main.app), base_url="http://loadtest", timeout=120
+        )
+
+    def rss_mb(self) -> float:
+        return _self_rss_mb()
+
+    def set_cache_max_mb(self, max_size_mb: float) -> None:
+        self.main.cache.update_config(None, max_size_mb)
+
+    def accounting_error(self) -> tuple[int, int] | None:
+        """Reported and actual stored bytes of the response cache, if they differ."""
+        cache = self.main.cache
+        actual = 0
+        for key in list(cache.backend.keys()):
+            entry = cache.backend.get(key)
+            if entry is not None:
+                actual += sum(len(body) for body in entry["variants"].values())
+        reported = cache.size_bytes
+        return (reported, actual) if reported != actual else None
+
+
+class RemoteServer:
+    """An app on localhost: started under gunicorn here, or already running at *url*."""
+
+    def __init__(self, url: str | None = None, gunicorn_workers: int = 0):
+        self.url = url
+        self.gunicorn_workers = gunicorn_workers
+        self.process = None
+        self._metrics_dir = None
+        self.label = f"gunicorn x{gunicorn_workers}" if gunicorn_workers else url
+
+    def __enter__(self):
+        if self.gunicorn_workers:
+            port = _free_port()
+            self.url = f"http://127.0.0.1:{port}"
+            self._metrics_dir = tempfile.TemporaryDirectory()
+            env = {
+                **os.environ,
+                "ENABLE_ADMIN_ENDPOINTS": "true",
+                "PROMETHEUS_MULTIPROC_DIR": self._metrics_dir.name,
+            }
+            self.process = subprocess.Popen(
+                [
+                    sys.executable, "-m", "gunicorn", "-w", str(self.gunicorn_workers),
+                    "-b", f"127.0.0.1:{port}", "main:app", "-k", "uvicorn.workers.UvicornWorker",
+                ],
+                cwd=APP_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            self._wait_ready()
+        return self
+
+    def _wait_ready(self, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise SystemExit(f"gunicorn exited with status {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.url}/healthz", timeout=1).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+        raise SystemExit("gunicorn did not become ready")
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self._metrics_dir.cleanup()
+
+    def client(self, concurrency: int) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        return httpx.AsyncClient(base_url=self.url, timeout=120, limits=limits)
+
+    def rss_mb(self) -> float | None:
+        return _rss_mb(self.process.pid) if self.process is not None else None
+
+    def set_cache_max_mb(self, max_size_mb: float) -> None:
+        # Each worker has its own cache; this reaches only the worker that answers.
+        httpx.put(f"{self.url}/cache/config", params={"max_size_mb": max_size_mb}, timeout=10)
+
+    def accounting_error(self):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Load
+# ---------------------------------------------------------------------------
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.statuses: dict[int, int] = {}
+        self.cache_results: dict[str, int] = {}
+
+    def add(self, latency: float, response: httpx.Response) -> None:
+        self.latencies.append(latency)
+        self.statuses[response.status_code] = self.statuses.get(response.status_code, 0) + 1
+        found = _CACHE_RESULT.search(response.headers.get("server-timing", ""))
+        result = found.group(1) if found else "unknown"
+        self.cache_results[result] = self.cache_results.get(result, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        latencies = sorted(self.latencies)
+        n = len(latencies)
+
+        def pct(p: float) -> float:
+            return latencies[min(n - 1, int(n * p))] * 1000 if n else 0.0
+
+        return {
+            "requests": n,
+            "errors": sum(count for status, count in self.statuses.items() if status >= 400),
+            "statuses": self.statuses,
+            "throughput_rps": n / elapsed if elapsed else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "mean_ms": statistics.fmean(latencies) * 1000 if n else 0.0,
+            "hit_ratio": self.cache_results.get("hit", 0) / n if n else 0.0,
+            "cache_results": self.cache_results,
+        }
+
+
+async def _drive(client, workload: Workload, concurrency: int, recorder: Recorder, stop) -> None:
+    async def worker():
+        while not stop():
+            path, params = workload.next()
+            start = time.perf_counter()
+            response = await client.get(path, params=params, headers={"Accept-Encoding": "gzip"})
+            recorder.add(time.perf_counter() - start, response)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def warm_up(server, workload: Workload, concurrency: int) -> int:
+    requests = workload.hot_set()
+    async with server.client(concurrency) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(path, params):
+            async with semaphore:
+                await client.get(path, params=params)
+
+        await asyncio.gather(*(fetch(path, params) for path, params in requests))
+    return len(requests)
+
+
+async def load_level(server, workload: Workload, concurrency: int, requests: int) -> dict:
+    recorder = Recorder()
+    issued = 0
+
+    def stop() -> bool:
+        nonlocal issued
+        issued += 1
+        return issued > requests
+
+    async with server.client(concurrency) as client:
+        start = time.perf_counter()
+        await _drive(client, workload, concurrency, recorder, stop)
+        elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, **recorder.summary(elapsed)}
+
+
+# ---------------------------------------------------------------------------
+# Soak
+# ---------------------------------------------------------------------------
+
+
+def _count_entries(path: str) -> int:
+    try:
+        return len(os.listdir(path))
+    except FileNotFoundError:
+        return 0
+
+
+async def soak(server, workload: Workload, concurrency: int, seconds: float, interval: float) -> dict:
+    output_dir = os.getenv("CHART_OUTPUT_DIR", "/tmp/astral-kerykeion/output")
+    temp_entries_before = _count_entries(output_dir)
+    recorder = Recorder()
+    samples = []
+    deadline = time.monotonic() + seconds
+
+    async with server.client(concurrency) as client:
+
+        async def sample():
+            start = time.monotonic()
+            while time.monotonic() < deadline:
+                await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+                info = await client.get("/cache/info")
+                cache = info.json() if info.status_code == 200 else {}
+                point = {
+                    "t": round(time.monotonic() - start, 1),
+                    "requests": len(recorder.latencies),
+                    "rss_mb": server.rss_mb(),
+                    "cache_mb": cache.get("cache_size_mb"),
+                    "cache_max_mb": cache.get("max_size_mb"),
+                    "cache_items": cache.get("cache_items"),
+                    "temp_entries": _count_entries(output_dir),
+                }
+                samples.append(point)
+                print(
+                    f"{point['t']:>7.1f}s {point['requests']:>8} req  rss {point['rss_mb'] or 0:8.1f} MB"
+                    f"  cache {point['cache_mb'] if point['cache_mb'] is not None else '-':>7} MB"
+                    f" / {point['cache_max_mb'] if point['cache_max_mb'] is not None else '-'}"
+                    f"  temp dirs {point['temp_entries']}"
+                )
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            _drive(client, workload, concurrency, recorder, lambda: time.monotonic() >= deadline),
+            sample(),
+        )
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "seconds": seconds,
+        "load": recorder.summary(elapsed),
+        "samples": samples,
+        "temp_entries_before": temp_entries_before,
+        "temp_entries_after": _count_entries(output_dir),
+        "accounting_error": server.accounting_error(),
+    }
+
+
+def soak_failures(result: dict, max_rss_growth_mb: float) -> list[str]:
+    """Problems found in a soak: memory growth, cache overrun, leftover temp dirs."""
+    failures = []
+    samples = result["samples"]
+    rss = [s["rss_mb"] for s in samples if s["rss_mb"] is not None]
+    if len(rss) >= 4:
+        # Skip the first quarter, where caches are still filling.
+        settled = statistics.median(rss[len(rss) // 4 : len(rss) // 2])
+        final = statistics.median(rss[-max(1, len(rss) // 4) :])
+        if final - settled > max_rss_growth_mb:
+            failures.append(f"RSS grew {final - settled:.1f} MB after warm-up (limit {max_rss_growth_mb:g} MB)")
+    over = [s for s in samples if s["cache_mb"] is not None and s["cache_mb"] > s["cache_max_mb"]]
+    if over:
+        worst = max(over, key=lambda s: s["cache_mb"])
+        failures.append(f"response cache at {worst['cache_mb']} MB exceeds max_size_mb {worst['cache_max_mb']}")
+    if result["temp_entries_after"] > result["temp_entries_before"]:
+        failures.append(
+            f"{result['temp_entries_after'] - result['temp_entries_before']} temp entries left under CHART_OUTPUT_DIR"
+        )
+    if result["accounting_error"] is not None:
+        reported, actual = result["accounting_error"]
+        failures.append(f"response cache reports {reported} bytes but holds {actual}")
+    return failures
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def hit_ratio_failure(result: dict, target: float, tolerance: float) -> tuple[str, bool] | None:
+    """Message for a level whose observed hit ratio is off target, and whether it is fatal.
+
+    More hits than asked for means misses are being answered from the cache,
+    so the workload does not measure what it claims: that fails the run.
+    Fewer hits only warn, since eviction (``--cache-max-mb``) and coalesced
+    misses legitimately lower the ratio.
+    """
+    observed = result["hit_ratio"]
+    if abs(observed - target) <= tolerance:
+        return None
+    message = f"hit ratio {observed:.0%} at concurrency {result['concurrency']} is off the {target:.0%} target"
+    return message, observed > target
+
+
+def _print_level(r: dict) -> None:
+    print(
+        f"{r['concurrency']:>6} {r['requests']:>8} {r['errors']:>6} {r['throughput_rps']:>8.1f}"
+        f" {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['hit_ratio']:>6.0%}"
+    )
+
+
+async def _main(args) -> int:
+    workload = Workload(_parse_mix(args.mix), args.svg_ratio, args.hit_ratio, args.hot_keys, args.seed)
+    if args.url:
+        server = RemoteServer(url=args.url.rstrip("/"))
+    elif args.gunicorn:
+        server = RemoteServer(gunicorn_workers=args.gunicorn)
+    else:
+        server = InProcessServer()
+
+    report = {"server": None, "levels": [], "soak": None}
+    with server:
+        report["server"] = server.label
+        if args.cache_max_mb:
+            server.set_cache_max_mb(args.cache_max_mb)
+        warmed = await warm_up(server, workload, max(args.concurrency))
+        print(f"{server.label}: warmed {warmed} hot requests, rss {server.rss_mb() or 0:.1f} MB")
+
+        print(f"{'conc':>6} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hits':>6}")
+        failures = []
+        for concurrency in args.concurrency:
+            result = await load_level(server, workload, concurrency, args.requests)
+            report["levels"].append(result)
+            _print_level(result)
+            problem = hit_ratio_failure(result, args.hit_ratio, args.hit_ratio_tolerance)
+            if problem is not None:
+                message, fatal = problem
+                if fatal:
+                    failures.append(message)
+                else:
+                    print(f"WARN: {message}")
+        if args.soak:
+            concurrency = args.soak_concurrency or args.concurrency[-1]
+            print(f"soak: {args.soak:g}s at concurrency {concurrency}")
+            report["soak"] = await soak(server, workload, concurrency, args.soak, args.sample_seconds)
+            _print_level(report["soak"]["load"] | {"concurrency": concurrency})
+            report["soak"]["failures"] = soak_failures(report["soak"], args.max_rss_growth_mb)
+            failures += report["soak"]["failures"]
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+            fh.write("\n")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if args.soak and not report["soak"]["failures"]:
+        print("soak passed")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--gunicorn", type=int, metavar="WORKERS", help="Start the app under gunicorn on localhost")
+    target.add_argument("--url", help="Load an already running app instead")
+    parser.add_argument("--mix", nargs="+", default=DEFAULT_MIX, help=f"endpoint=weight ({', '.join(PATHS)})")
+    parser.add_argument("--svg-ratio", type=float, default=0.5, help="Share of chart requests asking for SVG")
+    parser.add_argument("--hit-ratio", type=float, default=0.8, help="Share of requests for already cached charts")
+    parser.add_argument(
+        "--hit-ratio-tolerance",
+        type=float,
+        default=0.1,
+        help="Fail when the observed hit ratio exceeds --hit-ratio by more than this (warn when below)",
+    )
+    parser.add_argument("--hot-keys", type=int, default=10, help="Hot subjects per endpoint")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--soak", type=float, default=0, metavar="SECONDS", help="Soak test duration")
+    parser.add_argument("--soak-concurrency", type=int, help="Default: the last --concurrency level")
+    parser.add_argument("--sample-seconds", type=float, default=5.0)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=50.0)
+    parser.add_argument("--cache-max-mb", type=float, help="Lower the response cache limit to exercise eviction")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Save the full report here")
+    args = parser.parse_args()
+
+    for name in ("cache_service", "compute_pool", "httpx", "main"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    # Chart factories log missing optional ephemeris files; keep the report readable.
+    with contextlib.redirect_stderr(io.StringIO()):
+        sys.exit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Overhead of the Prometheus instrumentation.
+
+Measures, per call, a ``metrics.stage()`` block, a cache lookup counter
+increment and a request passing through ``RequestMetricsMiddleware``
+(compared with the same no-op ASGI app without it), plus the time to render
+``/metrics``.  Both single-process and multiprocess (gunicorn) modes are
+reported; multiprocess mode writes every sample to an mmapped file.
+
+Usage (from ``app/``)::
+
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --calls 200000
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+def _per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def _asgi_per_call_us(app, calls: int) -> float:
+    scope = {"type": "http", "path": "/gen/birth", "query_string": b"name=Ada&svg=true"}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(calls):
+            await app(dict(scope), receive, send)
+        return (time.perf_counter() - start) / calls * 1e6
+
+    return asyncio.run(run())
+
+
+def measure(calls: int) -> dict:
+    import metrics  # imported here so PROMETHEUS_MULTIPROC_DIR is already set
+
+    async def noop_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    def staged():
+        with metrics.stage("bench"):
+            pass
+
+    bare = _asgi_per_call_us(noop_app, calls // 10)
+    wrapped = _asgi_per_call_us(metrics.RequestMetricsMiddleware(noop_app), calls // 10)
+    results = {
+        "stage() block": _per_call_us(staged, calls),
+        "counter inc": _per_call_us(lambda: metrics.CACHE_LOOKUPS.labels("bench", "hit").inc(), calls),
+        "middleware": wrapped - bare,
+    }
+    results["render /metrics"] = _per_call_us(metrics.render, 100)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--mode", choices=["both", "single", "multiprocess"], default="both")
+    args = parser.parse_args()
+
+    if args.mode == "both":
+        print(f"{'mode':>12} {'operation':>16} {'us/call':>9}")
+        for mode in ("single", "multiprocess"):
+            with tempfile.TemporaryDirectory() as metrics_dir:
+                env = dict(os.environ)
+                env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+                if mode == "multiprocess":
+                    env["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+                subprocess.run(
+                    [sys.executable, __file__, "--calls", str(args.calls), "--mode", mode], env=env, check=True
+                )
+        return
+
+    for name, us in measure(args.calls).items():
+        print(f"{args.mode:>12} {name:>16} {us:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Latency saved by ``include=`` when aspects and context are not requested.
+
+Times a cold JSON build (subjects memoized, aspects and chart data not) per
+endpoint type for several section selections.  Subjects are warmed first so
+the numbers isolate what ``include`` can skip.
+
+Usage (from ``app/``)::
+
+    python benchmarks/bench_sections.py
+    python benchmarks/bench_sections.py --repeat 50
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_serialization import PARAMS  # noqa: E402
+
+from chart_builders import build_chart, chart_data_cache  # noqa: E402
+
+SELECTIONS = {
+    "all": None,
+    "positions": frozenset({"positions"}),
+    "positions,houses": frozenset({"positions", "houses"}),
+    "no context": frozenset({"positions", "houses", "aspects"}),
+}
+
+
+def bench(chart_type: str, params: dict, include, repeat: int) -> dict:
+    timings = []
+    sizes = set()
+    for _ in range(repeat):
+        chart_data_cache.clear()
+        start = time.perf_counter()
+        sizes.add(len(build_chart(chart_type, params, svg=False, include=include)))
+        timings.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(timings) * 1000, "bytes": sizes.pop()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':>13} {'include':>17} {'median ms':>10} {'saved':>7} {'bytes':>8}")
+    # Chart factories log missing optional ephemeris files; keep the report readable.
+    with contextlib.redirect_stderr(io.StringIO()):
+        for chart_type, params in PARAMS.items():
+            build_chart(chart_type, params, svg=False)  # warm the subject cache
+            baseline = None
+            for name, include in SELECTIONS.items():
+                r = bench(chart_type, params, include, args.repeat)
+                baseline = baseline or r["median_ms"]
+                saved = 1 - r["median_ms"] / baseline
+                print(
+                    f"{chart_type:>13} {name:>17} {r['median_ms']:10.2f} {saved:7.0%} {r['bytes']:8d}",
+                    file=sys.__stdout__,
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Serialize time and payload size of each chart endpoint's JSON body.
+
+Computes one chart per endpoint type, then times the previous encoder
+(``json.dumps(indent=2)``) against :func:`serialization.dumps` in compact
+and pretty modes, reporting raw and gzip sizes for each.
+
+Usage (from ``app/``)::
+
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --repeat 500
+"""
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_builders import CHART_SPECS, compute_chart  # noqa: E402
+from serialization import ENCODER, dumps  # noqa: E402
+
+SUBJECT_1 = {
+    "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10, "hour": 6, "minute": 0,
+    "city": "London", "nation": "UK", "lng": -0.1278, "lat": 51.5074, "tz_str": "Europe/London",
+}
+SUBJECT_2 = {
+    "name": "Charles Babbage", "year": 1791, "month": 12, "day": 26, "hour": 12, "minute": 0,
+    "city": "London", "nation": "UK", "lng": -0.1278, "lat": 51.5074, "tz_str": "Europe/London",
+}
+TRANSIT = {f"t_{k}": v for k, v in {**SUBJECT_1, "year": 2024, "month": 1, "day": 1}.items() if k != "name"}
+
+
+def _pair(a: dict, b: dict) -> dict:
+    return {**{f"{k}1": v for k, v in a.items()}, **{f"{k}2": v for k, v in b.items()}}
+
+
+PARAMS = {
+    "birth": SUBJECT_1,
+    "synastry": _pair(SUBJECT_1, SUBJECT_2),
+    "transit": {**SUBJECT_1, **TRANSIT},
+    "solar_return": {**SUBJECT_1, "return_year": 2024},
+    "lunar_return": {**SUBJECT_1, "return_year": 2024, "return_month": 1, "return_day": 1},
+    "composite": _pair(SUBJECT_1, SUBJECT_2),
+}
+
+ENCODERS = {
+    "json indent=2": lambda data: json.dumps(data, indent=2).encode("utf-8"),
+    f"{ENCODER} compact": lambda data: dumps(data),
+    f"{ENCODER} pretty": lambda data: dumps(data, pretty=True),
+}
+
+
+def bench(data: dict, encode, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(data)
+        timings.append(time.perf_counter() - start)
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "bytes": len(body),
+        "gzip_bytes": len(gzip.compress(body, compresslevel=9, mtime=0)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':>13} {'encoder':>16} {'median ms':>10} {'bytes':>9} {'gzip':>8}")
+    for chart_type, params in PARAMS.items():
+        data = CHART_SPECS[chart_type].to_json(compute_chart(chart_type, params), params)
+        for name, encode in ENCODERS.items():
+            r = bench(data, encode, args.repeat)
+            print(f"{chart_type:>13} {name:>16} {r['median_ms']:10.3f} {r['bytes']:9d} {r['gzip_bytes']:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Per-stage microbenchmarks with a regression check against a saved baseline.
+
+Times each building block of a chart request in isolation for the subjects
+in ``bench_serialization``: subject creation, aspects, context, every
+``ChartDataFactory.create_*`` used by the endpoints, SVG rendering and CSS
+embedding, return searches and the response cache operations.  Inputs are
+built once outside the timed loop.
+
+``run`` writes the results to a JSON file; ``check`` re-runs the suite and
+exits with status 1 if any stage is slower than the baseline by more than
+``--threshold`` percent.  Stages are compared on their fastest round, which
+is far less sensitive to other load on the host than the median (both are
+saved).  Baselines are machine specific: record and check on the same host.
+
+Usage (from ``app/``)::
+
+    python benchmarks/bench_stages.py run --output stages_baseline.json
+    python benchmarks/bench_stages.py check --baseline stages_baseline.json --threshold 20
+    python benchmarks/bench_stages.py run --stages generate_svg embed_css --rounds 10
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from importlib.metadata import version as package_version
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_serialization import SUBJECT_1, SUBJECT_2  # noqa: E402
+
+from kerykeion import AspectsFactory, to_context  # noqa: E402
+from kerykeion.chart_data_factory import ChartDataFactory  # noqa: E402
+from kerykeion.composite_subject_factory import CompositeSubjectFactory  # noqa: E402
+from kerykeion.planetary_return_factory import PlanetaryReturnFactory  # noqa: E402
+
+from cache_service import CacheService  # noqa: E402
+from chart_builders import build_chart  # noqa: E402
+from chart_helpers import create_subject, embed_css_in_svg, generate_svg, subject_cache  # noqa: E402
+from compression import encodings_from_env  # noqa: E402
+
+DEFAULT_BASELINE = "stages_baseline.json"
+
+
+def _subject(data: dict, **overrides):
+    return create_subject(**{**data, **overrides})
+
+
+def _stages() -> dict:
+    """Map each stage name to a zero-argument callable, building its inputs first."""
+    natal = _subject(SUBJECT_1)
+    partner = _subject(SUBJECT_2)
+    transit = _subject(SUBJECT_1, name="Transit", year=2024, month=1, day=1)
+    returns = PlanetaryReturnFactory(
+        natal, lng=SUBJECT_1["lng"], lat=SUBJECT_1["lat"], tz_str=SUBJECT_1["tz_str"], online=False
+    )
+    solar_return = returns.next_return_from_date(2024, 1, 1, return_type="Solar")
+    composite = CompositeSubjectFactory(natal, partner).get_midpoint_composite_subject_model()
+    natal_chart_data = ChartDataFactory.create_natal_chart_data(natal)
+    natal_svg = generate_svg(natal_chart_data, theme="")  # no such theme: the SVG without CSS
+
+    cache = CacheService(max_items=10_000, max_size_mb=1e9, encodings=encodings_from_env())
+    body = build_chart("birth", SUBJECT_1, svg=False)
+    cache.put("hit", body, "application/json")
+    puts = iter(range(10**12))
+
+    def cold_subject():
+        subject_cache.clear()
+        return _subject(SUBJECT_1)
+
+    return {
+        "create_subject": cold_subject,
+        "create_subject_memo": lambda: _subject(SUBJECT_1),
+        "single_chart_aspects": lambda: AspectsFactory.single_chart_aspects(natal),
+        "synastry_aspects": lambda: AspectsFactory.synastry_aspects(natal, partner),
+        "to_context": lambda: to_context(natal),
+        "natal_chart_data": lambda: ChartDataFactory.create_natal_chart_data(natal),
+        "synastry_chart_data": lambda: ChartDataFactory.create_synastry_chart_data(natal, partner),
+        "transit_chart_data": lambda: ChartDataFactory.create_transit_chart_data(natal, transit),
+        "return_chart_data": lambda: ChartDataFactory.create_return_chart_data(natal, solar_return),
+        "composite_chart_data": lambda: ChartDataFactory.create_composite_chart_data(composite),
+        "generate_svg": lambda: generate_svg(natal_chart_data),
+        "embed_css": lambda: embed_css_in_svg(natal_svg),
+        "solar_return_search": lambda: returns.next_return_from_date(2024, 1, 1, return_type="Solar"),
+        "lunar_return_search": lambda: returns.next_return_from_date(2024, 1, 1, return_type="Lunar"),
+        "cache_put": lambda: cache.put(f"put{next(puts)}", body, "application/json"),
+        "cache_get_hit": lambda: cache.get("hit"),
+        "cache_get_miss": lambda: cache.get("missing"),
+        "cache_encoded_body": lambda: CacheService.encoded_body(cache.get("hit"), "gzip, br"),
+    }
+
+
+def _calibrate(fn, min_round_s: float) -> int:
+    """Number of calls that makes one timed round last at least *min_round_s*."""
+    fn()  # warm up
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_s:
+            return number
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_round_s / elapsed) + 1))
+
+
+def _time_round(fn, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def run(names: list[str] | None, rounds: int, min_round_s: float) -> dict:
+    """Time the selected stages.
+
+    Rounds are interleaved across stages, so a slow patch on the host (CPU
+    throttling, a noisy neighbour) affects every stage a little rather than
+    one stage a lot.
+    """
+    logging.getLogger("cache_service").setLevel(logging.WARNING)
+    # Chart factories log missing optional ephemeris files; keep the report readable.
+    with contextlib.redirect_stderr(io.StringIO()):
+        stages = _stages()
+        unknown = set(names or ()) - set(stages)
+        if unknown:
+            raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}")
+        stages = {name: fn for name, fn in stages.items() if not names or name in names}
+        numbers = {name: _calibrate(fn, min_round_s) for name, fn in stages.items()}
+        per_call: dict[str, list[float]] = {name: [] for name in stages}
+        for _ in range(rounds):
+            for name, fn in stages.items():
+                per_call[name].append(_time_round(fn, numbers[name]))
+
+    results = {}
+    for name, timings in per_call.items():
+        results[name] = {
+            "min_us": min(timings) * 1e6,
+            "median_us": statistics.median(timings) * 1e6,
+            "calls_per_round": numbers[name],
+            "rounds": rounds,
+        }
+        print(f"{name:>22} {results[name]['min_us']:12.1f} us min {results[name]['median_us']:12.1f} us median")
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "kerykeion": package_version("kerykeion"),
+            "machine": platform.machine(),
+            "node": platform.node(),
+        },
+        "stages": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Print a comparison table and return the stages slower than *threshold* percent."""
+    regressions = []
+    print(f"{'stage':>22} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for name, result in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            print(f"{name:>22} {'-':>12} {result['min_us']:12.1f} {'new':>8}")
+            continue
+        change = (result["min_us"] / base["min_us"] - 1) * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:>22} {base['min_us']:12.1f} {result['min_us']:12.1f} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("run", "check"):
+        p = sub.add_parser(name)
+        p.add_argument("--stages", nargs="+", help="Only these stages (default: all)")
+        p.add_argument("--rounds", type=int, default=10)
+        p.add_argument("--min-round-ms", type=float, default=50.0, help="Minimum duration of one timed round")
+    sub.choices["run"].add_argument("--output", default=DEFAULT_BASELINE)
+    check = sub.choices["check"]
+    check.add_argument("--baseline", default=DEFAULT_BASELINE)
+    check.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.getenv("BENCH_REGRESSION_THRESHOLD", "25")),
+        help="Allowed slowdown of a stage, in percent (default 25, or BENCH_REGRESSION_THRESHOLD)",
+    )
+    check.add_argument("--output", help="Also save the new results here")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.command == "check":
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+
+    results = run(args.stages, args.rounds, args.min_round_ms / 1000)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+            fh.write("\n")
+        print(f"Saved {len(results['stages'])} stages to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed by more than {args.threshold:g}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"No stage regressed by more than {args.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
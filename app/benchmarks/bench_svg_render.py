@@ -0,0 +1,70 @@
+"""Compare in-memory and temp-file SVG rendering under concurrency.
+
+Renders the same natal chart through ``generate_svg`` in both modes from a
+thread pool and reports throughput and latency percentiles per mode.
+
+Usage (from ``app/``)::
+
+    python benchmarks/bench_svg_render.py
+    python benchmarks/bench_svg_render.py --concurrency 1 8 32 --renders 200
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kerykeion.chart_data_factory import ChartDataFactory  # noqa: E402
+
+from chart_helpers import create_subject, generate_svg  # noqa: E402
+
+
+def _timed_render(chart_data, mode: str) -> float:
+    start = time.perf_counter()
+    generate_svg(chart_data, prefix="bench", render_mode=mode)
+    return time.perf_counter() - start
+
+
+def bench(chart_data, mode: str, concurrency: int, renders: int) -> dict:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        latencies = sorted(pool.map(lambda _: _timed_render(chart_data, mode), range(renders)))
+        elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "renders_per_s": renders / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--renders", type=int, default=100)
+    args = parser.parse_args()
+
+    subject = create_subject("Ada Lovelace", 1815, 12, 10, 6, 0, "London", "UK", -0.1278, 51.5074, "Europe/London")
+    chart_data = ChartDataFactory.create_natal_chart_data(subject)
+
+    print(f"{'mode':>7} {'threads':>8} {'renders/s':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    # save_svg prints a line per file; keep the report readable.
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [
+            bench(chart_data, mode, concurrency, args.renders)
+            for concurrency in args.concurrency
+            for mode in ("file", "memory")
+        ]
+    for r in results:
+        print(f"{r['mode']:>7} {r['concurrency']:>8} {r['renders_per_s']:>10.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,549 @@
+"""Storage backends for :class:`cache_service.CacheService`.
+
+A backend owns the entries and their eviction order; ``CacheService`` owns
+the limits and decides when to evict.  Select one with ``CACHE_BACKEND``:
+
+- ``memory`` (default): per-process ``OrderedDict``.
+- ``sqlite``: a WAL-mode SQLite file shared by every worker on the host,
+  located at ``CACHE_SQLITE_PATH``.
+
+Both support two eviction policies (see :data:`POLICIES`), switchable at
+runtime:
+
+- ``lru``: least recently used first.
+- ``gds``: GreedyDual-Size.  Each entry's priority is ``L + cost / size``,
+  where ``cost`` is the compute time recorded when it was stored, reset on
+  every hit; the lowest priority goes first and ``L`` rises to the evicted
+  priority, so entries that are cheap to recompute per byte leave first
+  and idle expensive ones still age out.
+
+Under either policy, an entry whose ``expires_at`` has passed is a miss
+and is dropped before anything else is evicted.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = "/tmp/astral-kerykeion/cache.sqlite3"
+
+_VARIANT_HEADER = struct.Struct("<BI")
+
+POLICIES = ("lru", "gds")
+
+
+def gds_credit(entry: dict) -> float:
+    """GreedyDual-Size credit of *entry*: recorded compute seconds per stored KiB."""
+    return entry.get("cost", 0.0) * 1024 / max(1, entry["size"])
+
+
+def _expired(entry: dict, now: float) -> bool:
+    expires_at = entry.get("expires_at")
+    return expires_at is not None and expires_at <= now
+
+
+def pack_variants(variants: dict[str, bytes]) -> bytes:
+    """Serialize ``{coding: body}`` as length-prefixed (name, body) records."""
+    parts = []
+    for encoding, body in variants.items():
+        name = encoding.encode("ascii")
+        parts += [_VARIANT_HEADER.pack(len(name), len(body)), name, body]
+    return b"".join(parts)
+
+
+def unpack_variants(blob: bytes) -> dict[str, bytes]:
+    variants = {}
+    view = memoryview(blob)
+    offset = 0
+    while offset < len(view):
+        name_len, body_len = _VARIANT_HEADER.unpack_from(view, offset)
+        offset += _VARIANT_HEADER.size
+        name = bytes(view[offset:offset + name_len]).decode("ascii")
+        offset += name_len
+        variants[name] = bytes(view[offset:offset + body_len])
+        offset += body_len
+    return variants
+
+
+class CacheBackend:
+    """Interface every cache backend implements.
+
+    Entries are dicts with ``variants`` (content coding -> encoded body),
+    ``media_type``, ``last_used``, ``size`` (stored bytes), ``cost``
+    (seconds it took to compute) and ``expires_at`` (epoch seconds, or
+    None to keep it until evicted).
+    """
+
+    name = "base"
+    policy = "lru"
+    # True if calls can block on I/O or other processes' locks, so async
+    # callers should make them off the event loop (see CacheService.aget).
+    blocking = False
+    # True if every worker process uses the same store.  Its policy and
+    # limits are then kept in the store too, so all workers evict alike.
+    shared = False
+
+    def set_policy(self, policy: str) -> None:
+        """Switch the eviction policy; one of :data:`POLICIES`."""
+        raise NotImplementedError
+
+    def get(self, key: str) -> dict | None:
+        """Return the entry and mark it most recently used, or None."""
+        raise NotImplementedError
+
+    def put(self, key: str, entry: dict) -> None:
+        """Insert or replace *key* as the most recently used entry."""
+        raise NotImplementedError
+
+    def evict(self, max_items: int, max_bytes: float) -> int:
+        """Drop expired entries, then entries in policy order until both limits hold.
+
+        Returns the count removed.
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def size_bytes(self) -> int:
+        raise NotImplementedError
+
+    def keys(self) -> Iterator[str]:
+        """Keys from least to most recently used."""
+        raise NotImplementedError
+
+    def limits(self) -> tuple[int | None, float | None]:
+        """``(max_items, max_bytes)`` stored with a shared backend, None where unset.
+
+        Stored limits take precedence over the ones passed to :meth:`evict`.
+        """
+        return None, None
+
+    def set_limits(self, max_items: int | None, max_bytes: float | None) -> None:
+        """Store limits for every process sharing the backend; None keeps the current one."""
+        raise NotImplementedError
+
+    def items(self) -> Iterator[tuple[str, dict]]:
+        """Live ``(key, entry)`` pairs from least to most recently used.
+
+        Read-only: recency, priorities and expiries are left as they are.
+        The order is fixed when this is called and the iterator may be
+        consumed from another thread.
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Backend-specific statistics for ``/cache/info``."""
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process store: an ``OrderedDict`` in LRU order with a running byte total.
+
+    get, put and evict are O(1) under ``lru``.  ``gds`` keeps a heap of
+    priorities (stale heap items are skipped when popped), making them
+    O(log n).  Entries with an expiry sit in a second heap.  *clock* (epoch
+    seconds) is what expiries are checked against; replays pass their own.
+    """
+
+    name = "memory"
+
+    def __init__(self, policy: str = "lru", clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._store: OrderedDict[str, dict] = OrderedDict()
+        self._size_bytes = 0
+        self._expiries: list[tuple[float, str]] = []
+        self._priorities: dict[str, float] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._inflation = 0.0
+        self.expired = 0
+        self.set_policy(policy)
+
+    def set_policy(self, policy: str) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy!r}")
+        self.policy = policy
+        self._priorities.clear()
+        self._heap.clear()
+        if policy == "gds":
+            for key, item in self._store.items():
+                self._prioritize(key, item)
+
+    def get(self, key: str) -> dict | None:
+        item = self._store.get(key)
+        if item is None:
+            return None
+        now = self.clock()
+        if _expired(item, now):
+            self._remove(key)
+            self.expired += 1
+            return None
+        self._store.move_to_end(key)
+        item["last_used"] = now
+        if self.policy == "gds":
+            self._prioritize(key, item)
+        return item
+
+    def put(self, key: str, entry: dict) -> None:
+        if key in self._store:
+            self._remove(key)
+        self._store[key] = entry
+        self._size_bytes += entry["size"]
+        if entry.get("expires_at") is not None:
+            heapq.heappush(self._expiries, (entry["expires_at"], key))
+        if self.policy == "gds":
+            self._prioritize(key, entry)
+
+    def evict(self, max_items: int, max_bytes: float) -> int:
+        evicted = self._purge_expired()
+        while self._store and (len(self._store) > max_items or self._size_bytes > max_bytes):
+            if self.policy == "gds":
+                priority, key = self._pop_lowest()
+                self._inflation = priority
+            else:
+                key = next(iter(self._store))
+            self._remove(key)
+            evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        self._store.clear()
+        self._size_bytes = 0
+        self._expiries.clear()
+        self._priorities.clear()
+        self._heap.clear()
+        self._inflation = 0.0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self._store.keys()))
+
+    def items(self) -> Iterator[tuple[str, dict]]:
+        # Copied here, on the caller's thread; entries are never mutated
+        # after insertion apart from ``last_used``.
+        now = self.clock()
+        return iter([(key, item) for key, item in self._store.items() if not _expired(item, now)])
+
+    def stats(self) -> dict:
+        return {"policy": self.policy, "expired": self.expired, "gds_inflation": self._inflation}
+
+    def _remove(self, key: str) -> None:
+        item = self._store.pop(key)
+        self._size_bytes -= item["size"]
+        self._priorities.pop(key, None)
+
+    def _prioritize(self, key: str, entry: dict) -> None:
+        priority = self._inflation + gds_credit(entry)
+        self._priorities[key] = priority
+        heapq.heappush(self._heap, (priority, next(self._counter), key))
+        if len(self._heap) > 2 * len(self._store) + 64:
+            # Drop the stale items left behind by hits and overwrites.
+            self._heap = [(p, next(self._counter), k) for k, p in self._priorities.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_lowest(self) -> tuple[float, str]:
+        while True:
+            priority, _, key = heapq.heappop(self._heap)
+            if self._priorities.get(key) == priority:
+                return priority, key
+
+    def _purge_expired(self) -> int:
+        now = self.clock()
+        purged = 0
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiries)
+            item = self._store.get(key)
+            if item is not None and item.get("expires_at") == expires_at:
+                self._remove(key)
+                purged += 1
+        self.expired += purged
+        return purged
+
+
+class SQLiteBackend(CacheBackend):
+    """Store shared by all worker processes through a WAL-mode SQLite file.
+
+    Item count and byte total are maintained by triggers in a single-row
+    ``stats`` table, so they stay exact across processes without scanning.
+    LRU order comes from an indexed ``last_used`` column and GreedyDual-Size
+    order from an indexed ``priority`` column, both kept up to date on every
+    read, so switching policy is free; the GDS inflation value ``L`` is
+    shared in ``stats``.  The encoded variants of an entry are packed into
+    one ``content`` blob.
+
+    A policy or limits set at runtime (:meth:`set_policy`,
+    :meth:`set_limits`) are stored in ``stats`` as well and apply to every
+    process; until then each process uses the *policy* it was opened with
+    and the limits it passes to :meth:`evict`.
+    """
+
+    name = "sqlite"
+    blocking = True
+    shared = True
+    # Bumped whenever the on-disk layout changes; older files are reset.
+    _SCHEMA_VERSION = 4
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            content BLOB NOT NULL,
+            media_type TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL,
+            cost REAL NOT NULL DEFAULT 0,
+            priority REAL NOT NULL DEFAULT 0,
+            expires_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+        CREATE INDEX IF NOT EXISTS entries_priority ON entries (priority);
+        CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at) WHERE expires_at IS NOT NULL;
+        CREATE TABLE IF NOT EXISTS stats (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            items INTEGER NOT NULL,
+            bytes INTEGER NOT NULL,
+            inflation REAL NOT NULL DEFAULT 0,
+            policy TEXT,
+            max_items INTEGER,
+            max_bytes REAL
+        );
+        INSERT OR IGNORE INTO stats (id, items, bytes) VALUES (0, 0, 0);
+        CREATE TRIGGER IF NOT EXISTS entries_ins AFTER INSERT ON entries BEGIN
+            UPDATE stats SET items = items + 1, bytes = bytes + NEW.size WHERE id = 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_del AFTER DELETE ON entries BEGIN
+            UPDATE stats SET items = items - 1, bytes = bytes - OLD.size WHERE id = 0;
+        END;
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, timeout: float = 5.0, policy: str = "lru"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy!r}")
+        self._default_policy = policy
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+
+    @property
+    def policy(self) -> str:
+        with self._lock:
+            stored = self._conn.execute("SELECT policy FROM stats WHERE id = 0").fetchone()[0]
+        return stored or self._default_policy
+
+    def set_policy(self, policy: str) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy!r}")
+        with self._lock:
+            self._conn.execute("UPDATE stats SET policy = ? WHERE id = 0", (policy,))
+
+    def _migrate(self) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != self._SCHEMA_VERSION:
+                # It is a cache: drop entries in an older layout rather than convert them.
+                self._conn.execute("DROP TABLE IF EXISTS entries")
+                self._conn.execute("DROP TABLE IF EXISTS stats")
+                self._conn.execute(f"PRAGMA user_version = {self._SCHEMA_VERSION}")
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.executescript(self._SCHEMA)
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE entries SET last_used = ?,"
+                " priority = (SELECT inflation FROM stats WHERE id = 0) + cost * 1024.0 / MAX(size, 1)"
+                " WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)"
+                " RETURNING content, media_type, size, cost, expires_at",
+                (now, key, now),
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return {
+            "variants": unpack_variants(row[0]),
+            "media_type": row[1],
+            "last_used": now,
+            "size": row[2],
+            "cost": row[3],
+            "expires_at": row[4],
+        }
+
+    def put(self, key: str, entry: dict) -> None:
+        with self._lock:
+            # DELETE + INSERT (rather than REPLACE) so the triggers see both sides.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.execute(
+                    "INSERT INTO entries (key, content, media_type, size, last_used, cost, priority, expires_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, (SELECT inflation FROM stats WHERE id = 0) + ?, ?)",
+                    (
+                        key,
+                        pack_variants(entry["variants"]),
+                        entry["media_type"],
+                        entry["size"],
+                        entry["last_used"],
+                        entry.get("cost", 0.0),
+                        gds_credit(entry),
+                        entry.get("expires_at"),
+                    ),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def evict(self, max_items: int, max_bytes: float) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = self._conn.execute(
+                    "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+                ).rowcount
+                self._expired += expired
+                items, total, max_items, max_bytes, policy = self._conn.execute(
+                    "SELECT items, bytes, COALESCE(max_items, ?), COALESCE(max_bytes, ?), COALESCE(policy, ?)"
+                    " FROM stats WHERE id = 0",
+                    (max_items, max_bytes, self._default_policy),
+                ).fetchone()
+                if items <= max_items and total <= max_bytes:
+                    self._conn.execute("COMMIT")
+                    return expired
+                order = "priority" if policy == "gds" else "last_used"
+                victims = []
+                lowest = None
+                for key, size, priority in self._conn.execute(
+                    f"SELECT key, size, priority FROM entries ORDER BY {order}"
+                ):
+                    if items <= max_items and total <= max_bytes:
+                        break
+                    victims.append((key,))
+                    lowest = priority if lowest is None else max(lowest, priority)
+                    items -= 1
+                    total -= size
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+                if policy == "gds" and lowest is not None:
+                    self._conn.execute("UPDATE stats SET inflation = MAX(inflation, ?) WHERE id = 0", (lowest,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return expired + len(victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("UPDATE stats SET inflation = 0 WHERE id = 0")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT items FROM stats WHERE id = 0").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT bytes FROM stats WHERE id = 0").fetchone()[0]
+
+    def keys(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM entries ORDER BY last_used").fetchall()
+        return (row[0] for row in rows)
+
+    def limits(self) -> tuple[int | None, float | None]:
+        with self._lock:
+            return tuple(self._conn.execute("SELECT max_items, max_bytes FROM stats WHERE id = 0").fetchone())
+
+    def set_limits(self, max_items: int | None, max_bytes: float | None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE stats SET max_items = COALESCE(?, max_items), max_bytes = COALESCE(?, max_bytes) WHERE id = 0",
+                (max_items, max_bytes),
+            )
+
+    def items(self) -> Iterator[tuple[str, dict]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM entries ORDER BY last_used").fetchall()
+        return self._read_entries([row[0] for row in rows])
+
+    def _read_entries(self, keys: list[str]) -> Iterator[tuple[str, dict]]:
+        # One plain SELECT per entry, so a large store is never held in memory at once.
+        for key in keys:
+            now = time.time()
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT content, media_type, last_used, size, cost, expires_at FROM entries"
+                    " WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (key, now),
+                ).fetchone()
+            if row is not None:
+                yield key, {
+                    "variants": unpack_variants(row[0]),
+                    "media_type": row[1],
+                    "last_used": row[2],
+                    "size": row[3],
+                    "cost": row[4],
+                    "expires_at": row[5],
+                }
+
+    def stats(self) -> dict:
+        def file_size(path: str) -> int:
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                return 0
+
+        return {
+            "path": self.path,
+            "db_file_bytes": file_size(self.path),
+            "wal_file_bytes": file_size(f"{self.path}-wal"),
+            "process_hits": self._hits,
+            "process_misses": self._misses,
+            "process_expired": self._expired,
+            "policy": self.policy,
+        }
+
+
+def backend_from_env() -> CacheBackend:
+    """Build the backend named by ``CACHE_BACKEND`` (default ``memory``).
+
+    ``CACHE_POLICY`` selects its initial eviction policy (default ``lru``).
+    """
+    kind = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+    policy = os.getenv("CACHE_POLICY", "lru").strip().lower()
+    if kind == "memory":
+        return MemoryBackend(policy=policy)
+    if kind == "sqlite":
+        return SQLiteBackend(os.getenv("CACHE_SQLITE_PATH", DEFAULT_SQLITE_PATH), policy=policy)
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind!r}")
@@ -1,20 +1,70 @@
+import asyncio
 import hashlib
 import json
 import logging
-import sys
+import threading
 import time
+from typing import Iterator
+
+import metrics
+from cache_backends import CacheBackend, MemoryBackend
+from compression import IDENTITY, decompress, encode, negotiate
+from disk_cache import DiskCache
 
 logger = logging.getLogger(__name__)
 
 
 class CacheService:
-    """In-memory LRU cache with size management."""
+    """Response cache with size management over a pluggable backend.
+
+    The backend (see :mod:`cache_backends`) stores the entries and applies
+    the eviction policy (LRU or cost-aware GreedyDual-Size, switchable with
+    :meth:`update_config`); this class applies the item and size limits.
+    Defaults to the in-process :class:`~cache_backends.MemoryBackend`.
+    Each entry records the seconds it took to compute (``cost``) and may
+    carry a TTL.
+
+    Bodies are stored pre-compressed, once per coding in ``encodings``, and
+    the size limits count the stored (compressed) bytes.  :meth:`put`
+    compresses on the calling thread; callers on the event loop compress
+    elsewhere (see :func:`compression.compute_encoded`) and store the
+    result with :meth:`put_encoded` / :meth:`aput_encoded`.  Use
+    :meth:`encoded_body` to pick the variant for a request's
+    ``Accept-Encoding`` and :meth:`content` for the decoded body.
+
+    With a *disk* tier (:class:`~disk_cache.DiskCache`), every stored entry
+    is also written to disk in the background, and a miss in the backend
+    is looked up there before being reported, promoting a disk hit back
+    into the backend (and counting it as a ``disk_hit`` lookup).  Entries
+    with a TTL stay out of the disk tier.
+
+    :meth:`aget`, :meth:`aput_encoded`, :meth:`aput_entry` and :meth:`aclear`
+    are the versions for the event loop: with a blocking backend (SQLite,
+    whose every hit is a write transaction that may wait on other workers'
+    locks) they run on a thread, and so do disk-tier reads and clears, so
+    the loop never stalls on the cache.
 
-    def __init__(self, max_items: int = 700, max_size_mb: float = 100):
+    With *trace_path*, every lookup and store is appended to that file as a
+    JSON line (key, size, cost, TTL), for replaying the workload through
+    ``benchmarks/bench_eviction.py``.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 700,
+        max_size_mb: float = 100,
+        backend: CacheBackend | None = None,
+        encodings: tuple[str, ...] = ("gzip",),
+        disk: DiskCache | None = None,
+        trace_path: str | None = None,
+    ):
         self.max_items = max_items
         self.max_size_mb = max_size_mb
-        self._store: dict[str, dict] = {}
-        self._access_order: list[str] = []
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.encodings = tuple(encodings) or (IDENTITY,)
+        self.disk = disk
+        self._trace = open(trace_path, "a", encoding="utf-8") if trace_path else None
+        self._trace_lock = threading.Lock()
 
     # ------------------------------------------------------------------
     # Public helpers
@@ -27,64 +77,215 @@ class CacheService:
 
     def get(self, key: str) -> dict | None:
         """Return cached item or None.  Updates LRU order on hit."""
-        if key not in self._store:
-            return None
-        self._touch(key)
-        return self._store[key]
-
-    def put(self, key: str, content: str, media_type: str) -> None:
-        """Store content and evict if limits are exceeded."""
-        content_size = sys.getsizeof(content)
-        self._store[key] = {
-            "content": content,
+        entry = self.backend.get(key)
+        if entry is None and self.disk is not None:
+            return self._promote(key, self.disk.get(key))
+        return self._looked_up(key, entry, "miss" if entry is None else "hit")
+
+    async def aget(self, key: str) -> dict | None:
+        """:meth:`get` for the event loop.
+
+        A blocking backend is read on a thread, and so is the disk tier after
+        a miss; promoting a disk hit into the backend happens back on the loop.
+        """
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, key)
+        entry = self.backend.get(key)
+        if entry is None and self.disk is not None:
+            return self._promote(key, await asyncio.to_thread(self.disk.get, key))
+        return self._looked_up(key, entry, "miss" if entry is None else "hit")
+
+    def _promote(self, key: str, entry: dict | None) -> dict | None:
+        """Copy a disk-tier hit into the backend; *entry* is None on a disk miss too."""
+        if entry is None:
+            return self._looked_up(key, None, "miss")
+        self.backend.put(key, entry)
+        self._evict()
+        return self._looked_up(key, entry, "disk_hit")
+
+    def _looked_up(self, key: str, entry: dict | None, result: str) -> dict | None:
+        metrics.CACHE_LOOKUPS.labels("response", result).inc()
+        if self._trace is not None:
+            self._record({"op": "get", "key": key, "hit": entry is not None})
+        return entry
+
+    def put(
+        self, key: str, content: str | bytes, media_type: str, cost: float = 0.0, ttl: float | None = None
+    ) -> dict:
+        """Compress and store content, evict if limits are exceeded, and return the entry.
+
+        *cost* is the time in seconds it took to produce *content*; *ttl*, if
+        given, expires the entry that many seconds from now.
+        """
+        return self.put_encoded(key, encode(content, self.encodings), media_type, cost, ttl)
+
+    def put_encoded(
+        self, key: str, variants: dict[str, bytes], media_type: str, cost: float = 0.0, ttl: float | None = None
+    ) -> dict:
+        """:meth:`put` for content already compressed into *variants* (coding -> body)."""
+        entry_time = time.time()
+        entry = {
+            "variants": variants,
             "media_type": media_type,
-            "last_used": time.time(),
-            "size": content_size,
+            "last_used": entry_time,
+            "size": sum(len(body) for body in variants.values()),
+            "cost": cost,
+            "expires_at": entry_time + ttl if ttl is not None else None,
         }
-        self._touch(key)
+        self.backend.put(key, entry)
         self._evict()
+        if self.disk is not None and ttl is None:
+            self.disk.put(key, entry)
+        if self._trace is not None:
+            self._record({"op": "put", "key": key, "size": entry["size"], "cost": round(cost, 6), "ttl": ttl})
         logger.info(
-            "Cache STORE (%s bytes) - %d items, %.2fMB",
-            content_size,
-            len(self._store),
+            "Cache STORE (%s bytes stored) - %d items, %.2fMB",
+            entry["size"],
+            len(self.backend),
             self.size_mb,
         )
+        return entry
+
+    async def aput_encoded(
+        self, key: str, variants: dict[str, bytes], media_type: str, cost: float = 0.0, ttl: float | None = None
+    ) -> dict:
+        """:meth:`put_encoded`, off the event loop if the backend blocks."""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.put_encoded, key, variants, media_type, cost, ttl)
+        return self.put_encoded(key, variants, media_type, cost, ttl)
+
+    def put_entry(self, key: str, entry: dict) -> None:
+        """Store an already encoded entry (e.g. from a snapshot) as the most recently used."""
+        entry = {**entry, "last_used": time.time()}
+        self.backend.put(key, entry)
+        self._evict()
+        if self.disk is not None and entry.get("expires_at") is None:
+            self.disk.put(key, entry)
+
+    async def aput_entry(self, key: str, entry: dict) -> None:
+        """:meth:`put_entry`, off the event loop if the backend blocks."""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.put_entry, key, entry)
+        return self.put_entry(key, entry)
+
+    def entries(self) -> Iterator[tuple[str, dict]]:
+        """``(key, entry)`` pairs from least to most recently used.
+
+        Call this on the event loop: the order is taken here, without
+        touching recency or priorities, and the returned iterator can then be
+        drained from a worker thread (as the snapshot export does).
+        """
+        return self.backend.items()
+
+    async def aentries(self) -> Iterator[tuple[str, dict]]:
+        """:meth:`entries`, off the event loop if the backend blocks."""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.entries)
+        return self.entries()
+
+    def negotiated_encoding(self, accept_encoding: str | None) -> str | None:
+        """``Content-Encoding`` a hit would be served with (None for identity)."""
+        encoding = negotiate(accept_encoding, self.encodings)
+        return None if encoding in (None, IDENTITY) else encoding
+
+    @staticmethod
+    def encoded_body(entry: dict, accept_encoding: str | None) -> tuple[bytes, str | None]:
+        """Body to send for *accept_encoding* and its ``Content-Encoding`` (None for identity).
+
+        Serves a stored variant as-is when the client accepts one; otherwise
+        decodes a variant.
+        """
+        variants = entry["variants"]
+        encoding = negotiate(accept_encoding, tuple(variants))
+        if encoding is None:
+            return CacheService.content(entry), None
+        return variants[encoding], None if encoding == IDENTITY else encoding
+
+    @staticmethod
+    def content(entry: dict) -> bytes:
+        """Decoded body of *entry*."""
+        encoding, body = next(iter(entry["variants"].items()))
+        return decompress(body, encoding)
 
     def clear(self) -> None:
-        self._store.clear()
-        self._access_order.clear()
+        self.backend.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        self._update_gauges()
+
+    async def aclear(self) -> None:
+        """:meth:`clear` for the event loop; queueing the disk tier's clear can block, so it runs on a thread."""
+        if self.backend.blocking:
+            await asyncio.to_thread(self.backend.clear)
+        else:
+            self.backend.clear()
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.clear)
+        self._update_gauges()
 
     # ------------------------------------------------------------------
     # Introspection
     # ------------------------------------------------------------------
 
+    @property
+    def size_bytes(self) -> int:
+        return self.backend.size_bytes
+
     @property
     def size_mb(self) -> float:
-        return sum(item["size"] for item in self._store.values()) / (1024 * 1024)
+        return self.size_bytes / (1024 * 1024)
+
+    def limits(self) -> tuple[int, float]:
+        """``(max_items, max_size_mb)`` in force: a shared backend's stored limits, else this instance's."""
+        max_items, max_bytes = self.backend.limits()
+        return (
+            self.max_items if max_items is None else max_items,
+            self.max_size_mb if max_bytes is None else max_bytes / (1024 * 1024),
+        )
 
     def info(self, include_details: bool = False) -> dict:
+        max_items, max_size_mb = self.limits()
         info = {
-            "cache_items": len(self._store),
+            "cache_items": len(self.backend),
             "cache_size_mb": round(self.size_mb, 2),
-            "max_items": self.max_items,
-            "max_size_mb": self.max_size_mb,
+            "max_items": max_items,
+            "max_size_mb": max_size_mb,
+            "backend": self.backend.name,
+            "policy": self.backend.policy,
+            "encodings": list(self.encodings),
+            "backend_stats": self.backend.stats(),
+            "disk": self.disk.info() if self.disk is not None else None,
         }
         if include_details:
-            info["cached_keys"] = list(self._store.keys())
-            info["access_order"] = list(self._access_order)
+            keys = list(self.backend.keys())
+            info["cached_keys"] = keys
+            info["access_order"] = keys
         return info
 
-    def update_config(self, max_items: int | None, max_size_mb: float | None) -> dict:
-        if max_items is not None and max_items > 0:
+    def update_config(self, max_items: int | None, max_size_mb: float | None, policy: str | None = None) -> dict:
+        """Change the limits and/or eviction policy.  Raises ValueError for an unknown policy.
+
+        With a shared backend the change is stored there and applies to every
+        worker process.
+        """
+        if policy is not None:
+            self.backend.set_policy(policy)
+        max_items = max_items if max_items is not None and max_items > 0 else None
+        max_size_mb = max_size_mb if max_size_mb is not None and max_size_mb > 0 else None
+        if max_items is not None:
             self.max_items = max_items
-        if max_size_mb is not None and max_size_mb > 0:
+        if max_size_mb is not None:
             self.max_size_mb = max_size_mb
+        if self.backend.shared and (max_items is not None or max_size_mb is not None):
+            self.backend.set_limits(max_items, None if max_size_mb is None else max_size_mb * 1024 * 1024)
         self._evict()
+        max_items, max_size_mb = self.limits()
         return {
             "message": "Cache configuration updated",
-            "max_items": self.max_items,
-            "max_size_mb": self.max_size_mb,
-            "current_items": len(self._store),
+            "max_items": max_items,
+            "max_size_mb": max_size_mb,
+            "policy": self.backend.policy,
+            "current_items": len(self.backend),
             "current_size_mb": round(self.size_mb, 2),
         }
 
@@ -92,30 +293,24 @@ class CacheService:
     # Internal
     # ------------------------------------------------------------------
 
-    def _touch(self, key: str) -> None:
-        if key in self._access_order:
-            self._access_order.remove(key)
-        self._access_order.append(key)
-        if key in self._store:
-            self._store[key]["last_used"] = time.time()
+    def _record(self, record: dict) -> None:
+        line = json.dumps({"t": round(time.time(), 3), **record}) + "\n"
+        with self._trace_lock:
+            self._trace.write(line)
+            self._trace.flush()
+
+    def _update_gauges(self) -> None:
+        metrics.CACHE_ITEMS.labels("response").set(len(self.backend))
+        metrics.CACHE_BYTES.set(self.size_bytes)
 
     def _evict(self) -> None:
-        evicted = 0
-        while (
-            len(self._store) > self.max_items or self.size_mb > self.max_size_mb
-        ) and self._store:
-            if self._access_order:
-                lru_key = self._access_order.pop(0)
-                if lru_key in self._store:
-                    del self._store[lru_key]
-                    evicted += 1
-            else:
-                del self._store[next(iter(self._store))]
-                evicted += 1
+        evicted = self.backend.evict(self.max_items, self.max_size_mb * 1024 * 1024)
+        self._update_gauges()
         if evicted:
+            metrics.CACHE_EVICTIONS.labels("response").inc(evicted)
             logger.info(
                 "Cache eviction: removed %d items. Now %d items, %.2fMB",
                 evicted,
-                len(self._store),
+                len(self.backend),
                 self.size_mb,
             )
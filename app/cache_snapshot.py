@@ -0,0 +1,109 @@
+"""Binary snapshots of the response cache, for handing a warm cache to a new replica.
+
+A snapshot is a header (magic, format version, namespace) followed by one
+record per entry: key, media type, recorded compute cost and the entry's
+encoded variants packed as in :func:`cache_backends.pack_variants`, so
+bodies are copied as stored, never re-encoded.  A record with an empty key
+ends the stream.  Entries are written from least to most recently used, so
+loading a snapshot into a smaller cache keeps the hottest ones.  Entries
+with a TTL are left out: they are meant to go away.
+
+The namespace ties a snapshot to the kerykeion and output versions that
+produced it; loading one from another namespace is refused.
+"""
+
+import struct
+from typing import BinaryIO, Iterable, Iterator
+
+from cache_backends import pack_variants, unpack_variants
+
+MAGIC = b"AKSNAP\x00\x02"
+_HEADER = struct.Struct("<8sH")  # magic, namespace length
+_RECORD = struct.Struct("<HBId")  # key length, media type length, variants length, cost
+_END = _RECORD.pack(0, 0, 0, 0.0)
+
+
+class SnapshotError(ValueError):
+    """The data is not a snapshot, is truncated, or belongs to another namespace."""
+
+
+def dump(entries: Iterable[tuple[str, dict]], namespace: str) -> Iterator[bytes]:
+    """Encode ``(key, entry)`` pairs as a snapshot, one chunk per entry."""
+    name = namespace.encode("utf-8")
+    yield _HEADER.pack(MAGIC, len(name)) + name
+    for key, entry in entries:
+        if entry.get("expires_at") is not None:
+            continue
+        key_bytes = key.encode("ascii")
+        media_type = entry["media_type"].encode("ascii")
+        variants = pack_variants(entry["variants"])
+        record = _RECORD.pack(len(key_bytes), len(media_type), len(variants), entry.get("cost", 0.0))
+        yield b"".join([record, key_bytes, media_type, variants])
+    yield _END
+
+
+class SnapshotReader:
+    """Incremental decoder: :meth:`feed` chunks as they arrive, get whole entries back."""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._buffer = bytearray()
+        self._header_done = False
+        self.finished = False
+
+    def feed(self, data: bytes) -> list[tuple[str, dict]]:
+        if self.finished:
+            if data:
+                raise SnapshotError("Data after the end of the snapshot")
+            return []
+        self._buffer += data
+        entries = []
+        if not self._header_done and not self._read_header():
+            return entries
+        while not self.finished and len(self._buffer) >= _RECORD.size:
+            key_len, media_len, variants_len, cost = _RECORD.unpack_from(self._buffer)
+            if key_len == 0:
+                del self._buffer[: _RECORD.size]
+                self.finished = True
+                if self._buffer:
+                    raise SnapshotError("Data after the end of the snapshot")
+                break
+            end = _RECORD.size + key_len + media_len + variants_len
+            if len(self._buffer) < end:
+                break
+            view = bytes(self._buffer[_RECORD.size : end])
+            del self._buffer[:end]
+            key = view[:key_len].decode("ascii")
+            media_type = view[key_len : key_len + media_len].decode("ascii")
+            variants = unpack_variants(view[key_len + media_len :])
+            size = sum(map(len, variants.values()))
+            entries.append((key, {"variants": variants, "media_type": media_type, "size": size, "cost": cost}))
+        return entries
+
+    def close(self) -> None:
+        """Raise :class:`SnapshotError` unless the whole snapshot was read."""
+        if not self.finished:
+            raise SnapshotError("Snapshot is truncated")
+
+    def _read_header(self) -> bool:
+        if len(self._buffer) < _HEADER.size:
+            return False
+        magic, name_len = _HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            raise SnapshotError("Not a cache snapshot")
+        if len(self._buffer) < _HEADER.size + name_len:
+            return False
+        namespace = bytes(self._buffer[_HEADER.size : _HEADER.size + name_len]).decode("utf-8")
+        if namespace != self.namespace:
+            raise SnapshotError(f"Snapshot is from {namespace!r}, this server is {self.namespace!r}")
+        del self._buffer[: _HEADER.size + name_len]
+        self._header_done = True
+        return True
+
+
+def read_file(fh: BinaryIO, namespace: str, chunk_size: int = 1 << 20) -> Iterator[tuple[str, dict]]:
+    """Entries of the snapshot in an open binary file."""
+    reader = SnapshotReader(namespace)
+    while chunk := fh.read(chunk_size):
+        yield from reader.feed(chunk)
+    reader.close()
@@ -0,0 +1,438 @@
+"""Synchronous chart builders executed on the compute pool.
+
+Building a chart is split in two steps:
+
+1. *compute* — subjects, and lazily the aspects and ``ChartDataFactory``
+   output.  The result is a :class:`ComputedChart`, memoized in
+   ``chart_data_cache`` under a key that does not include the output format.
+2. *render* — the JSON body or the SVG, built cheaply from the computed chart.
+   JSON can be limited to some :data:`SECTIONS`; aspects and the context
+   text are only computed when their section is rendered.
+
+A client asking for the JSON and then the SVG of the same chart therefore
+pays for the astrology only once.  The computation is keyed and run on the
+normalized inputs (see :mod:`normalization`): display labels are applied
+afterwards, so the same sky under another name, city or nation, at
+coordinates that differ only past the rounding, or as a composite with its
+subjects in the other order, is computed once.  :func:`build_chart` is a
+module-level function so it can be shipped to a process pool as well as a
+thread pool.
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from kerykeion import AspectsFactory, to_context
+from kerykeion.chart_data_factory import ChartDataFactory
+from kerykeion.composite_subject_factory import CompositeSubjectFactory
+from kerykeion.planetary_return_factory import PlanetaryReturnFactory
+from kerykeion.schemas.kr_models import AstrologicalSubjectModel
+
+import metrics
+from chart_helpers import MemoCache, create_subject, generate_svg
+from compute_pool import ComputeError
+from normalization import NormalizedParams, data_labels, normalize, relabel, token
+from serialization import dumps
+from themes import DEFAULT_THEME
+
+logger = logging.getLogger(__name__)
+
+CHART_DATA_CACHE_MAX_ITEMS = int(os.getenv("CHART_DATA_CACHE_MAX_ITEMS", "512"))
+
+# JSON sections a client can ask for with ``include=``; None means all of them.
+SECTIONS = ("positions", "houses", "aspects", "context")
+
+_SUBJECT_FIELDS = AstrologicalSubjectModel.model_fields
+HOUSE_FIELDS = frozenset(name for name in _SUBJECT_FIELDS if name.endswith("_house")) | {"houses_names_list"}
+POSITION_FIELDS = frozenset(
+    name
+    for name, info in _SUBJECT_FIELDS.items()
+    if name not in HOUSE_FIELDS and any(t in str(info.annotation) for t in ("KerykeionPointModel", "LunarPhaseModel"))
+) | {"active_points"}
+
+
+@dataclass
+class ComputedChart:
+    """Format-independent result of a chart computation."""
+
+    subjects: dict[str, Any]
+    make_aspects: Callable[[], list] = field(repr=False)
+    make_chart_data: Callable[[], Any] = field(repr=False)
+    # Labels derived from the requested ones, as templates over their tokens.
+    label_templates: dict[str, str] = field(default_factory=dict)
+    # Where the label tokens are in this chart (see normalization.relabel).
+    label_plan: dict = field(default_factory=dict, repr=False)
+    _aspects: list | None = field(default=None, repr=False)
+    _chart_data: Any = field(default=None, repr=False)
+
+    @property
+    def aspects(self) -> list:
+        """Aspect list, computed on first use."""
+        if self._aspects is None:
+            with metrics.stage("aspects"):
+                self._aspects = self.make_aspects()
+        return self._aspects
+
+    @property
+    def chart_data(self):
+        """``ChartDataFactory`` output, built on first use."""
+        if self._chart_data is None:
+            with metrics.stage("chart_data"):
+                self._chart_data = self.make_chart_data()
+        return self._chart_data
+
+
+@dataclass
+class LabelledChart:
+    """A (shared, memoized) :class:`ComputedChart` with one request's labels applied.
+
+    Subjects are relabelled up front; aspects and chart data when first used.
+    """
+
+    computed: ComputedChart
+    labels: dict[str, str]
+    swap_pair: bool = False
+    subjects: dict[str, Any] = field(init=False)
+    _aspects: list | None = field(default=None, repr=False)
+    _chart_data: Any = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self.subjects = self._relabel(self.computed.subjects)
+
+    @property
+    def aspects(self) -> list:
+        if self._aspects is None:
+            aspects = self.computed.aspects
+            self._aspects = self._relabel(aspects)
+        return self._aspects
+
+    @property
+    def chart_data(self):
+        if self._chart_data is None:
+            chart_data = self.computed.chart_data
+            self._chart_data = self._relabel(chart_data)
+        return self._chart_data
+
+    def _relabel(self, obj):
+        with metrics.stage("relabel"):
+            return relabel(obj, self.labels, self.swap_pair, self.computed.label_plan)
+
+
+@dataclass(frozen=True)
+class ChartSpec:
+    compute: Callable[[dict], ComputedChart]
+    to_json: Callable[[LabelledChart, dict, frozenset | None], dict]
+    svg_prefix: str
+    failure_label: str | None = None
+    # Symmetric pair charts are computed with their subjects in canonical order.
+    symmetric: bool = False
+
+
+chart_data_cache = MemoCache(CHART_DATA_CACHE_MAX_ITEMS, name="chart_data")
+
+
+def _subject(p: dict, suffix: str = "", prefix: str = "", name: str | None = None):
+    """Create a subject from the ``<prefix>field<suffix>`` entries of *p*."""
+
+    def value(key: str):
+        return p[f"{prefix}{key}{suffix}"]
+
+    return create_subject(
+        name if name is not None else value("name"),
+        value("year"), value("month"), value("day"),
+        value("hour"), value("minute"),
+        value("city"), value("nation"),
+        value("lng"), value("lat"), value("tz_str"),
+    )
+
+
+def _dump_aspects(aspects: list) -> list[dict]:
+    return [a.model_dump() for a in aspects]
+
+
+def _dump_subject(subject, include: frozenset | None) -> dict:
+    """``model_dump`` of *subject* without the position/house fields not in *include*."""
+    if include is None:
+        return subject.model_dump()
+    skipped = set()
+    if "positions" not in include:
+        skipped |= POSITION_FIELDS
+    if "houses" not in include:
+        skipped |= HOUSE_FIELDS
+    fields = type(subject).model_fields
+    exclude: dict[str, Any] = {name: True for name in skipped if name in fields}
+    # Composite subjects embed both source subjects; trim those the same way.
+    for nested in ("first_subject", "second_subject"):
+        if nested in fields:
+            exclude[nested] = {name: True for name in skipped}
+    return subject.model_dump(exclude=exclude)
+
+
+def _wants(include: frozenset | None, section: str) -> bool:
+    return include is None or section in include
+
+
+def _render_json(data: dict, pretty: bool = False) -> bytes:
+    with metrics.stage("serialize"):
+        return dumps(data, pretty=pretty)
+
+
+def _context(subject) -> str:
+    with metrics.stage("context"):
+        return to_context(subject)
+
+
+def _render_svg(chart_data, prefix: str, theme: str) -> str:
+    try:
+        return generate_svg(chart_data, prefix=prefix, theme=theme)
+    except Exception as e:
+        raise ComputeError(500, f"SVG generation failed: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Natal
+# ---------------------------------------------------------------------------
+
+
+def _compute_birth(p: dict) -> ComputedChart:
+    subject = _subject(p)
+    computed = ComputedChart(
+        subjects={"subject": subject},
+        # Natal chart data carries the same aspects as AspectsFactory.single_chart_aspects.
+        make_aspects=lambda: computed.chart_data.aspects,
+        make_chart_data=lambda: ChartDataFactory.create_natal_chart_data(subject),
+    )
+    return computed
+
+
+def _birth_json(c: LabelledChart, p: dict, include: frozenset | None = None) -> dict:
+    subject = c.subjects["subject"]
+    subject_dict = _dump_subject(subject, include)
+    if _wants(include, "aspects"):
+        subject_dict["aspects"] = _dump_aspects(c.aspects)
+    if _wants(include, "context"):
+        subject_dict["context"] = _context(subject)
+    return subject_dict
+
+
+# ---------------------------------------------------------------------------
+# Synastry
+# ---------------------------------------------------------------------------
+
+
+def _compute_synastry(p: dict) -> ComputedChart:
+    subject1 = _subject(p, suffix="1")
+    subject2 = _subject(p, suffix="2")
+    return ComputedChart(
+        subjects={"subject1": subject1, "subject2": subject2},
+        make_aspects=lambda: AspectsFactory.synastry_aspects(subject1, subject2).aspects,
+        make_chart_data=lambda: ChartDataFactory.create_synastry_chart_data(subject1, subject2),
+    )
+
+
+def _synastry_json(c: LabelledChart, p: dict, include: frozenset | None = None) -> dict:
+    subject1, subject2 = c.subjects["subject1"], c.subjects["subject2"]
+    data = {
+        "subject1": _dump_subject(subject1, include),
+        "subject2": _dump_subject(subject2, include),
+    }
+    if _wants(include, "aspects"):
+        data["aspects"] = _dump_aspects(c.aspects)
+    if _wants(include, "context"):
+        data["context"] = (
+            f"--- Synastry Context ---\n\n"
+            f"# {p['name1']}'s Chart\n{_context(subject1)}\n\n"
+            f"# {p['name2']}'s Chart\n{_context(subject2)}"
+        )
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Transit
+# ---------------------------------------------------------------------------
+
+
+def _compute_transit(p: dict) -> ComputedChart:
+    natal_subject = _subject(p)
+    transit_subject = _subject(p, prefix="t_", name="Transit")
+    return ComputedChart(
+        subjects={"natal": natal_subject, "transit": transit_subject},
+        make_aspects=lambda: AspectsFactory.synastry_aspects(natal_subject, transit_subject).aspects,
+        make_chart_data=lambda: ChartDataFactory.create_transit_chart_data(natal_subject, transit_subject),
+    )
+
+
+def _transit_json(c: LabelledChart, p: dict, include: frozenset | None = None) -> dict:
+    natal_subject, transit_subject = c.subjects["natal"], c.subjects["transit"]
+    data = {
+        "natal": _dump_subject(natal_subject, include),
+        "transit": _dump_subject(transit_subject, include),
+    }
+    if _wants(include, "aspects"):
+        data["aspects"] = _dump_aspects(c.aspects)
+    if _wants(include, "context"):
+        data["context"] = (
+            f"--- Transit Context ---\n\n"
+            f"# {p['name']}'s Natal Chart\n{_context(natal_subject)}\n\n"
+            f"# Transit Sky Chart\n{_context(transit_subject)}"
+        )
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Solar & lunar returns
+# ---------------------------------------------------------------------------
+
+
+def _compute_return(p: dict, return_type: str, role: str, year: int, month: int, day: int) -> ComputedChart:
+    natal_subject = _subject(p)
+    return_factory = PlanetaryReturnFactory(natal_subject, lng=p["lng"], lat=p["lat"], tz_str=p["tz_str"], online=False)
+    return_subject = return_factory.next_return_from_date(year, month, day, return_type=return_type)
+    return ComputedChart(
+        subjects={"natal": natal_subject, role: return_subject},
+        make_aspects=lambda: AspectsFactory.synastry_aspects(natal_subject, return_subject).aspects,
+        make_chart_data=lambda: ChartDataFactory.create_return_chart_data(natal_subject, return_subject),
+    )
+
+
+def _compute_solar_return(p: dict) -> ComputedChart:
+    return _compute_return(p, "Solar", "solar_return", p["return_year"], 1, 1)
+
+
+def _solar_return_json(c: LabelledChart, p: dict, include: frozenset | None = None) -> dict:
+    natal_subject, solar_return_subject = c.subjects["natal"], c.subjects["solar_return"]
+    data = {
+        "natal": _dump_subject(natal_subject, include),
+        "solar_return": _dump_subject(solar_return_subject, include),
+    }
+    if _wants(include, "aspects"):
+        data["aspects"] = _dump_aspects(c.aspects)
+    if _wants(include, "context"):
+        data["context"] = (
+            f"--- Solar Return Context ({p['return_year']}) ---\n\n"
+            f"# Natal Chart\n{_context(natal_subject)}\n\n"
+            f"# Solar Return Chart\n{_context(solar_return_subject)}"
+        )
+    return data
+
+
+def _compute_lunar_return(p: dict) -> ComputedChart:
+    return _compute_return(p, "Lunar", "lunar_return", p["return_year"], p["return_month"], p["return_day"])
+
+
+def _lunar_return_json(c: LabelledChart, p: dict, include: frozenset | None = None) -> dict:
+    natal_subject, lunar_return_subject = c.subjects["natal"], c.subjects["lunar_return"]
+    data = {
+        "natal": _dump_subject(natal_subject, include),
+        "lunar_return": _dump_subject(lunar_return_subject, include),
+    }
+    if _wants(include, "aspects"):
+        data["aspects"] = _dump_aspects(c.aspects)
+    if _wants(include, "context"):
+        data["context"] = (
+            f"--- Lunar Return Context (Search from {p['return_year']}-{p['return_month']}-{p['return_day']}) ---\n\n"
+            f"# Natal Chart\n{_context(natal_subject)}\n\n"
+            f"# Lunar Return Chart\n{_context(lunar_return_subject)}"
+        )
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Composite
+# ---------------------------------------------------------------------------
+
+
+def _compute_composite(p: dict) -> ComputedChart:
+    s1 = _subject(p, suffix="1")
+    s2 = _subject(p, suffix="2")
+
+    composite_factory = CompositeSubjectFactory(s1, s2)
+    composite_subject = composite_factory.get_midpoint_composite_subject_model()
+    # The name combines both subjects' names in the requested order, which the
+    # canonical order may have swapped: give it a token of its own.
+    name_template = composite_subject.name
+    composite_subject = composite_subject.model_copy(update={"name": token("composite")})
+
+    computed = ComputedChart(
+        subjects={"composite_subject": composite_subject},
+        make_aspects=lambda: computed.chart_data.aspects,
+        make_chart_data=lambda: ChartDataFactory.create_composite_chart_data(composite_subject),
+        label_templates={"composite": name_template},
+    )
+    return computed
+
+
+def _composite_json(c: LabelledChart, p: dict, include: frozenset | None = None) -> dict:
+    composite_subject = c.subjects["composite_subject"]
+    data = {"composite_subject": _dump_subject(composite_subject, include)}
+    if _wants(include, "aspects"):
+        data["aspects"] = _dump_aspects(c.aspects)
+    if _wants(include, "context"):
+        data["context"] = _context(composite_subject)
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Dispatch
+# ---------------------------------------------------------------------------
+
+
+CHART_SPECS = {
+    "birth": ChartSpec(_compute_birth, _birth_json, "birth"),
+    "synastry": ChartSpec(_compute_synastry, _synastry_json, "synastry"),
+    "transit": ChartSpec(_compute_transit, _transit_json, "transit"),
+    "solar_return": ChartSpec(_compute_solar_return, _solar_return_json, "solar_return", "Solar return"),
+    "lunar_return": ChartSpec(_compute_lunar_return, _lunar_return_json, "lunar_return", "Lunar return"),
+    "composite": ChartSpec(_compute_composite, _composite_json, "composite", "Composite", symmetric=True),
+}
+
+
+def _apply_labels(computed: ComputedChart, normalized: NormalizedParams) -> LabelledChart:
+    labels = dict(data_labels(normalized))
+    for name, template in computed.label_templates.items():
+        labels[name] = relabel(template, normalized.labels)
+    return LabelledChart(computed, labels, swap_pair=normalized.swapped)
+
+
+def compute_chart(chart_type: str, p: dict) -> LabelledChart:
+    """Return the chart for *p* with its labels, reusing ``chart_data_cache`` when possible.
+
+    The cache holds the label-free computation, keyed by the normalized inputs.
+    """
+    spec = CHART_SPECS[chart_type]
+    normalized = normalize(p, symmetric=spec.symmetric)
+    key = (chart_type, tuple(sorted(normalized.compute.items())))
+    computed = chart_data_cache.get(key)
+    if computed is None:
+        computed = spec.compute(normalized.compute)
+        chart_data_cache.put(key, computed)
+    return _apply_labels(computed, normalized)
+
+
+def build_chart(
+    chart_type: str,
+    p: dict,
+    svg: bool,
+    theme: str = DEFAULT_THEME,
+    pretty: bool = False,
+    include: frozenset | None = None,
+) -> str | bytes:
+    """Compute (or reuse) the chart for *p* and render it as JSON bytes or SVG text.
+
+    *include* limits the JSON to those :data:`SECTIONS` (None for all).
+    """
+    spec = CHART_SPECS[chart_type]
+    computed = compute_chart(chart_type, p)
+
+    if not svg:
+        return _render_json(spec.to_json(computed, p, include), pretty)
+
+    if spec.failure_label is None:
+        return _render_svg(computed.chart_data, spec.svg_prefix, theme)
+    try:
+        return _render_svg(computed.chart_data, spec.svg_prefix, theme)
+    except Exception as e:
+        logger.exception("%s calculation failed", spec.failure_label)
+        raise ComputeError(500, f"{spec.failure_label} generation failed: {e}")
@@ -3,16 +3,83 @@
 import logging
 import os
 import shutil
+import threading
 import uuid
+from collections import OrderedDict
 from pathlib import Path
 
 from kerykeion import AstrologicalSubjectFactory
 from kerykeion.charts.chart_drawer import ChartDrawer
 
+import metrics
+from themes import DEFAULT_THEME, theme_registry
+
 logger = logging.getLogger(__name__)
 
 BASE_OUTPUT_DIR = os.getenv("CHART_OUTPUT_DIR", "/tmp/astral-kerykeion/output")
-CSS_PATH = "./themes/astral.css"
+# "memory" renders straight from ChartDrawer's template; "file" keeps the old save/read-back path.
+SVG_RENDER_MODE = os.getenv("SVG_RENDER_MODE", "memory").strip().lower()
+SUBJECT_CACHE_MAX_ITEMS = int(os.getenv("SUBJECT_CACHE_MAX_ITEMS", "2048"))
+
+
+class MemoCache:
+    """Small thread-safe LRU memo with hit/miss counters.
+
+    Used for intermediate computation results that are shared between
+    endpoints, independently of the response cache.  The counters are also
+    exported to Prometheus under ``cache=name``.
+    """
+
+    def __init__(self, max_items: int, name: str = "memo"):
+        self.max_items = max_items
+        self.name = name
+        self._store: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._store.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self._store.move_to_end(key)
+                self.hits += 1
+        metrics.CACHE_LOOKUPS.labels(self.name, "miss" if value is None else "hit").inc()
+        return value
+
+    def put(self, key, value) -> None:
+        evicted = 0
+        with self._lock:
+            self._store[key] = value
+            self._store.move_to_end(key)
+            while len(self._store) > self.max_items:
+                self._store.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+            items = len(self._store)
+        if evicted:
+            metrics.CACHE_EVICTIONS.labels(self.name).inc(evicted)
+        metrics.CACHE_ITEMS.labels(self.name).set(items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+        metrics.CACHE_ITEMS.labels(self.name).set(0)
+
+    def info(self) -> dict:
+        return {
+            "items": len(self._store),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+subject_cache = MemoCache(SUBJECT_CACHE_MAX_ITEMS, name="subject")
 
 
 def create_subject(
@@ -27,50 +94,81 @@ def create_subject(
     lng: float,
     lat: float,
     tz_str: str,
+    houses_system_identifier: str = "P",
 ):
-    """Create an AstrologicalSubject from birth data (offline)."""
-    return AstrologicalSubjectFactory.from_birth_data(
-        name, year, month, day, hour, minute,
-        city, nation,
-        lng=lng, lat=lat, tz_str=tz_str, online=False,
-    )
+    """Create an AstrologicalSubject from birth data (offline).
 
-
-def embed_css_in_svg(svg_text: str, css_path: str = CSS_PATH) -> str:
-    """Read *css_path* and inject it into *svg_text*."""
-    try:
-        with open(css_path, "r", encoding="utf-8") as f:
-            css_content = f.read()
-    except FileNotFoundError:
+    Subjects are memoized on the data that affects the computation; *name*,
+    *city* and *nation* are display labels applied to a copy afterwards, so
+    the same birth data under another label is not recomputed.
+    """
+    key = (year, month, day, hour, minute, float(lng), float(lat), tz_str, houses_system_identifier)
+    subject = subject_cache.get(key)
+    if subject is None:
+        with metrics.stage("subject"):
+            subject = AstrologicalSubjectFactory.from_birth_data(
+                name, year, month, day, hour, minute,
+                city, nation,
+                lng=lng, lat=lat, tz_str=tz_str, online=False,
+                houses_system_identifier=houses_system_identifier,
+            )
+        subject_cache.put(key, subject)
+    return subject.model_copy(update={"name": name, "city": city, "nation": nation})
+
+
+def embed_css_in_svg(svg_text: str, theme: str = DEFAULT_THEME) -> str:
+    """Inject the CSS of *theme* into *svg_text*.
+
+    kerykeion emits a single ``<style>`` block near the top of the document,
+    so the first ``</style>`` is found after scanning only the header and the
+    CSS is spliced in with one concatenation.
+    """
+    registered = theme_registry.get(theme)
+    if registered is None:
         return svg_text
 
-    if "</style>" in svg_text:
-        return svg_text.replace("</style>", f"\n{css_content}\n</style>")
+    style_end = svg_text.find("</style>")
+    if style_end != -1:
+        return svg_text[:style_end] + registered.style_block + svg_text[style_end:]
 
-    if "<svg" in svg_text:
-        svg_start = svg_text.find("<svg")
-        if svg_start != -1:
-            svg_tag_end = svg_text.find(">", svg_start)
-            if svg_tag_end != -1:
-                style_tag = (
-                    f'\n<style type="text/css">\n<![CDATA[\n{css_content}\n]]>\n</style>\n'
-                )
-                return svg_text[: svg_tag_end + 1] + style_tag + svg_text[svg_tag_end + 1 :]
+    svg_start = svg_text.find("<svg")
+    if svg_start != -1:
+        svg_tag_end = svg_text.find(">", svg_start)
+        if svg_tag_end != -1:
+            return svg_text[: svg_tag_end + 1] + registered.style_tag + svg_text[svg_tag_end + 1 :]
 
     return svg_text
 
 
-def generate_svg(chart_data, prefix: str = "chart", chart_language: str = "ES") -> str:
-    """Draw a chart to SVG, embed CSS, and return the SVG string.
+def generate_svg(
+    chart_data,
+    prefix: str = "chart",
+    chart_language: str = "ES",
+    render_mode: str | None = None,
+    theme: str = DEFAULT_THEME,
+) -> str:
+    """Draw a chart to SVG, embed the *theme* CSS, and return the SVG string.
 
-    Handles temp-directory creation and cleanup internally.
+    Rendering happens in memory unless *render_mode* (default
+    ``SVG_RENDER_MODE``) is ``"file"``.
     """
+    with metrics.stage("svg_render"):
+        chart = ChartDrawer(chart_data=chart_data, chart_language=chart_language)
+        if (render_mode or SVG_RENDER_MODE) == "file":
+            svg_text = _render_svg_via_file(chart, prefix)
+        else:
+            svg_text = chart.generate_svg_string()
+    with metrics.stage("css_embed"):
+        return embed_css_in_svg(svg_text, theme)
+
+
+def _render_svg_via_file(chart: ChartDrawer, prefix: str) -> str:
+    """Render through ``ChartDrawer.save_svg`` in a throwaway temp directory."""
     os.makedirs(BASE_OUTPUT_DIR, exist_ok=True)
     temp_dir = os.path.join(BASE_OUTPUT_DIR, uuid.uuid4().hex)
     os.makedirs(temp_dir, exist_ok=True)
 
     try:
-        chart = ChartDrawer(chart_data=chart_data, chart_language=chart_language)
         filename = f"{prefix}_{uuid.uuid4().hex}"
         chart.save_svg(output_path=Path(temp_dir), filename=filename)
 
@@ -79,8 +177,6 @@ def generate_svg(chart_data, prefix: str = "chart", chart_language: str = "ES")
             raise RuntimeError("SVG generation failed: no file created")
 
         with open(svg_path, "r", encoding="utf-8") as f:
-            svg_text = f.read()
-
-        return embed_css_in_svg(svg_text)
+            return f.read()
     finally:
         shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,73 @@
+"""Pydantic models for chart parameters supplied in request bodies.
+
+The GET endpoints declare their parameters as ``Query`` arguments; these
+models mirror them (same names, types and defaults) for endpoints that take
+chart specs as JSON, such as ``POST /gen/batch``.
+"""
+
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field, create_model
+
+from themes import DEFAULT_THEME
+
+ChartType = Literal["birth", "synastry", "transit", "solar_return", "lunar_return", "composite"]
+
+
+def _subject_fields(suffix: str = "", prefix: str = "", with_name: bool = True) -> dict:
+    fields = {
+        f"{prefix}year{suffix}": (int, ...),
+        f"{prefix}month{suffix}": (int, ...),
+        f"{prefix}day{suffix}": (int, ...),
+        f"{prefix}hour{suffix}": (int, ...),
+        f"{prefix}minute{suffix}": (int, ...),
+        f"{prefix}city{suffix}": (str, ...),
+        f"{prefix}lng{suffix}": (float, ...),
+        f"{prefix}lat{suffix}": (float, ...),
+        f"{prefix}tz_str{suffix}": (str, ...),
+        f"{prefix}nation{suffix}": (str, " "),
+    }
+    if with_name:
+        fields = {f"{prefix}name{suffix}": (str, ...), **fields}
+    return fields
+
+
+BirthParams = create_model("BirthParams", **_subject_fields())
+SynastryParams = create_model("SynastryParams", **_subject_fields("1"), **_subject_fields("2"))
+TransitParams = create_model("TransitParams", **_subject_fields(), **_subject_fields(prefix="t_", with_name=False))
+SolarReturnParams = create_model("SolarReturnParams", **_subject_fields(), return_year=(int, ...))
+LunarReturnParams = create_model(
+    "LunarReturnParams",
+    **_subject_fields(),
+    return_year=(int, ...),
+    return_month=(int, ...),
+    return_day=(int, ...),
+)
+CompositeParams = create_model("CompositeParams", **_subject_fields("1"), **_subject_fields("2"))
+
+CHART_PARAM_MODELS: dict[str, type[BaseModel]] = {
+    "birth": BirthParams,
+    "synastry": SynastryParams,
+    "transit": TransitParams,
+    "solar_return": SolarReturnParams,
+    "lunar_return": LunarReturnParams,
+    "composite": CompositeParams,
+}
+
+
+class ChartRequest(BaseModel):
+    """One chart in a batch: its type, parameters and output options."""
+
+    id: str | None = Field(None, description="Client reference echoed back in the result")
+    type: ChartType
+    params: dict[str, Any]
+    svg: bool = False
+    theme: str = DEFAULT_THEME
+
+
+def validate_params(chart_type: str, params: dict) -> dict:
+    """Validate *params* for *chart_type* and return them with defaults applied.
+
+    Raises ``pydantic.ValidationError`` on missing or malformed fields.
+    """
+    return CHART_PARAM_MODELS[chart_type].model_validate(params).model_dump()
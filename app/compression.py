@@ -0,0 +1,109 @@
+"""Content codings for cached responses and ``Accept-Encoding`` negotiation.
+
+``gzip`` is always available; ``br`` and ``zstd`` are used when the
+``brotli`` / ``zstandard`` packages are installed.  Bodies are compressed
+once when they enter the cache, so the levels favour ratio over speed; that
+makes compression CPU work of its own, which :func:`compute_encoded` lets a
+compute pool job do next to the computation instead of on the event loop.
+"""
+
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+IDENTITY = "identity"
+
+_COMPRESSORS = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+_DECOMPRESSORS = {"gzip": gzip.decompress}
+if brotli is not None:
+    _COMPRESSORS["br"] = lambda data: brotli.compress(data, quality=9)
+    _DECOMPRESSORS["br"] = brotli.decompress
+if zstandard is not None:
+    _COMPRESSORS["zstd"] = lambda data: zstandard.ZstdCompressor(level=12).compress(data)
+    _DECOMPRESSORS["zstd"] = lambda data: zstandard.ZstdDecompressor().decompress(data)
+
+AVAILABLE_ENCODINGS = (*_COMPRESSORS, IDENTITY)
+
+
+def encodings_from_env(default: str = "br,zstd,gzip") -> tuple[str, ...]:
+    """Encodings to store, from ``CACHE_ENCODINGS``, keeping only the available ones.
+
+    Falls back to ``identity`` (no compression) when none is available.
+    """
+    wanted = [e.strip().lower() for e in os.getenv("CACHE_ENCODINGS", default).split(",") if e.strip()]
+    encodings = tuple(e for e in wanted if e in AVAILABLE_ENCODINGS)
+    return encodings or (IDENTITY,)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == IDENTITY:
+        return data
+    return _COMPRESSORS[encoding](data)
+
+
+def encode(content: str | bytes, encodings: tuple[str, ...]) -> dict[str, bytes]:
+    """*content* (UTF-8 if a string) compressed once per coding in *encodings*."""
+    raw = content.encode("utf-8") if isinstance(content, str) else bytes(content)
+    return {encoding: compress(raw, encoding) for encoding in encodings}
+
+
+def compute_encoded(encodings: tuple[str, ...], fn, *args) -> dict[str, bytes]:
+    """``fn(*args)`` run through :func:`encode`, for running both as one pool job."""
+    return encode(fn(*args), encodings)
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == IDENTITY:
+        return data
+    return _DECOMPRESSORS[encoding](data)
+
+
+def parse_accept_encoding(header: str | None) -> dict[str, float]:
+    """Map each coding in an ``Accept-Encoding`` header to its q-value."""
+    accepted: dict[str, float] = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: str | None, offered: tuple[str, ...]) -> str | None:
+    """Pick the coding from *offered* (in server preference order) that the client accepts.
+
+    Returns None when the client accepts none of them.  ``identity`` is
+    acceptable unless explicitly refused, per RFC 9110.
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*")
+
+    def q(coding: str) -> float:
+        if coding in accepted:
+            return accepted[coding]
+        if wildcard is not None:
+            return wildcard
+        return 1.0 if coding == IDENTITY else 0.0
+
+    best = max(offered, key=q, default=None)
+    if best is None or q(best) <= 0:
+        return None
+    return best
@@ -0,0 +1,218 @@
+"""Bounded executor for running chart computation off the event loop."""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import pickle
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the compute pool has no free worker or queue slot."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Compute pool saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ComputeError(Exception):
+    """Error with an HTTP status for a job to raise on the pool.
+
+    Unlike ``fastapi.HTTPException`` it survives the round trip from a
+    process pool worker; the app maps it back to a response with
+    ``status_code`` and ``detail``.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+    def __str__(self) -> str:
+        return self.detail
+
+
+def _run_in_process(call):
+    """Run *call* in a pool process, making sure whatever it raises can be sent back.
+
+    An exception that pickles but fails to unpickle (such as an
+    ``HTTPException``) would otherwise break the whole process pool.
+    """
+    try:
+        return call()
+    except Exception as e:
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            raise ComputeError(getattr(e, "status_code", 500), str(getattr(e, "detail", e))) from None
+        raise
+
+
+class ComputePool:
+    """Thread- or process-pool with a hard cap on in-flight work.
+
+    At most ``max_workers`` jobs run concurrently and at most ``max_queue``
+    more wait for a worker.  Anything beyond that is rejected immediately
+    with :class:`PoolSaturatedError` so callers can shed load instead of
+    piling up behind slow renders.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 2,
+        max_queue: int = 16,
+        retry_after: int = 1,
+        name: str = "compute",
+    ):
+        if kind not in {"thread", "process"}:
+            raise ValueError(f"Unknown compute pool kind: {kind!r}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self.name = name
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @classmethod
+    def from_env(
+        cls,
+        prefix: str = "COMPUTE_POOL",
+        kind: str = "thread",
+        max_workers: int = 2,
+        max_queue: int = 16,
+    ) -> "ComputePool":
+        """Build a pool from ``<prefix>_KIND``, ``_WORKERS``, ``_MAX_QUEUE`` and ``_RETRY_AFTER``.
+
+        The keyword arguments are the defaults used when a variable is unset.
+        The pool's metrics name is the prefix without ``_POOL``, lowercased.
+        """
+        return cls(
+            kind=os.getenv(f"{prefix}_KIND", kind).strip().lower(),
+            max_workers=int(os.getenv(f"{prefix}_WORKERS", str(max_workers))),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", str(max_queue))),
+            retry_after=int(os.getenv(f"{prefix}_RETRY_AFTER", "1")),
+            name=prefix.lower().removesuffix("_pool"),
+        )
+
+    # ------------------------------------------------------------------
+    # Public helpers
+    # ------------------------------------------------------------------
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        """Jobs running or waiting on the pool."""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of submitted jobs still waiting for a worker."""
+        return max(0, self._in_flight - self.max_workers)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the pool and await its result.
+
+        Raises :class:`PoolSaturatedError` without queueing when the pool is full.
+        Jobs should raise :class:`ComputeError` for errors with an HTTP status.
+        If a process worker dies, the job fails with ``BrokenProcessPool`` and
+        the next one gets a fresh executor.
+        A job counts against the cap until it finishes on the pool, even if
+        the awaiting coroutine is cancelled first.  On a thread pool the call
+        runs in a copy of the caller's context, so context variables (such as
+        per-request timings) carry over.
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                metrics.POOL_REJECTED.labels(self.name).inc()
+                raise PoolSaturatedError(self.retry_after)
+            self._in_flight += 1
+            executor = self._get_executor()
+            self._update_gauges()
+
+        call = functools.partial(fn, *args, **kwargs)
+        if self.kind == "thread":
+            call = functools.partial(contextvars.copy_context().run, call)
+        else:
+            call = functools.partial(_run_in_process, call)
+        try:
+            future = executor.submit(call)
+        except BaseException:
+            self._job_done(None)
+            raise
+        # Count the job until it actually finishes, not until this coroutine
+        # stops waiting: a cancelled caller leaves a started job running.
+        future.add_done_callback(self._job_done)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died; start a fresh executor for the next job instead of failing them all.
+            self._discard_executor(executor)
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+
+    def _discard_executor(self, executor: Executor) -> None:
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning("Compute pool %s: worker process died, restarting the executor", self.name)
+
+    def _job_done(self, future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        metrics.POOL_IN_FLIGHT.labels(self.name).set(self._in_flight)
+        metrics.POOL_QUEUE_DEPTH.labels(self.name).set(self.queue_depth)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="chart-compute"
+                )
+            logger.info("Compute pool started: %s x%d", self.kind, self.max_workers)
+        return self._executor
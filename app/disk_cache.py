@@ -0,0 +1,327 @@
+"""Optional on-disk second tier for the response cache.
+
+Entries are written one file per key under ``<path>/<namespace>/``, sharded
+by the first two hex digits of the key, each file holding a small header,
+the media type and the packed encoded variants.  The directory is the
+index: it is scanned once at startup into an in-memory LRU (oldest
+modification time first), so a restarted or redeployed worker starts with
+the charts its predecessor computed.  The namespace encodes the kerykeion
+and output versions; directories of other namespaces are removed at
+startup because their charts may differ.  Only directories carrying this
+class's marker file are ever removed, so pointing ``CACHE_DISK_PATH`` at a
+directory shared with other data is safe.
+
+Reads happen on the caller's thread and cost one small file read (the
+service's ``aget`` makes them on a worker thread).  Writes, LRU touches and
+evictions go through a single background thread, so a store never blocks a
+request; when its queue is full the write is dropped (and counted).  Workers on the same host share the directory: a key another
+worker wrote is found by checking for its file, and each worker enforces
+``max_bytes`` over the files it knows about.
+"""
+
+import logging
+import os
+import queue
+import shutil
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from cache_backends import pack_variants, unpack_variants
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISK_MAX_MB = 1024
+DEFAULT_DISK_QUEUE = 256
+
+_MAGIC = b"AKC2"
+_HEADER = struct.Struct("<4sIdH")  # magic, stored size, compute cost, media type length
+_SUFFIX = ".entry"
+# Written into every namespace directory this class creates; nothing else is removed.
+_MARKER = ".astral-kerykeion-cache"
+
+
+def _encode(entry: dict) -> bytes:
+    media_type = entry["media_type"].encode("ascii")
+    return b"".join(
+        [
+            _HEADER.pack(_MAGIC, entry["size"], entry.get("cost", 0.0), len(media_type)),
+            media_type,
+            pack_variants(entry["variants"]),
+        ]
+    )
+
+
+def _decode(blob: bytes) -> dict:
+    magic, size, cost, media_len = _HEADER.unpack_from(blob)
+    if magic != _MAGIC:
+        raise ValueError("not a cache entry")
+    start = _HEADER.size
+    media_type = blob[start:start + media_len].decode("ascii")
+    variants = unpack_variants(blob[start + media_len:])
+    if sum(len(body) for body in variants.values()) != size:
+        raise ValueError("truncated cache entry")
+    return {"variants": variants, "media_type": media_type, "last_used": time.time(), "size": size, "cost": cost}
+
+
+class DiskCache:
+    """Persistent LRU of cache entries in a directory, bounded by *max_bytes*."""
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str = "default",
+        max_bytes: float = DEFAULT_DISK_MAX_MB * 1024 * 1024,
+        queue_size: int = DEFAULT_DISK_QUEUE,
+    ):
+        self.root = path
+        self.path = os.path.join(path, namespace)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, int] = OrderedDict()  # key -> file size, LRU first
+        self._size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.dropped_writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+        self._remove_other_namespaces(namespace)
+        self._load_index()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._writer = threading.Thread(target=self._write_loop, name="disk-cache-writer", daemon=True)
+        self._writer.start()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> dict | None:
+        """Read *key* from disk, or None.  Corrupt or vanished files count as misses."""
+        path = self._file(key)
+        blob = b""
+        try:
+            with open(path, "rb") as fh:
+                blob = fh.read()
+            entry = _decode(blob)
+        except FileNotFoundError:
+            entry = None
+            self._forget(key)
+        except (OSError, ValueError, struct.error, UnicodeDecodeError) as e:
+            logger.warning("Disk cache: dropping unreadable entry %s: %s", key, e)
+            entry = None
+            self.errors += 1
+            self._forget(key)
+            self._enqueue(("remove", key))
+        if entry is None:
+            self.misses += 1
+            metrics.CACHE_LOOKUPS.labels("disk", "miss").inc()
+            return None
+
+        with self._lock:
+            if key not in self._index:
+                # Written by another worker sharing the directory.
+                self._index[key] = len(blob)
+                self._size_bytes += len(blob)
+            self._index.move_to_end(key)
+            self.hits += 1
+        metrics.CACHE_LOOKUPS.labels("disk", "hit").inc()
+        # Persist recency so the LRU order survives a restart; best effort.
+        self._enqueue(("touch", key))
+        return entry
+
+    def put(self, key: str, entry: dict) -> bool:
+        """Queue *entry* to be written.  Returns False if the queue was full and it was dropped."""
+        return self._enqueue(("put", key, entry))
+
+    def clear(self) -> None:
+        self._put_wait(("clear",))
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Wait until every queued write has been applied."""
+        done = threading.Event()
+        self._put_wait(("sync", done))
+        done.wait(timeout)
+
+    def close(self) -> None:
+        self.flush(timeout=10)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "items": len(self._index),
+            "size_mb": round(self._size_bytes / (1024 * 1024), 2),
+            "max_size_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "pending_writes": self._queue.qsize(),
+            "dropped_writes": self.dropped_writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key + _SUFFIX)
+
+    def _make_dir(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, _MARKER), "a"):
+            pass
+
+    def _remove_other_namespaces(self, namespace: str) -> None:
+        try:
+            siblings = [
+                entry
+                for entry in os.scandir(self.root)
+                if entry.is_dir(follow_symlinks=False)
+                and entry.name != namespace
+                and os.path.isfile(os.path.join(entry.path, _MARKER))
+            ]
+        except FileNotFoundError:
+            return
+        for entry in siblings:
+            logger.info("Disk cache: removing stale namespace %s", entry.name)
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _load_index(self) -> None:
+        self._make_dir()
+        found = []
+        for shard in os.scandir(self.path):
+            if not shard.is_dir():
+                continue
+            for item in os.scandir(shard.path):
+                try:
+                    stat = item.stat()
+                    if item.name.endswith(_SUFFIX):
+                        found.append((stat.st_mtime, item.name[: -len(_SUFFIX)], stat.st_size))
+                    elif time.time() - stat.st_mtime > 60:
+                        # Left by a write interrupted by a crash (recent ones may be another worker's).
+                        os.remove(item.path)
+                except FileNotFoundError:
+                    continue  # removed by another worker meanwhile
+        found.sort()
+        for _, key, size in found:
+            self._index[key] = size
+            self._size_bytes += size
+        self._evict()
+        metrics.CACHE_ITEMS.labels("disk").set(len(self._index))
+        logger.info(
+            "Disk cache: %d entries, %.2fMB loaded from %s", len(self._index), self._size_bytes / 1048576, self.path
+        )
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            size = self._index.pop(key, None)
+            if size is not None:
+                self._size_bytes -= size
+
+    def _enqueue(self, op: tuple) -> bool:
+        try:
+            self._queue.put_nowait(op)
+            return True
+        except queue.Full:
+            if op[0] == "put":
+                self.dropped_writes += 1
+            return False
+
+    def _put_wait(self, op: tuple) -> None:
+        self._queue.put(op)
+
+    def _write_loop(self) -> None:
+        while True:
+            op = self._queue.get()
+            try:
+                getattr(self, f"_apply_{op[0]}")(*op[1:])
+            except Exception:
+                self.errors += 1
+                logger.exception("Disk cache: %s failed", op[0])
+
+    def _apply_put(self, key: str, entry: dict) -> None:
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        blob = _encode(entry)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(blob)
+        os.replace(tmp_path, path)
+        with self._lock:
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._size_bytes -= previous
+            self._index[key] = len(blob)
+            self._size_bytes += len(blob)
+        self.writes += 1
+        self._evict()
+        metrics.CACHE_ITEMS.labels("disk").set(len(self._index))
+
+    def _apply_touch(self, key: str) -> None:
+        try:
+            os.utime(self._file(key))
+        except FileNotFoundError:
+            self._forget(key)
+
+    def _apply_remove(self, key: str) -> None:
+        self._forget(key)
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def _apply_clear(self) -> None:
+        with self._lock:
+            self._index.clear()
+            self._size_bytes = 0
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._make_dir()
+        metrics.CACHE_ITEMS.labels("disk").set(0)
+
+    def _apply_sync(self, done: threading.Event) -> None:
+        done.set()
+
+    def _evict(self) -> None:
+        victims = []
+        with self._lock:
+            while self._index and self._size_bytes > self.max_bytes:
+                key, size = self._index.popitem(last=False)
+                self._size_bytes -= size
+                victims.append(key)
+        for key in victims:
+            try:
+                os.remove(self._file(key))
+            except FileNotFoundError:
+                pass
+        if victims:
+            self.evictions += len(victims)
+            metrics.CACHE_EVICTIONS.labels("disk").inc(len(victims))
+
+
+def disk_cache_from_env(namespace: str = "default") -> DiskCache | None:
+    """The tier configured by ``CACHE_DISK_PATH``, or None when it is unset.
+
+    ``CACHE_DISK_MAX_MB`` (default 1024) bounds it and ``CACHE_DISK_QUEUE``
+    (default 256) sizes the write queue.
+    """
+    path = os.getenv("CACHE_DISK_PATH", "").strip()
+    if not path:
+        return None
+    return DiskCache(
+        path,
+        namespace=namespace,
+        max_bytes=float(os.getenv("CACHE_DISK_MAX_MB", str(DEFAULT_DISK_MAX_MB))) * 1024 * 1024,
+        queue_size=int(os.getenv("CACHE_DISK_QUEUE", str(DEFAULT_DISK_QUEUE))),
+    )
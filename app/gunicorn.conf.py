@@ -0,0 +1,25 @@
+"""Gunicorn hooks for Prometheus multiprocess metrics (see ``metrics.py``).
+
+Gunicorn picks this file up automatically from the working directory; the
+bind address and worker count stay on the command line in the Dockerfile.
+"""
+
+import glob
+import os
+
+_METRICS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be aggregated as if live.
+    if _METRICS_DIR:
+        os.makedirs(_METRICS_DIR, exist_ok=True)
+        for path in glob.glob(os.path.join(_METRICS_DIR, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if _METRICS_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
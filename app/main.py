@@ -1,17 +1,50 @@
+import asyncio
+import hashlib
+import inspect
 import os
-
-from fastapi import FastAPI, HTTPException, Response, Query
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from importlib.metadata import version as package_version
+from typing import Literal
+from zoneinfo import ZoneInfo
+
+from fastapi import FastAPI, HTTPException, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from kerykeion import AspectsFactory, to_context
-from kerykeion.planetary_return_factory import PlanetaryReturnFactory
-from kerykeion.composite_subject_factory import CompositeSubjectFactory
-from kerykeion.chart_data_factory import ChartDataFactory
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from pydantic import ValidationError
 
-import json
 import logging
 
+from cache_backends import backend_from_env
 from cache_service import CacheService
-from chart_helpers import create_subject, generate_svg
+from cache_snapshot import SnapshotError, SnapshotReader, dump as dump_snapshot, read_file as read_snapshot_file
+from chart_builders import SECTIONS, build_chart, chart_data_cache
+from chart_helpers import subject_cache
+from chart_params import ChartRequest, validate_params
+from compression import compute_encoded, encode, encodings_from_env
+from disk_cache import disk_cache_from_env
+from normalization import round_coordinates
+from serialization import dumps
+import metrics
+import profiling
+from prefetch import Prefetcher
+from return_series import (
+    LUNAR_CHUNK_RETURNS,
+    build_lunar_chunk,
+    build_solar_chunk,
+    check_year_range,
+    chunk_seeds,
+    lunar_range,
+    lunar_seeds,
+    render_lunar_calendar,
+    render_solar_series,
+    solar_seeds,
+)
+from compute_pool import ComputeError, ComputePool, PoolSaturatedError
+from single_flight import SingleFlight
+from themes import DEFAULT_THEME, theme_registry
+from transit_timeline import build_transit_timeline, sample_times
 
 # ---------------------------------------------------------------------------
 # App & middleware
@@ -24,7 +57,7 @@ openapi_tags = [
     },
     {
         "name": "Cache",
-        "description": "Inspect and manage the in-memory response cache.",
+        "description": "Inspect and manage the response cache.",
     },
     {
         "name": "Charts",
@@ -52,6 +85,19 @@ def _require_admin_endpoints_enabled() -> None:
         raise HTTPException(status_code=404, detail="Not found")
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    snapshot_path = os.getenv("CACHE_SNAPSHOT_PATH", "").strip()
+    if snapshot_path:
+        await asyncio.to_thread(_load_snapshot_file, snapshot_path)
+    yield
+    prefetcher.cancel_all()
+    compute_pool.shutdown()
+    batch_pool.shutdown()
+    if cache.disk is not None:
+        cache.disk.close()
+
+
 docs_enabled = _flag_enabled("ENABLE_API_DOCS", default=True)
 configured_cors_origins = _cors_origins()
 allow_all_cors_origins = configured_cors_origins == ["*"]
@@ -61,10 +107,12 @@ app = FastAPI(
     docs_url="/docs" if docs_enabled else None,
     redoc_url="/redoc" if docs_enabled else None,
     openapi_url="/openapi.json" if docs_enabled else None,
+    lifespan=lifespan,
 )
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+app.add_middleware(metrics.RequestMetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=configured_cors_origins,
@@ -73,37 +121,280 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-cache = CacheService()
+compute_pool = ComputePool.from_env()
+# Batches get their own process pool so a backfill cannot starve interactive traffic.
+batch_pool = ComputePool.from_env("BATCH_POOL", kind="process", max_workers=os.cpu_count() or 2, max_queue=0)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+single_flight = SingleFlight(timeout=float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "30")))
+CHART_CACHE_CONTROL = os.getenv("CHART_CACHE_CONTROL", "public, max-age=86400")
+# Bump when a change here alters chart output for the same inputs, so clients revalidate.
+OUTPUT_VERSION = "3"
+KERYKEION_VERSION = package_version("kerykeion")
+# Persisted cache data (disk tier, snapshots) is only valid for the versions that produced it.
+CACHE_NAMESPACE = f"{KERYKEION_VERSION}-{OUTPUT_VERSION}"
+cache = CacheService(
+    backend=backend_from_env(),
+    encodings=encodings_from_env(),
+    disk=disk_cache_from_env(namespace=CACHE_NAMESPACE),
+    trace_path=os.getenv("CACHE_TRACE_PATH", "").strip() or None,
+)
+# Transit charts for moments this close to now are one-off "current sky"
+# requests: cache them for CACHE_CURRENT_SKY_TTL seconds only (0 disables).
+CURRENT_SKY_TTL = float(os.getenv("CACHE_CURRENT_SKY_TTL", "0"))
+CURRENT_SKY_WINDOW_HOURS = float(os.getenv("CACHE_CURRENT_SKY_WINDOW_HOURS", "24"))
+PREFETCH_MAX_ITEMS = int(os.getenv("PREFETCH_MAX_ITEMS", "10000"))
+
+
+@app.exception_handler(PoolSaturatedError)
+async def _pool_saturated_handler(request: Request, exc: PoolSaturatedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(ComputeError)
+async def _compute_error_handler(request: Request, exc: ComputeError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
 
 # ---------------------------------------------------------------------------
 # Shared response builder
 # ---------------------------------------------------------------------------
 
 
-def _cached_response(cache_key: str, svg: bool) -> Response | None:
-    """Return a cached Response or None."""
-    hit = cache.get(cache_key)
-    if hit is None:
-        return None
-    media = "image/svg+xml" if svg else "application/json"
-    return Response(content=hit["content"], media_type=media)
+def _media_type(svg: bool) -> str:
+    return "image/svg+xml" if svg else "application/json"
 
 
-def _json_response(data: dict, cache_key: str) -> Response:
-    """Serialise *data* to JSON, cache it, and return a Response."""
-    content = json.dumps(data, indent=2)
-    cache.put(cache_key, content, "application/json")
-    return Response(content=content, media_type="application/json")
-
-
-def _svg_response(chart_data, prefix: str, cache_key: str) -> Response:
-    """Generate an SVG from *chart_data*, cache it, and return a Response."""
+def _parse_include(include: str | None) -> frozenset | None:
+    """Sections named in an ``include=`` value; None when all are wanted.  400 on unknown names."""
+    if include is None:
+        return None
+    sections = frozenset(s.strip().lower() for s in include.split(",") if s.strip())
+    unknown = sections - set(SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown section(s) in include: {', '.join(sorted(unknown))}; expected {', '.join(SECTIONS)}",
+        )
+    return None if sections == set(SECTIONS) else sections
+
+
+def _chart_cache_key(
+    chart_type: str,
+    params: dict,
+    svg: bool,
+    theme: str,
+    pretty: bool = False,
+    include: frozenset | None = None,
+) -> str:
+    """Cache key for a chart response.
+
+    The theme only affects SVG output, and ``pretty`` and ``include`` only
+    JSON output, so each is part of the key for that format only.
+    Coordinates are rounded as for the computation, so requests that differ
+    only past that precision share the entry.  SVG keys carry the theme's
+    CSS digest, as the ETag does, so editing a theme file retires the
+    entries rendered with the old CSS.  Raises a 400 for an unknown theme.
+    """
+    key_data = {**round_coordinates(params), "svg": svg, "type": chart_type}
+    if pretty and not svg:
+        key_data["pretty"] = True
+    if include is not None and not svg:
+        key_data["include"] = sorted(include)
+    if svg:
+        registered = theme_registry.get(theme)
+        if registered is None and theme != DEFAULT_THEME:
+            raise HTTPException(status_code=400, detail=f"Unknown theme: {theme}")
+        key_data["theme"] = theme
+        key_data["theme_digest"] = registered.digest if registered is not None else None
+    return cache.make_key(key_data)
+
+
+async def _get_or_compute(
+    pool: ComputePool, cache_key: str, media_type: str, fn, *args, ttl: float | None = None
+) -> dict:
+    """Return the cache entry for *cache_key*, or run ``fn(*args)`` on *pool* and cache it.
+
+    The result is compressed for the cache in the same pool job.  A
+    coroutine function *fn* is awaited on the event loop instead; it
+    schedules its own work on the pool, and its result is compressed on a
+    thread.
+
+    Cache hits are answered without the compute pool so they never queue
+    behind misses waiting for a compute worker (a blocking cache backend is
+    read on a thread, see :meth:`CacheService.aget`).  Concurrent misses for the
+    same key share a single computation.  The time the computation took is
+    stored as the entry's cost, for the cost-aware eviction policy; *ttl*
+    expires the entry.
+    """
+    timings = metrics.current_timings()
+    with metrics.stage("cache_get"):
+        hit = await cache.aget(cache_key)
+    if hit is not None:
+        if timings is not None:
+            timings.note("cache", "hit")
+        return hit
+
+    async def compute():
+        if timings is not None:
+            timings.note("cache", "miss")
+        start = time.perf_counter()
+        # Compression runs with the computation, off the event loop.
+        if inspect.iscoroutinefunction(fn):
+            content = await fn(*args)
+            variants = await asyncio.to_thread(encode, content, cache.encodings)
+        else:
+            variants = await pool.run(compute_encoded, cache.encodings, fn, *args)
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings.add("compute", elapsed)
+        with metrics.stage("cache_put"):
+            return await cache.aput_encoded(cache_key, variants, media_type, cost=elapsed, ttl=ttl)
+
+    if timings is not None:
+        # Overwritten by compute() when this request leads the computation.
+        timings.note("cache", "coalesced")
     try:
-        svg_text = generate_svg(chart_data, prefix=prefix)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"SVG generation failed: {e}")
-    cache.put(cache_key, svg_text, "image/svg+xml")
-    return Response(content=svg_text, media_type="image/svg+xml")
+        return await single_flight.do(cache_key, compute)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Timed out waiting for chart computation",
+            headers={"Retry-After": str(pool.retry_after)},
+        )
+
+
+def _etag(cache_key: str, svg: bool, theme: str, encoding: str | None) -> str:
+    """Strong validator for a chart response.
+
+    Derived from the inputs alone (the cache key), the kerykeion and output
+    versions and, for SVGs, the theme's CSS digest, so it can be checked
+    before anything is computed or read from the cache.  Each content coding
+    is a separate representation and gets its own tag.
+    """
+    parts = [cache_key, KERYKEION_VERSION, OUTPUT_VERSION]
+    if svg:
+        registered = theme_registry.get(theme)
+        parts.append(registered.digest if registered is not None else "-")
+    digest = hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: ignore any W/ prefix.
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def _entry_response(request: Request, entry: dict, headers: dict | None = None) -> Response:
+    """Send the stored variant of *entry* that matches the request's ``Accept-Encoding``."""
+    body, encoding = cache.encoded_body(entry, request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding", **(headers or {})}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=entry["media_type"], headers=headers)
+
+
+def _chart_ttl(chart_type: str, params: dict) -> float | None:
+    """TTL for a transit chart of the current sky (see ``CACHE_CURRENT_SKY_TTL``), else None."""
+    if chart_type != "transit" or CURRENT_SKY_TTL <= 0:
+        return None
+    try:
+        moment = datetime(
+            params["t_year"], params["t_month"], params["t_day"], params["t_hour"], params["t_minute"],
+            tzinfo=ZoneInfo(params["t_tz_str"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None  # invalid input is rejected when the chart is built
+    hours_away = abs(time.time() - moment.timestamp()) / 3600
+    return CURRENT_SKY_TTL if hours_away <= CURRENT_SKY_WINDOW_HOURS else None
+
+
+async def _chart_response(
+    request: Request,
+    chart_type: str,
+    params: dict,
+    svg: bool,
+    theme: str = DEFAULT_THEME,
+    pretty: bool = False,
+    include: str | None = None,
+) -> Response:
+    """Serve a chart from the cache, or compute it on the pool and cache it.
+
+    A matching ``If-None-Match`` is answered with 304 before the cache or
+    the compute pool is touched.
+    """
+    sections = None if svg else _parse_include(include)
+    cache_key = _chart_cache_key(chart_type, params, svg, theme, pretty, sections)
+    encoding = cache.negotiated_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": _etag(cache_key, svg, theme, encoding),
+        "Cache-Control": CHART_CACHE_CONTROL,
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers={"Vary": "Accept-Encoding", **headers})
+
+    entry = await _get_or_compute(
+        compute_pool, cache_key, _media_type(svg), build_chart, chart_type, params, svg, theme, pretty, sections,
+        ttl=_chart_ttl(chart_type, params),
+    )
+    return _entry_response(request, entry, headers)
+
+
+async def _timed_chart_response(request: Request, *args) -> Response:
+    """:func:`_chart_response` with a ``Server-Timing`` header, or a profile if asked for.
+
+    The header lists the stages the request went through (cache lookup,
+    subject, aspects, rendering, ..., ``compute`` being the time spent on the
+    pool including any queueing) and whether the cache was hit.
+    """
+    start = time.perf_counter()
+    with metrics.collect_timings() as timings:
+        if request.headers.get("x-profile") == "1" and _flag_enabled("ENABLE_ADMIN_ENDPOINTS"):
+            response = await _profiled_chart_response(*args)
+        else:
+            response = await _chart_response(request, *args)
+    if response.status_code == 304:
+        timings.note("cache", "not-modified")
+    response.headers["Server-Timing"] = timings.header(total=time.perf_counter() - start)
+    return response
+
+
+async def _profiled_chart_response(
+    chart_type: str,
+    params: dict,
+    svg: bool,
+    theme: str = DEFAULT_THEME,
+    pretty: bool = False,
+    include: str | None = None,
+) -> Response:
+    """Compute a chart under cProfile, bypassing the response cache (admin only).
+
+    Memoized subjects and chart data are still reused, so profile a cold
+    request by clearing the caches first.  The capture is stored and its
+    download URL returned in ``X-Profile-Url``.
+    """
+    sections = None if svg else _parse_include(include)
+    _chart_cache_key(chart_type, params, svg, theme, pretty, sections)  # validates params and theme
+    metrics.current_timings().note("cache", "bypass")
+    start = time.perf_counter()
+    content, stats = await compute_pool.run(
+        profiling.profile_call, build_chart, chart_type, params, svg, theme, pretty, sections
+    )
+    metrics.current_timings().add("compute", time.perf_counter() - start)
+    profile_id = await asyncio.to_thread(profiling.save, stats)
+    headers = {
+        "Cache-Control": "no-store",
+        "X-Profile-Id": profile_id,
+        "X-Profile-Url": f"/profiles/{profile_id}",
+    }
+    return Response(content=content, media_type=_media_type(svg), headers=headers)
 
 
 # ---------------------------------------------------------------------------
@@ -121,23 +412,176 @@ async def healthz():
     return {"status": "ok"}
 
 
+@app.get("/metrics", tags=["General"], response_class=Response, responses={200: {"content": {"text/plain": {}}}})
+async def get_metrics():
+    """Prometheus metrics, aggregated across workers (admin endpoint)."""
+    _require_admin_endpoints_enabled()
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/profiles/{profile_id}", tags=["General"], response_class=Response)
+async def get_profile(profile_id: str, format: Literal["prof", "text"] = "prof"):
+    """Download a capture taken with ``X-Profile: 1`` (admin endpoint).
+
+    ``prof`` is the raw pstats file (for ``pstats``/snakeviz); ``text`` is a
+    summary of the top functions by cumulative time.
+    """
+    _require_admin_endpoints_enabled()
+    path = profiling.path_for(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return Response(content=await asyncio.to_thread(profiling.summary, path), media_type="text/plain")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+
 @app.get("/cache/info", tags=["Cache"])
 async def cache_info():
     _require_admin_endpoints_enabled()
-    return cache.info(include_details=_flag_enabled("ENABLE_ADMIN_CACHE_DETAILS", default=False))
+    info = cache.info(include_details=_flag_enabled("ENABLE_ADMIN_CACHE_DETAILS", default=False))
+    info["compute_pool"] = compute_pool.info()
+    info["batch_pool"] = batch_pool.info()
+    info["single_flight"] = single_flight.info()
+    info["subject_cache"] = subject_cache.info()
+    info["chart_data_cache"] = chart_data_cache.info()
+    info["prefetch"] = prefetcher.info()
+    return info
 
 
 @app.delete("/cache/clear", tags=["Cache"])
 async def clear_cache():
     _require_admin_endpoints_enabled()
-    cache.clear()
+    await cache.aclear()
+    subject_cache.clear()
+    chart_data_cache.clear()
     return {"message": "Cache cleared successfully"}
 
 
 @app.put("/cache/config", tags=["Cache"])
-async def update_cache_config(max_items: int = None, max_size_mb: float = None):
+async def update_cache_config(
+    max_items: int = None,
+    max_size_mb: float = None,
+    policy: str = Query(None, description="Eviction policy: lru or gds (GreedyDual-Size)"),
+):
+    _require_admin_endpoints_enabled()
+    try:
+        return cache.update_config(max_items, max_size_mb, policy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _load_snapshot_file(path: str) -> None:
+    """Startup hook: fill the cache from the snapshot at *path*, if there is one."""
+    if not os.path.exists(path):
+        logger.info("No cache snapshot at %s", path)
+        return
+    imported = 0
+    try:
+        with open(path, "rb") as fh:
+            for key, entry in read_snapshot_file(fh, CACHE_NAMESPACE):
+                cache.put_entry(key, entry)
+                imported += 1
+    except SnapshotError as e:
+        logger.warning("Cache snapshot %s not loaded (%s); %d entries imported before the error", path, e, imported)
+        return
+    logger.info("Loaded %d entries from cache snapshot %s: %d items, %.2fMB", imported, path, len(cache.backend), cache.size_mb)
+
+
+@app.get(
+    "/cache/snapshot",
+    tags=["Cache"],
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/octet-stream": {}}}},
+)
+async def export_cache_snapshot():
+    """Stream every cached entry (key, media type, stored variants) in the snapshot format.
+
+    The entry list is taken here, on the event loop, so encoding it in the
+    threadpool never races the loop's puts and evictions.
+    """
+    _require_admin_endpoints_enabled()
+    return StreamingResponse(
+        dump_snapshot(await cache.aentries(), CACHE_NAMESPACE),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="cache.snapshot"'},
+    )
+
+
+@app.post("/cache/snapshot", tags=["Cache"])
+async def import_cache_snapshot(request: Request):
+    """Load a snapshot from the request body into the cache.
+
+    Entries go in oldest first through the normal limits, so when the
+    snapshot is larger than ``max_items``/``max_size_mb`` the most recently
+    used entries are the ones kept.
+    """
+    _require_admin_endpoints_enabled()
+    reader = SnapshotReader(CACHE_NAMESPACE)
+    imported = 0
+    try:
+        async for chunk in request.stream():
+            for key, entry in reader.feed(chunk):
+                await cache.aput_entry(key, entry)
+                imported += 1
+        reader.close()
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=f"{e} ({imported} entries imported before the error)")
+    totals = await asyncio.to_thread(_cache_totals) if cache.backend.blocking else _cache_totals()
+    return {"imported": imported, **totals}
+
+
+def _cache_totals() -> dict:
+    return {"cache_items": len(cache.backend), "cache_size_mb": round(cache.size_mb, 2)}
+
+
+async def _prefetch_item(item: ChartRequest) -> str:
+    try:
+        params = validate_params(item.type, item.params)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    cache_key = _chart_cache_key(item.type, params, item.svg, item.theme)
+    if await cache.aget(cache_key) is not None:
+        return "cached"
+    while True:
+        try:
+            await _get_or_compute(
+                batch_pool, cache_key, _media_type(item.svg), build_chart, item.type, params, item.svg, item.theme
+            )
+            return "computed"
+        except PoolSaturatedError:
+            await asyncio.sleep(0.05)
+
+
+def _interactive_work_waiting() -> bool:
+    # Yield to queued interactive requests and to batches using the batch pool.
+    return compute_pool.queue_depth > 0 or batch_pool.in_flight >= batch_pool.max_workers
+
+
+prefetcher = Prefetcher(_prefetch_item, _interactive_work_waiting)
+
+
+@app.post("/cache/prefetch", tags=["Cache"], status_code=202)
+async def start_prefetch(items: list[ChartRequest]):
+    """Precompute chart specs in the background, at low priority.
+
+    Uses the same item format as ``POST /gen/batch``.  Jobs run one at a
+    time, one chart at a time on the batch pool, pausing while interactive
+    requests are queued.  Poll ``GET /cache/prefetch/{id}`` for progress.
+    """
     _require_admin_endpoints_enabled()
-    return cache.update_config(max_items, max_size_mb)
+    if len(items) > PREFETCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Too many items (max {PREFETCH_MAX_ITEMS})")
+    return prefetcher.submit(items).info()
+
+
+@app.get("/cache/prefetch/{job_id}", tags=["Cache"])
+async def get_prefetch_job(job_id: str):
+    _require_admin_endpoints_enabled()
+    job = prefetcher.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Prefetch job not found")
+    return job.info()
 
 
 # ---------------------------------------------------------------------------
@@ -148,6 +592,7 @@ async def update_cache_config(max_items: int = None, max_size_mb: float = None):
 @app.get("/gen/birth", response_class=Response, responses={200: {"content": {"image/svg+xml": {}}}}, tags=["Charts"])
 @app.get("/gen", response_class=Response, responses={200: {"content": {"image/svg+xml": {}}}}, tags=["Charts"])
 async def get_chart(
+    request: Request,
     name: str = Query(..., description="Name of the subject", json_schema_extra={"example": "Ada Lovelace"}),
     year: int = Query(..., description="Year of birth", json_schema_extra={"example": 1815}),
     month: int = Query(..., description="Month of birth", json_schema_extra={"example": 12}),
@@ -160,30 +605,16 @@ async def get_chart(
     tz_str: str = Query(..., description="Timezone string of birth location", json_schema_extra={"example": "Europe/London"}),
     nation: str = Query(" ", description="nation of birth", json_schema_extra={"example": "United Kingdom"}),
     svg: bool = Query(False, description="Return SVG image if true, else return JSON"),
+    theme: str = Query(DEFAULT_THEME, description="CSS theme for SVG output (name of a file in app/themes)"),
+    pretty: bool = Query(False, description="Indent JSON output (ignored for SVG)"),
+    include: str | None = Query(None, description="Comma-separated JSON sections to compute: positions, houses, aspects, context (default: all)"),
 ):
-    cache_key = cache.make_key({
+    params = {
         "name": name, "year": year, "month": month, "day": day,
         "hour": hour, "minute": minute, "city": city, "lng": lng,
-        "lat": lat, "tz_str": tz_str, "nation": nation, "svg": svg,
-    })
-
-    cached = _cached_response(cache_key, svg)
-    if cached:
-        return cached
-
-    subject = create_subject(name, year, month, day, hour, minute, city, nation, lng, lat, tz_str)
-    aspects_data = AspectsFactory.single_chart_aspects(subject)
-    context_text = to_context(subject)
-
-    subject_dict = subject.model_dump()
-    subject_dict["aspects"] = [a.model_dump() for a in aspects_data.aspects]
-    subject_dict["context"] = context_text
-
-    if not svg:
-        return _json_response(subject_dict, cache_key)
-
-    chart_data = ChartDataFactory.create_natal_chart_data(subject)
-    return _svg_response(chart_data, "birth", cache_key)
+        "lat": lat, "tz_str": tz_str, "nation": nation,
+    }
+    return await _timed_chart_response(request, "birth", params, svg, theme, pretty, include)
 
 
 # ---------------------------------------------------------------------------
@@ -193,6 +624,7 @@ async def get_chart(
 
 @app.get("/gen/synastry", response_class=Response, responses={200: {"content": {"image/svg+xml": {}}}}, tags=["Charts"])
 async def get_synastry_chart(
+    request: Request,
     name1: str = Query(..., description="Name of the first subject", json_schema_extra={"example": "Romeo"}),
     year1: int = Query(..., description="Year of birth", json_schema_extra={"example": 1990}),
     month1: int = Query(..., description="Month of birth", json_schema_extra={"example": 1}),
@@ -216,43 +648,19 @@ async def get_synastry_chart(
     tz_str2: str = Query(..., description="Timezone string of birth location", json_schema_extra={"example": "Europe/Paris"}),
     nation2: str = Query(" ", description="Nation of birth", json_schema_extra={"example": "France"}),
     svg: bool = Query(False, description="Return SVG image if true, else return JSON"),
+    theme: str = Query(DEFAULT_THEME, description="CSS theme for SVG output (name of a file in app/themes)"),
+    pretty: bool = Query(False, description="Indent JSON output (ignored for SVG)"),
+    include: str | None = Query(None, description="Comma-separated JSON sections to compute: positions, houses, aspects, context (default: all)"),
 ):
-    cache_key = cache.make_key({
+    params = {
         "name1": name1, "year1": year1, "month1": month1, "day1": day1,
         "hour1": hour1, "minute1": minute1, "city1": city1, "lng1": lng1,
         "lat1": lat1, "tz_str1": tz_str1, "nation1": nation1,
         "name2": name2, "year2": year2, "month2": month2, "day2": day2,
         "hour2": hour2, "minute2": minute2, "city2": city2, "lng2": lng2,
         "lat2": lat2, "tz_str2": tz_str2, "nation2": nation2,
-        "svg": svg, "type": "synastry",
-    })
-
-    cached = _cached_response(cache_key, svg)
-    if cached:
-        return cached
-
-    subject1 = create_subject(name1, year1, month1, day1, hour1, minute1, city1, nation1, lng1, lat1, tz_str1)
-    subject2 = create_subject(name2, year2, month2, day2, hour2, minute2, city2, nation2, lng2, lat2, tz_str2)
-
-    aspects_data = AspectsFactory.synastry_aspects(subject1, subject2)
-    context_text = (
-        f"--- Synastry Context ---\n\n"
-        f"# {name1}'s Chart\n{to_context(subject1)}\n\n"
-        f"# {name2}'s Chart\n{to_context(subject2)}"
-    )
-
-    response_data = {
-        "subject1": subject1.model_dump(),
-        "subject2": subject2.model_dump(),
-        "aspects": [a.model_dump() for a in aspects_data.aspects],
-        "context": context_text,
     }
-
-    if not svg:
-        return _json_response(response_data, cache_key)
-
-    chart_data = ChartDataFactory.create_synastry_chart_data(subject1, subject2)
-    return _svg_response(chart_data, "synastry", cache_key)
+    return await _timed_chart_response(request, "synastry", params, svg, theme, pretty, include)
 
 
 # ---------------------------------------------------------------------------
@@ -262,6 +670,7 @@ async def get_synastry_chart(
 
 @app.get("/gen/transit", response_class=Response, responses={200: {"content": {"image/svg+xml": {}}}}, tags=["Charts"])
 async def get_transit_chart(
+    request: Request,
     name: str = Query(..., description="Name of the subject", json_schema_extra={"example": "Romeo"}),
     year: int = Query(..., description="Year of birth", json_schema_extra={"example": 1990}),
     month: int = Query(..., description="Month of birth", json_schema_extra={"example": 1}),
@@ -284,43 +693,19 @@ async def get_transit_chart(
     t_tz_str: str = Query(..., description="Timezone string of transit location", json_schema_extra={"example": "Europe/Paris"}),
     t_nation: str = Query(" ", description="Nation of transit", json_schema_extra={"example": "France"}),
     svg: bool = Query(False, description="Return SVG image if true, else return JSON"),
+    theme: str = Query(DEFAULT_THEME, description="CSS theme for SVG output (name of a file in app/themes)"),
+    pretty: bool = Query(False, description="Indent JSON output (ignored for SVG)"),
+    include: str | None = Query(None, description="Comma-separated JSON sections to compute: positions, houses, aspects, context (default: all)"),
 ):
-    cache_key = cache.make_key({
+    params = {
         "name": name, "year": year, "month": month, "day": day,
         "hour": hour, "minute": minute, "city": city, "lng": lng,
         "lat": lat, "tz_str": tz_str, "nation": nation,
         "t_year": t_year, "t_month": t_month, "t_day": t_day,
         "t_hour": t_hour, "t_minute": t_minute, "t_city": t_city, "t_lng": t_lng,
         "t_lat": t_lat, "t_tz_str": t_tz_str, "t_nation": t_nation,
-        "svg": svg, "type": "transit",
-    })
-
-    cached = _cached_response(cache_key, svg)
-    if cached:
-        return cached
-
-    natal_subject = create_subject(name, year, month, day, hour, minute, city, nation, lng, lat, tz_str)
-    transit_subject = create_subject("Transit", t_year, t_month, t_day, t_hour, t_minute, t_city, t_nation, t_lng, t_lat, t_tz_str)
-
-    aspects_data = AspectsFactory.synastry_aspects(natal_subject, transit_subject)
-    context_text = (
-        f"--- Transit Context ---\n\n"
-        f"# {name}'s Natal Chart\n{to_context(natal_subject)}\n\n"
-        f"# Transit Sky Chart\n{to_context(transit_subject)}"
-    )
-
-    response_data = {
-        "natal": natal_subject.model_dump(),
-        "transit": transit_subject.model_dump(),
-        "aspects": [a.model_dump() for a in aspects_data.aspects],
-        "context": context_text,
     }
-
-    if not svg:
-        return _json_response(response_data, cache_key)
-
-    chart_data = ChartDataFactory.create_transit_chart_data(natal_subject, transit_subject)
-    return _svg_response(chart_data, "transit", cache_key)
+    return await _timed_chart_response(request, "transit", params, svg, theme, pretty, include)
 
 
 # ---------------------------------------------------------------------------
@@ -330,6 +715,7 @@ async def get_transit_chart(
 
 @app.get("/gen/solar-return", response_class=Response, responses={200: {"content": {"image/svg+xml": {}}}}, tags=["Charts"])
 async def get_solar_return_chart(
+    request: Request,
     name: str = Query(..., description="Name of the subject", json_schema_extra={"example": "Ada Lovelace"}),
     year: int = Query(..., description="Year of birth", json_schema_extra={"example": 1815}),
     month: int = Query(..., description="Month of birth", json_schema_extra={"example": 12}),
@@ -343,46 +729,73 @@ async def get_solar_return_chart(
     nation: str = Query(" ", description="Nation of birth", json_schema_extra={"example": "United Kingdom"}),
     return_year: int = Query(..., description="Year for the solar return", json_schema_extra={"example": 2024}),
     svg: bool = Query(False, description="Return SVG image if true, else return JSON"),
+    theme: str = Query(DEFAULT_THEME, description="CSS theme for SVG output (name of a file in app/themes)"),
+    pretty: bool = Query(False, description="Indent JSON output (ignored for SVG)"),
+    include: str | None = Query(None, description="Comma-separated JSON sections to compute: positions, houses, aspects, context (default: all)"),
 ):
-    cache_key = cache.make_key({
+    params = {
         "name": name, "year": year, "month": month, "day": day,
         "hour": hour, "minute": minute, "city": city, "lng": lng,
         "lat": lat, "tz_str": tz_str, "nation": nation,
-        "return_year": return_year, "svg": svg, "type": "solar_return",
-    })
+        "return_year": return_year,
+    }
+    return await _timed_chart_response(request, "solar_return", params, svg, theme, pretty, include)
 
-    cached = _cached_response(cache_key, svg)
-    if cached:
-        return cached
 
-    natal_subject = create_subject(name, year, month, day, hour, minute, city, nation, lng, lat, tz_str)
+# ---------------------------------------------------------------------------
+# /gen/solar-return/series
+# ---------------------------------------------------------------------------
 
-    return_factory = PlanetaryReturnFactory(natal_subject, lng=lng, lat=lat, tz_str=tz_str, online=False)
-    solar_return_subject = return_factory.next_return_from_date(return_year, 1, 1, return_type="Solar")
 
-    aspects_data = AspectsFactory.synastry_aspects(natal_subject, solar_return_subject)
-    context_text = (
-        f"--- Solar Return Context ({return_year}) ---\n\n"
-        f"# Natal Chart\n{to_context(natal_subject)}\n\n"
-        f"# Solar Return Chart\n{to_context(solar_return_subject)}"
+async def _solar_return_series(params: dict, svg: bool, theme: str, pretty: bool) -> bytes:
+    seeds = await compute_pool.run(solar_seeds, params)
+    chunks = await asyncio.gather(
+        *(
+            compute_pool.run(build_solar_chunk, params, chunk, svg, theme)
+            for chunk in chunk_seeds(seeds, compute_pool.max_workers)
+        )
     )
+    return render_solar_series(params, chunks, pretty)
 
-    response_data = {
-        "natal": natal_subject.model_dump(),
-        "solar_return": solar_return_subject.model_dump(),
-        "aspects": [a.model_dump() for a in aspects_data.aspects],
-        "context": context_text,
-    }
 
-    if not svg:
-        return _json_response(response_data, cache_key)
-
-    try:
-        chart_data = ChartDataFactory.create_return_chart_data(natal_subject, solar_return_subject)
-        return _svg_response(chart_data, "solar_return", cache_key)
-    except Exception as e:
-        logger.exception("Solar return calculation failed")
-        raise HTTPException(status_code=500, detail=f"Solar return generation failed: {e}")
+@app.get("/gen/solar-return/series", tags=["Charts"])
+async def get_solar_return_series(
+    request: Request,
+    name: str = Query(..., description="Name of the subject", json_schema_extra={"example": "Ada Lovelace"}),
+    year: int = Query(..., description="Year of birth", json_schema_extra={"example": 1815}),
+    month: int = Query(..., description="Month of birth", json_schema_extra={"example": 12}),
+    day: int = Query(..., description="Day of birth", json_schema_extra={"example": 10}),
+    hour: int = Query(..., description="Hour of birth", json_schema_extra={"example": 6}),
+    minute: int = Query(..., description="Minute of birth", json_schema_extra={"example": 0}),
+    city: str = Query(..., description="City of birth", json_schema_extra={"example": "London"}),
+    lng: float = Query(..., description="Longitude of birth location", json_schema_extra={"example": -0.1278}),
+    lat: float = Query(..., description="Latitude of birth location", json_schema_extra={"example": 51.5074}),
+    tz_str: str = Query(..., description="Timezone string of birth location", json_schema_extra={"example": "Europe/London"}),
+    nation: str = Query(" ", description="Nation of birth", json_schema_extra={"example": "United Kingdom"}),
+    start_year: int = Query(..., description="First year of the series", json_schema_extra={"example": 2024}),
+    end_year: int = Query(..., description="Last year of the series (inclusive)", json_schema_extra={"example": 2033}),
+    svg: bool = Query(False, description="Include an SVG chart with every return"),
+    theme: str = Query(DEFAULT_THEME, description="CSS theme for the SVG charts (name of a file in app/themes)"),
+    pretty: bool = Query(False, description="Indent JSON output"),
+):
+    """Solar returns for every year of a range: moment, positions and house cusps of each."""
+    params = {
+        "name": name, "year": year, "month": month, "day": day,
+        "hour": hour, "minute": minute, "city": city, "lng": lng,
+        "lat": lat, "tz_str": tz_str, "nation": nation,
+        "start_year": start_year, "end_year": end_year,
+    }
+    check_year_range(params)  # reject oversized ranges before touching the pool
+    # The SVGs are embedded in JSON, so the key takes both the theme and pretty.
+    cache_key = _chart_cache_key("solar_return_series", {**params, "pretty": pretty}, svg, theme)
+    started = time.perf_counter()
+    with metrics.collect_timings() as timings:
+        entry = await _get_or_compute(
+            compute_pool, cache_key, "application/json", _solar_return_series, params, svg, theme, pretty
+        )
+    return _entry_response(
+        request, entry, {"Server-Timing": timings.header(total=time.perf_counter() - started)}
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -392,6 +805,7 @@ async def get_solar_return_chart(
 
 @app.get("/gen/lunar-return", response_class=Response, responses={200: {"content": {"image/svg+xml": {}}}}, tags=["Charts"])
 async def get_lunar_return_chart(
+    request: Request,
     name: str = Query(..., description="Name of the subject", json_schema_extra={"example": "Ada Lovelace"}),
     year: int = Query(..., description="Year of birth", json_schema_extra={"example": 1815}),
     month: int = Query(..., description="Month of birth", json_schema_extra={"example": 12}),
@@ -407,47 +821,74 @@ async def get_lunar_return_chart(
     return_month: int = Query(..., description="Target month for the return search", json_schema_extra={"example": 1}),
     return_day: int = Query(..., description="Target day for the return search", json_schema_extra={"example": 1}),
     svg: bool = Query(False, description="Return SVG image if true, else return JSON"),
+    theme: str = Query(DEFAULT_THEME, description="CSS theme for SVG output (name of a file in app/themes)"),
+    pretty: bool = Query(False, description="Indent JSON output (ignored for SVG)"),
+    include: str | None = Query(None, description="Comma-separated JSON sections to compute: positions, houses, aspects, context (default: all)"),
 ):
-    cache_key = cache.make_key({
+    params = {
         "name": name, "year": year, "month": month, "day": day,
         "hour": hour, "minute": minute, "city": city, "lng": lng,
         "lat": lat, "tz_str": tz_str, "nation": nation,
         "return_year": return_year, "return_month": return_month,
-        "return_day": return_day, "svg": svg, "type": "lunar_return",
-    })
+        "return_day": return_day,
+    }
+    return await _timed_chart_response(request, "lunar_return", params, svg, theme, pretty, include)
 
-    cached = _cached_response(cache_key, svg)
-    if cached:
-        return cached
 
-    natal_subject = create_subject(name, year, month, day, hour, minute, city, nation, lng, lat, tz_str)
+# ---------------------------------------------------------------------------
+# /gen/lunar-return/calendar
+# ---------------------------------------------------------------------------
 
-    return_factory = PlanetaryReturnFactory(natal_subject, lng=lng, lat=lat, tz_str=tz_str, online=False)
-    lunar_return_subject = return_factory.next_return_from_date(return_year, return_month, return_day, return_type="Lunar")
 
-    aspects_data = AspectsFactory.synastry_aspects(natal_subject, lunar_return_subject)
-    context_text = (
-        f"--- Lunar Return Context (Search from {return_year}-{return_month}-{return_day}) ---\n\n"
-        f"# Natal Chart\n{to_context(natal_subject)}\n\n"
-        f"# Lunar Return Chart\n{to_context(lunar_return_subject)}"
+async def _lunar_return_calendar(params: dict, aspects: bool, pretty: bool) -> bytes:
+    natal, seeds = await compute_pool.run(lunar_seeds, params)
+    chunks = await asyncio.gather(
+        *(
+            compute_pool.run(build_lunar_chunk, params, chunk, aspects)
+            for chunk in chunk_seeds(seeds, compute_pool.max_workers, LUNAR_CHUNK_RETURNS)
+        )
     )
+    return render_lunar_calendar(params, natal, chunks, pretty)
 
-    response_data = {
-        "natal": natal_subject.model_dump(),
-        "lunar_return": lunar_return_subject.model_dump(),
-        "aspects": [a.model_dump() for a in aspects_data.aspects],
-        "context": context_text,
-    }
-
-    if not svg:
-        return _json_response(response_data, cache_key)
 
-    try:
-        chart_data = ChartDataFactory.create_return_chart_data(natal_subject, lunar_return_subject)
-        return _svg_response(chart_data, "lunar_return", cache_key)
-    except Exception as e:
-        logger.exception("Lunar return calculation failed")
-        raise HTTPException(status_code=500, detail=f"Lunar return generation failed: {e}")
+@app.get("/gen/lunar-return/calendar", tags=["Charts"])
+async def get_lunar_return_calendar(
+    request: Request,
+    name: str = Query(..., description="Name of the subject", json_schema_extra={"example": "Ada Lovelace"}),
+    year: int = Query(..., description="Year of birth", json_schema_extra={"example": 1815}),
+    month: int = Query(..., description="Month of birth", json_schema_extra={"example": 12}),
+    day: int = Query(..., description="Day of birth", json_schema_extra={"example": 10}),
+    hour: int = Query(..., description="Hour of birth", json_schema_extra={"example": 6}),
+    minute: int = Query(..., description="Minute of birth", json_schema_extra={"example": 0}),
+    city: str = Query(..., description="City of birth", json_schema_extra={"example": "London"}),
+    lng: float = Query(..., description="Longitude of birth location", json_schema_extra={"example": -0.1278}),
+    lat: float = Query(..., description="Latitude of birth location", json_schema_extra={"example": 51.5074}),
+    tz_str: str = Query(..., description="Timezone string of birth location", json_schema_extra={"example": "Europe/London"}),
+    nation: str = Query(" ", description="Nation of birth", json_schema_extra={"example": "United Kingdom"}),
+    start: str = Query(..., description="Start of the range (ISO date or datetime, UTC)", json_schema_extra={"example": "2024-01-01"}),
+    end: str = Query(..., description="End of the range (ISO date or datetime, UTC)", json_schema_extra={"example": "2024-12-31"}),
+    aspects: bool = Query(False, description="Include the aspects between each return chart and the natal chart"),
+    pretty: bool = Query(False, description="Indent JSON output"),
+):
+    """Every lunar return in a date range: moment, positions and house cusps of each."""
+    params = {
+        "name": name, "year": year, "month": month, "day": day,
+        "hour": hour, "minute": minute, "city": city, "lng": lng,
+        "lat": lat, "tz_str": tz_str, "nation": nation,
+        "start": start, "end": end,
+    }
+    lunar_range(params)  # reject bad or oversized ranges before touching the pool
+    cache_key = _chart_cache_key(
+        "lunar_return_calendar", {**params, "aspects": aspects}, False, DEFAULT_THEME, pretty
+    )
+    started = time.perf_counter()
+    with metrics.collect_timings() as timings:
+        entry = await _get_or_compute(
+            compute_pool, cache_key, "application/json", _lunar_return_calendar, params, aspects, pretty
+        )
+    return _entry_response(
+        request, entry, {"Server-Timing": timings.header(total=time.perf_counter() - started)}
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -457,6 +898,7 @@ async def get_lunar_return_chart(
 
 @app.get("/gen/composite", response_class=Response, responses={200: {"content": {"image/svg+xml": {}}}}, tags=["Charts"])
 async def get_composite_chart(
+    request: Request,
     name1: str = Query(..., description="Name of subject 1", json_schema_extra={"example": "Romeo"}),
     year1: int = Query(..., description="Year of birth 1", json_schema_extra={"example": 1990}),
     month1: int = Query(..., description="Month of birth 1", json_schema_extra={"example": 1}),
@@ -480,36 +922,135 @@ async def get_composite_chart(
     tz_str2: str = Query(..., description="Timezone 2", json_schema_extra={"example": "Europe/Rome"}),
     nation2: str = Query(" ", description="Nation 2", json_schema_extra={"example": "Italy"}),
     svg: bool = Query(False, description="Return SVG image if true, else return JSON", json_schema_extra={"example": False}),
+    theme: str = Query(DEFAULT_THEME, description="CSS theme for SVG output (name of a file in app/themes)"),
+    pretty: bool = Query(False, description="Indent JSON output (ignored for SVG)"),
+    include: str | None = Query(None, description="Comma-separated JSON sections to compute: positions, houses, aspects, context (default: all)"),
 ):
-    cache_key = cache.make_key({
-        "s1": {"n": name1, "y": year1, "m": month1, "d": day1, "h": hour1, "min": minute1, "c": city1, "ln": lng1, "la": lat1, "tz": tz_str1, "nat": nation1},
-        "s2": {"n": name2, "y": year2, "m": month2, "d": day2, "h": hour2, "min": minute2, "c": city2, "ln": lng2, "la": lat2, "tz": tz_str2, "nat": nation2},
-        "svg": svg, "type": "composite",
-    })
+    params = {
+        "name1": name1, "year1": year1, "month1": month1, "day1": day1,
+        "hour1": hour1, "minute1": minute1, "city1": city1, "lng1": lng1,
+        "lat1": lat1, "tz_str1": tz_str1, "nation1": nation1,
+        "name2": name2, "year2": year2, "month2": month2, "day2": day2,
+        "hour2": hour2, "minute2": minute2, "city2": city2, "lng2": lng2,
+        "lat2": lat2, "tz_str2": tz_str2, "nation2": nation2,
+    }
+    return await _timed_chart_response(request, "composite", params, svg, theme, pretty, include)
 
-    cached = _cached_response(cache_key, svg)
-    if cached:
-        return cached
 
-    s1 = create_subject(name1, year1, month1, day1, hour1, minute1, city1, nation1, lng1, lat1, tz_str1)
-    s2 = create_subject(name2, year2, month2, day2, hour2, minute2, city2, nation2, lng2, lat2, tz_str2)
+# ---------------------------------------------------------------------------
+# /gen/transit/timeline
+# ---------------------------------------------------------------------------
 
-    composite_factory = CompositeSubjectFactory(s1, s2)
-    composite_subject = composite_factory.get_midpoint_composite_subject_model()
 
-    chart_data = ChartDataFactory.create_composite_chart_data(composite_subject)
-    context_text = to_context(composite_subject)
+@app.get("/gen/transit/timeline", tags=["Charts"])
+async def get_transit_timeline(
+    request: Request,
+    name: str = Query(..., description="Name of the subject", json_schema_extra={"example": "Ada Lovelace"}),
+    year: int = Query(..., description="Year of birth", json_schema_extra={"example": 1815}),
+    month: int = Query(..., description="Month of birth", json_schema_extra={"example": 12}),
+    day: int = Query(..., description="Day of birth", json_schema_extra={"example": 10}),
+    hour: int = Query(..., description="Hour of birth", json_schema_extra={"example": 6}),
+    minute: int = Query(..., description="Minute of birth", json_schema_extra={"example": 0}),
+    city: str = Query(..., description="City of birth", json_schema_extra={"example": "London"}),
+    lng: float = Query(..., description="Longitude of birth location", json_schema_extra={"example": -0.1278}),
+    lat: float = Query(..., description="Latitude of birth location", json_schema_extra={"example": 51.5074}),
+    tz_str: str = Query(..., description="Timezone string of birth location", json_schema_extra={"example": "Europe/London"}),
+    nation: str = Query(" ", description="Nation of birth", json_schema_extra={"example": "United Kingdom"}),
+    start: str = Query(..., description="Start of the range (ISO date or datetime, UTC)", json_schema_extra={"example": "2024-01-01"}),
+    end: str = Query(..., description="End of the range (ISO date or datetime, UTC)", json_schema_extra={"example": "2024-12-31"}),
+    step_hours: float | None = Query(None, description="Sampling step in hours (default: fine enough for the Moon's shortest aspect windows)", gt=0, json_schema_extra={"example": 24}),
+    max_orb: float | None = Query(None, description="Cap every aspect orb at this many degrees", ge=0),
+    output: Literal["events", "columnar"] = Query("events", description="One object per event, or one array per field"),
+    precise: bool = Query(False, description="Compute every sample with Swiss Ephemeris instead of the precomputed table"),
+    pretty: bool = Query(False, description="Indent JSON output"),
+):
+    """Aspect hit intervals (entry, exact, exit) between transiting planets and a natal chart."""
+    params = {
+        "name": name, "year": year, "month": month, "day": day,
+        "hour": hour, "minute": minute, "city": city, "lng": lng,
+        "lat": lat, "tz_str": tz_str, "nation": nation,
+        "start": start, "end": end, "step_hours": step_hours,
+        "max_orb": max_orb, "output": output, "precise": precise,
+    }
+    sample_times(params)  # reject oversized ranges before touching the pool
+    cache_key = cache.make_key({**params, "type": "transit_timeline", "pretty": pretty})
+    started = time.perf_counter()
+    with metrics.collect_timings() as timings:
+        entry = await _get_or_compute(
+            compute_pool, cache_key, "application/json", build_transit_timeline, params, pretty
+        )
+    return _entry_response(
+        request, entry, {"Server-Timing": timings.header(total=time.perf_counter() - started)}
+    )
+
+
+# ---------------------------------------------------------------------------
+# /gen/batch
+# ---------------------------------------------------------------------------
 
-    if not svg:
-        response_data = {
-            "composite_subject": composite_subject.model_dump(),
-            "aspects": [a.model_dump() for a in chart_data.aspects],
-            "context": context_text,
-        }
-        return _json_response(response_data, cache_key)
 
+async def _batch_item(index: int, item: ChartRequest) -> bytes:
+    """Produce one NDJSON line for *item*; errors are reported, not raised."""
+    record = {"index": index, "id": item.id, "type": item.type}
     try:
-        return _svg_response(chart_data, "composite", cache_key)
+        params = validate_params(item.type, item.params)
+        cache_key = _chart_cache_key(item.type, params, item.svg, item.theme)
+        while True:
+            try:
+                entry = await _get_or_compute(
+                    batch_pool, cache_key, _media_type(item.svg),
+                    build_chart, item.type, params, item.svg, item.theme,
+                )
+                break
+            except PoolSaturatedError:
+                # Another batch holds the pool; wait for a slot instead of failing the item.
+                await asyncio.sleep(0.05)
+    except ValidationError as e:
+        record.update(status=422, error=e.errors(include_url=False, include_context=False))
+        return dumps(record) + b"\n"
+    except (HTTPException, ComputeError) as e:
+        record.update(status=e.status_code, error=e.detail)
+        return dumps(record) + b"\n"
     except Exception as e:
-        logger.exception("Composite calculation failed")
-        raise HTTPException(status_code=500, detail=f"Composite generation failed: {e}")
+        logger.exception("Batch item %d failed", index)
+        record.update(status=500, error=str(e))
+        return dumps(record) + b"\n"
+
+    record.update(status=200, media_type=_media_type(item.svg))
+    content = cache.content(entry)
+    if item.svg:
+        record["content"] = content.decode("utf-8")
+        return dumps(record) + b"\n"
+    # Cached JSON is compact (one line), so embed it as-is instead of re-parsing it.
+    return dumps(record)[:-1] + b',"content":' + content + b"}\n"
+
+
+@app.post("/gen/batch", tags=["Charts"], response_class=StreamingResponse, responses={200: {"content": {"application/x-ndjson": {}}}})
+async def batch_charts(items: list[ChartRequest]):
+    """Compute many charts of any type in one request.
+
+    Items are checked against the response cache, fanned out across the
+    batch worker processes, and streamed back as NDJSON in completion order.
+    Each line carries the item's ``index`` (and ``id`` if given) with either
+    ``content`` or an ``error`` and its HTTP-style ``status``.
+    """
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {BATCH_MAX_ITEMS} items)")
+
+    async def stream():
+        # Keep at most one item per worker in flight; the rest wait here, not in the pool.
+        slots = asyncio.Semaphore(batch_pool.max_workers)
+
+        async def run(index: int, item: ChartRequest) -> bytes:
+            async with slots:
+                return await _batch_item(index, item)
+
+        tasks = [asyncio.ensure_future(run(i, item)) for i, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,174 @@
+"""Prometheus metrics for ``/metrics``.
+
+Under gunicorn each worker is a separate process, so the service runs
+prometheus_client in multiprocess mode when ``PROMETHEUS_MULTIPROC_DIR`` is
+set: every process (including batch worker processes) writes its samples to
+files in that directory and a scrape aggregates them, whichever worker
+answers it.  ``gunicorn.conf.py`` empties the directory at startup and
+retires the files of exited workers.  Without the variable the metrics of
+the current process are served.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# A shared SQLite cache reports the same totals from every worker; per-process
+# memory caches add up.
+_CACHE_GAUGE_MODE = "livemax" if os.getenv("CACHE_BACKEND", "memory").strip().lower() == "sqlite" else "livesum"
+
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+REQUEST_LATENCY = Histogram(
+    "astral_request_duration_seconds",
+    "Chart request latency by endpoint, output format and status code.",
+    ["endpoint", "format", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "astral_stage_duration_seconds",
+    "Time spent in each chart building stage.",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+CACHE_LOOKUPS = Counter("astral_cache_lookups_total", "Cache lookups by cache and result.", ["cache", "result"])
+CACHE_EVICTIONS = Counter("astral_cache_evictions_total", "Entries evicted by cache.", ["cache"])
+CACHE_ITEMS = Gauge("astral_cache_items", "Entries held by cache.", ["cache"], multiprocess_mode=_CACHE_GAUGE_MODE)
+CACHE_BYTES = Gauge(
+    "astral_cache_bytes", "Stored bytes in the response cache.", multiprocess_mode=_CACHE_GAUGE_MODE
+)
+POOL_IN_FLIGHT = Gauge(
+    "astral_pool_in_flight", "Jobs running or queued on a compute pool.", ["pool"], multiprocess_mode="livesum"
+)
+POOL_QUEUE_DEPTH = Gauge(
+    "astral_pool_queue_depth", "Jobs waiting for a compute pool worker.", ["pool"], multiprocess_mode="livesum"
+)
+POOL_REJECTED = Counter("astral_pool_rejected_total", "Jobs rejected because a compute pool was full.", ["pool"])
+
+
+class RequestTimings:
+    """Stage durations and notes gathered while serving one request.
+
+    Rendered as a ``Server-Timing`` header value.
+    """
+
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+        self.notes: dict[str, str] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def note(self, name: str, description: str) -> None:
+        self.notes[name] = description
+
+    def header(self, total: float | None = None) -> str:
+        parts = [f'{name};desc="{desc}"' for name, desc in self.notes.items()]
+        parts += [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.durations.items()]
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+
+_request_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+_stage_histograms: dict = {}
+
+
+@contextmanager
+def collect_timings():
+    """Gather :func:`stage` durations from this context (and thread-pool jobs it starts)."""
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def current_timings() -> RequestTimings | None:
+    return _request_timings.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Record the duration of the enclosed block under ``stage=name``.
+
+    Also adds it to the request's :class:`RequestTimings` when one is being
+    collected.
+    """
+    histogram = _stage_histograms.get(name)
+    if histogram is None:
+        histogram = _stage_histograms.setdefault(name, STAGE_LATENCY.labels(name))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+def render() -> tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, and its content type."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing ``/gen`` requests into :data:`REQUEST_LATENCY`.
+
+    The endpoint label is the matched route's path template, and the format
+    comes from the ``svg`` query flag.  Streaming responses are timed until
+    the body is complete.
+    """
+
+    def __init__(self, app, prefix: str = "/gen"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            svg_flag = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("svg", ["false"])[-1]
+            svg = svg_flag.strip().lower() in {"1", "true", "yes", "on"}
+            REQUEST_LATENCY.labels(endpoint, "svg" if svg else "json", str(status)).observe(
+                time.perf_counter() - start
+            )
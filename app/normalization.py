@@ -0,0 +1,144 @@
+"""Canonical chart inputs, so requests that describe the same sky share computations.
+
+Chart parameters are split in two:
+
+- the fields that affect the astrology (date, time, coordinates, timezone),
+  with longitudes and latitudes rounded to ``COORDINATE_PRECISION`` decimal
+  places (default 4, about 11 m), and
+- the display labels (``name``, ``city`` and ``nation`` of every subject),
+  which only end up in the output.
+
+Charts are computed with a placeholder token in place of every label and
+memoized on the remaining fields; :func:`relabel` then substitutes the
+requested labels into the computed models, including strings kerykeion
+derives from them ("<name> Solar Return", aspect owners, house comparison
+names, ...).  For a symmetric pair chart (composite), the two subjects are
+also put in a canonical order, and :func:`relabel` swaps them back.
+"""
+
+import os
+import re
+from typing import Any, NamedTuple
+
+from pydantic import BaseModel
+
+COORDINATE_PRECISION = int(os.getenv("COORDINATE_PRECISION", "4"))
+
+LABEL_FIELDS = ("name", "city", "nation")
+_COORDINATE_FIELDS = ("lng", "lat")
+
+_TOKEN_START, _TOKEN_END = "\ue000", "\ue001"  # private use code points, never in real labels
+_TOKEN = re.compile(f"{_TOKEN_START}([^{_TOKEN_END}]+){_TOKEN_END}")
+
+
+class NormalizedParams(NamedTuple):
+    compute: dict
+    """Parameters to compute with: coordinates rounded, labels replaced by tokens."""
+    labels: dict[str, str]
+    """Label field -> requested label."""
+    swapped: bool
+    """True if the two subjects of a symmetric pair were swapped into canonical order."""
+
+
+def token(field: str) -> str:
+    """Placeholder that stands for the label *field* until :func:`relabel`."""
+    return f"{_TOKEN_START}{field}{_TOKEN_END}"
+
+
+def _base(key: str) -> str:
+    """Field name without its ``t_`` prefix and ``1``/``2`` suffix."""
+    return key.removeprefix("t_").rstrip("12")
+
+
+def round_coordinates(params: dict) -> dict:
+    """*params* with every longitude and latitude rounded to ``COORDINATE_PRECISION`` places."""
+    return {
+        key: round(float(value), COORDINATE_PRECISION) if _base(key) in _COORDINATE_FIELDS else value
+        for key, value in params.items()
+    }
+
+
+def _swap_suffixes(params: dict) -> dict:
+    swap = {"1": "2", "2": "1"}
+    return {key[:-1] + swap[key[-1]] if key[-1:] in swap else key: value for key, value in params.items()}
+
+
+def normalize(params: dict, symmetric: bool = False) -> NormalizedParams:
+    """Split *params* into the canonical inputs of the computation and its labels.
+
+    With *symmetric*, subjects ``1`` and ``2`` are ordered by their
+    computation fields, so A+B and B+A normalize to the same inputs.
+    """
+    compute = round_coordinates(params)
+    labels = {key: str(value) for key, value in params.items() if _base(key) in LABEL_FIELDS}
+    swapped = False
+    if symmetric:
+        first = [value for key, value in sorted(compute.items()) if key.endswith("1") and key not in labels]
+        second = [value for key, value in sorted(compute.items()) if key.endswith("2") and key not in labels]
+        if second < first:
+            compute = _swap_suffixes(compute)
+            swapped = True
+    compute.update({key: token(key) for key in labels})
+    return NormalizedParams(compute, labels, swapped)
+
+
+def data_labels(normalized: NormalizedParams) -> dict[str, str]:
+    """Labels keyed by the token each subject was computed under.
+
+    Equal to ``normalized.labels`` unless the pair was swapped, in which case
+    the subject computed as ``1`` carries the labels requested for ``2``.
+    """
+    return _swap_suffixes(normalized.labels) if normalized.swapped else normalized.labels
+
+
+def relabel(obj: Any, labels: dict[str, str], swap_pair: bool = False, plan: dict | None = None) -> Any:
+    """Copy of *obj* with every token replaced by its label from *labels*.
+
+    Walks pydantic models, lists, tuples and dicts; parts without tokens
+    are shared, not copied.  With *swap_pair*, models with ``first_subject``
+    and ``second_subject`` get them swapped back into the requested order.
+
+    *plan* records, per container, which of its fields hold tokens, so
+    later calls over the same object tree visit only those.  Only reuse a
+    plan for the same, unchanging tree (it is keyed by object id).
+    """
+    if isinstance(obj, str):
+        if _TOKEN_START not in obj:
+            return obj
+        return _TOKEN.sub(lambda m: labels.get(m.group(1), ""), obj)
+    if isinstance(obj, BaseModel):
+        fields = type(obj).model_fields
+        get = obj.__getattribute__
+    elif isinstance(obj, (list, tuple)):
+        fields = range(len(obj))
+        get = obj.__getitem__
+    elif isinstance(obj, dict):
+        fields = obj.keys()
+        get = obj.__getitem__
+    else:
+        return obj
+
+    planned = plan.get(id(obj)) if plan is not None else None
+    changed = {}
+    for name in fields if planned is None else planned:
+        value = get(name)
+        new = relabel(value, labels, swap_pair, plan)
+        if new is not value:
+            changed[name] = new
+    if plan is not None and planned is None:
+        plan[id(obj)] = tuple(changed)
+
+    if isinstance(obj, BaseModel):
+        if swap_pair and "first_subject" in fields and "second_subject" in fields:
+            first = changed.get("first_subject", obj.first_subject)
+            changed["first_subject"] = changed.get("second_subject", obj.second_subject)
+            changed["second_subject"] = first
+        return obj.model_copy(update=changed) if changed else obj
+    if not changed:
+        return obj
+    if isinstance(obj, dict):
+        return {**obj, **changed}
+    items = list(obj)
+    for index, new in changed.items():
+        items[index] = new
+    return type(obj)(items)
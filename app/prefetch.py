@@ -0,0 +1,132 @@
+"""Background precomputation of chart specs at low priority.
+
+A :class:`Prefetcher` runs submitted jobs one at a time and one item at a
+time, and holds off while ``is_busy()`` reports interactive work waiting, so
+warming the cache never competes with live traffic for long.  Jobs are kept
+(newest ``max_jobs``) so their progress can be polled.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchJob:
+    """Progress of one submitted list of chart specs."""
+
+    _MAX_ERRORS = 20
+
+    def __init__(self, total: int):
+        self.id = uuid.uuid4().hex
+        self.total = total
+        self.state = "queued"
+        self.cached = 0
+        self.computed = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+        self.created = time.time()
+        self.finished: float | None = None
+        self.task: asyncio.Task | None = None
+
+    def record(self, outcome: str) -> None:
+        if outcome == "cached":
+            self.cached += 1
+        else:
+            self.computed += 1
+
+    def fail(self, index: int, error) -> None:
+        self.failed += 1
+        if len(self.errors) < self._MAX_ERRORS:
+            self.errors.append({"index": index, "error": error})
+
+    def info(self) -> dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "total": self.total,
+            "done": self.cached + self.computed + self.failed,
+            "cached": self.cached,
+            "computed": self.computed,
+            "failed": self.failed,
+            "errors": self.errors,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+class Prefetcher:
+    """Run prefetch jobs in the background.
+
+    *run_item* computes (or finds cached) one spec and returns ``"cached"``
+    or ``"computed"``; an ``HTTPException``-like error (with ``status_code``
+    and ``detail``) or any other exception marks the item failed.
+    """
+
+    def __init__(
+        self,
+        run_item: Callable[[object], Awaitable[str]],
+        is_busy: Callable[[], bool],
+        max_jobs: int = 20,
+        poll_interval: float = 0.1,
+    ):
+        self.run_item = run_item
+        self.is_busy = is_busy
+        self.max_jobs = max_jobs
+        self.poll_interval = poll_interval
+        self._jobs: dict[str, PrefetchJob] = {}
+        self._turn = asyncio.Lock()
+
+    def submit(self, items: list) -> PrefetchJob:
+        job = PrefetchJob(len(items))
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_jobs:
+            oldest = next(iter(self._jobs.values()))
+            if oldest.state in ("queued", "running"):
+                break
+            del self._jobs[oldest.id]
+        job.task = asyncio.ensure_future(self._run(job, items))
+        return job
+
+    def get(self, job_id: str) -> PrefetchJob | None:
+        return self._jobs.get(job_id)
+
+    def info(self) -> dict:
+        states = [job.state for job in self._jobs.values()]
+        return {
+            "jobs": len(states),
+            "running": states.count("running"),
+            "queued": states.count("queued"),
+        }
+
+    def cancel_all(self) -> None:
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+    async def _run(self, job: PrefetchJob, items: list) -> None:
+        try:
+            async with self._turn:
+                job.state = "running"
+                for index, item in enumerate(items):
+                    while self.is_busy():
+                        await asyncio.sleep(self.poll_interval)
+                    try:
+                        job.record(await self.run_item(item))
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        if hasattr(e, "status_code"):
+                            job.fail(index, {"status": e.status_code, "detail": getattr(e, "detail", str(e))})
+                        else:
+                            logger.exception("Prefetch item %d failed", index)
+                            job.fail(index, {"status": 500, "detail": str(e)})
+                job.state = "done"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            raise
+        finally:
+            job.finished = time.time()
@@ -0,0 +1,76 @@
+"""On-demand cProfile captures of single chart requests.
+
+:func:`profile_call` runs on the compute pool worker (thread or process) and
+returns the result with the raw profile; :func:`save` writes it as a
+``.prof`` file, loadable with ``pstats`` or snakeviz, under ``PROFILE_DIR``.
+The directory is shared by all workers and keeps the newest
+``PROFILE_MAX_FILES`` captures.
+"""
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import re
+import threading
+import uuid
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/astral-kerykeion/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+_PROFILE_ID = re.compile(r"[0-9a-f]{32}")
+# Only one profiler can be active per process on newer Pythons.
+_profiler_lock = threading.Lock()
+
+
+def profile_call(fn, *args):
+    """Call ``fn(*args)`` under cProfile; return ``(result, marshalled stats)``."""
+    with _profiler_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = fn(*args)
+        finally:
+            profiler.disable()
+    profiler.create_stats()
+    return result, marshal.dumps(profiler.stats)
+
+
+def save(stats: bytes, directory: str | None = None, max_files: int | None = None) -> str:
+    """Store a capture and return its id, dropping the oldest beyond *max_files*."""
+    directory = directory or PROFILE_DIR
+    max_files = PROFILE_MAX_FILES if max_files is None else max_files
+    os.makedirs(directory, exist_ok=True)
+    profile_id = uuid.uuid4().hex
+    tmp_path = os.path.join(directory, f".{profile_id}.tmp")
+    with open(tmp_path, "wb") as fh:
+        fh.write(stats)
+    os.replace(tmp_path, os.path.join(directory, f"{profile_id}.prof"))
+
+    captures = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".prof")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in captures[: max(0, len(captures) - max_files)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+    return profile_id
+
+
+def path_for(profile_id: str, directory: str | None = None) -> str | None:
+    """Path of a stored capture, or None if the id is malformed or unknown."""
+    directory = directory or PROFILE_DIR
+    if not _PROFILE_ID.fullmatch(profile_id):
+        return None
+    path = os.path.join(directory, f"{profile_id}.prof")
+    return path if os.path.exists(path) else None
+
+
+def summary(path: str, limit: int = 40, sort: str = "cumulative") -> str:
+    """``pstats`` text report of a capture's top *limit* functions."""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,235 @@
+"""Series of planetary returns for one natal chart.
+
+The natal subject and the ``PlanetaryReturnFactory`` are built once per
+series (or once per chunk, see below), and every search after the first is
+seeded just short of where the next return must be: the previous return
+plus a solar year or a sidereal month, less a day of margin.  Swiss
+Ephemeris then only has to refine the crossing instead of scanning from the
+start of the range.
+
+Finding the return moments alone is cheap; casting a chart at each one is
+not.  :func:`solar_seeds` and :func:`lunar_seeds` therefore run the
+incremental search over the whole range first.  Long ranges are then split
+into chunks (:func:`chunk_seeds`), at most one per compute worker, whose
+charts are cast in parallel on the compute pool, each search starting from
+its seed, and merged with :func:`render_solar_series` or
+:func:`render_lunar_calendar`.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+import swisseph as swe
+from kerykeion.aspects import AspectsFactory
+from kerykeion.chart_data_factory import ChartDataFactory
+from kerykeion.planetary_return_factory import PlanetaryReturnFactory
+from kerykeion.utilities import datetime_to_julian, julian_to_datetime
+
+import metrics
+from chart_helpers import create_subject, generate_svg
+from compute_pool import ComputeError
+from normalization import round_coordinates
+from serialization import dumps
+from themes import DEFAULT_THEME
+from transit_timeline import julian_day
+
+MAX_SERIES_YEARS = int(os.getenv("RETURN_SERIES_MAX_YEARS", "100"))
+CHUNK_YEARS = int(os.getenv("RETURN_SERIES_CHUNK_YEARS", "10"))
+# About a year of lunar returns: the smallest chunk worth a pool job.
+LUNAR_CHUNK_RETURNS = 13
+
+# A return can come no sooner than this after the previous one.
+_SOLAR_SEED_DAYS = 365.2422 - 1.0
+_LUNAR_SEED_DAYS = 27.3217 - 1.0
+
+
+def _natal(p: dict):
+    return create_subject(
+        p["name"], p["year"], p["month"], p["day"], p["hour"], p["minute"],
+        p["city"], p["nation"], p["lng"], p["lat"], p["tz_str"],
+    )
+
+
+def _factory(natal, p: dict) -> PlanetaryReturnFactory:
+    return PlanetaryReturnFactory(natal, lng=p["lng"], lat=p["lat"], tz_str=p["tz_str"], online=False)
+
+
+def compact_subject(subject) -> dict:
+    """Sign, degree, house and motion of every active point, and the house cusps."""
+    points = {}
+    for name in subject.active_points:
+        point = getattr(subject, name.lower(), None)
+        if point is None:
+            continue
+        points[name] = {
+            "sign": point.sign,
+            "position": round(point.position, 4),
+            "abs_pos": round(point.abs_pos, 4),
+            "house": point.house,
+            "retrograde": point.retrograde,
+        }
+    houses = [round(getattr(subject, name.lower()).abs_pos, 4) for name in subject.houses_names_list]
+    return {"points": points, "houses": houses}
+
+
+def compact_aspects(natal, return_subject) -> list[dict]:
+    """Aspects from the return chart's points to the natal ones, with their orbs."""
+    with metrics.stage("aspects"):
+        aspects = AspectsFactory.synastry_aspects(natal, return_subject).aspects
+    return [
+        {"natal_point": a.p1_name, "return_point": a.p2_name, "aspect": a.aspect, "orb": round(a.orbit, 4)}
+        for a in aspects
+    ]
+
+
+def _return_entry(natal, return_subject, svg: bool, theme: str, prefix: str, aspects: bool = False) -> dict:
+    entry = {
+        "moment": return_subject.iso_formatted_utc_datetime,
+        "local_time": return_subject.iso_formatted_local_datetime,
+        "julian_day": return_subject.julian_day,
+        **compact_subject(return_subject),
+    }
+    if aspects:
+        entry["aspects"] = compact_aspects(natal, return_subject)
+    if svg:
+        with metrics.stage("chart_data"):
+            chart_data = ChartDataFactory.create_return_chart_data(natal, return_subject)
+        entry["svg"] = generate_svg(chart_data, prefix=prefix, theme=theme)
+    return entry
+
+
+def check_year_range(p: dict) -> None:
+    """Raise a 400 for an empty range or one longer than ``MAX_SERIES_YEARS``."""
+    years = p["end_year"] - p["start_year"] + 1
+    if years < 1:
+        raise ComputeError(400, "Expected start_year <= end_year")
+    if years > MAX_SERIES_YEARS:
+        raise ComputeError(400, f"Range covers {years} years (max {MAX_SERIES_YEARS})")
+
+
+def solar_seeds(p: dict) -> list[tuple[int, str]]:
+    """``(year, search start)`` for every year of the series, as ISO UTC times.
+
+    Year ``start_year`` is searched from its January 1st (UTC), as
+    ``/gen/solar-return`` does; each later one from the previous return plus
+    :data:`_SOLAR_SEED_DAYS`, or its own January 1st if that is later.  So a
+    birthday near New Year, whose return falls on either side of it from one
+    year to the next, never yields the same return twice.
+    """
+    p = round_coordinates(p)
+    sun = _natal(p).sun.abs_pos
+    seeds = []
+    previous = None
+    for year in range(p["start_year"], p["end_year"] + 1):
+        seed = datetime(year, 1, 1, tzinfo=timezone.utc)
+        if previous is not None:
+            seed = max(seed, previous + timedelta(days=_SOLAR_SEED_DAYS))
+        seeds.append((year, seed.isoformat()))
+        with metrics.stage("return_search"):
+            jd = swe.solcross_ut(sun, datetime_to_julian(seed))
+        previous = julian_to_datetime(jd).replace(tzinfo=timezone.utc)
+    return seeds
+
+
+def chunk_seeds(seeds: list, parts: int, min_size: int | None = None) -> list[list]:
+    """*seeds* split into at most *parts* chunks of at least *min_size* each.
+
+    *min_size* defaults to ``CHUNK_YEARS``, for yearly (solar) seeds.
+    """
+    size = max(1, CHUNK_YEARS if min_size is None else min_size, -(-len(seeds) // max(1, parts)))
+    return [seeds[i:i + size] for i in range(0, len(seeds), size)]
+
+
+def build_solar_chunk(
+    p: dict, seeds: list[tuple[int, str]], svg: bool = False, theme: str = DEFAULT_THEME
+) -> list[dict]:
+    """Solar return charts for the ``(year, search start)`` pairs in *seeds*, as compact entries."""
+    p = round_coordinates(p)
+    natal = _natal(p)
+    factory = _factory(natal, p)
+    entries = []
+    for year, seed in seeds:
+        with metrics.stage("return_search"):
+            return_subject = factory.next_return_from_iso_formatted_time(seed, "Solar")
+        entries.append({"year": year, **_return_entry(natal, return_subject, svg, theme, "solar_return")})
+    return entries
+
+
+def render_solar_series(p: dict, chunks: list[list[dict]], pretty: bool = False) -> bytes:
+    """JSON body of a series from its computed chunks, in order."""
+    with metrics.stage("serialize"):
+        return dumps(
+            {
+                "start_year": p["start_year"],
+                "end_year": p["end_year"],
+                "returns": [entry for chunk in chunks for entry in chunk],
+            },
+            pretty=pretty,
+        )
+
+
+def lunar_range(p: dict) -> tuple[float, float]:
+    """Julian days of ``p["start"]`` and ``p["end"]`` (ISO dates or datetimes, UTC).
+
+    Raises a 400 for an unparseable or empty range, or one longer than
+    ``MAX_SERIES_YEARS`` years.
+    """
+    try:
+        start_jd = julian_day(datetime.fromisoformat(p["start"]))
+        end_jd = julian_day(datetime.fromisoformat(p["end"]))
+    except ValueError as e:
+        raise ComputeError(400, f"Invalid date: {e}")
+    if end_jd < start_jd:
+        raise ComputeError(400, "Expected start <= end")
+    if end_jd - start_jd > MAX_SERIES_YEARS * 366:
+        raise ComputeError(400, f"Range is longer than {MAX_SERIES_YEARS} years")
+    return start_jd, end_jd
+
+
+def lunar_seeds(p: dict) -> tuple[dict, list[str]]:
+    """The compact natal chart, and a search start (ISO UTC) per lunar return in the range.
+
+    The first search starts at ``p["start"]``, each later one at the
+    previous return plus :data:`_LUNAR_SEED_DAYS`; returns after
+    ``p["end"]`` are left out.
+    """
+    p = round_coordinates(p)
+    start_jd, end_jd = lunar_range(p)
+    natal = _natal(p)
+    seeds = []
+    seed = start_jd
+    while True:
+        with metrics.stage("return_search"):
+            jd = swe.mooncross_ut(natal.moon.abs_pos, seed)
+        if jd > end_jd:
+            break
+        seeds.append(julian_to_datetime(seed).replace(tzinfo=timezone.utc).isoformat())
+        seed = jd + _LUNAR_SEED_DAYS
+    return compact_subject(natal), seeds
+
+
+def build_lunar_chunk(p: dict, seeds: list[str], aspects: bool = False) -> list[dict]:
+    """Lunar return charts for the search starts in *seeds*, as compact entries."""
+    p = round_coordinates(p)
+    natal = _natal(p)
+    factory = _factory(natal, p)
+    entries = []
+    for seed in seeds:
+        with metrics.stage("return_search"):
+            return_subject = factory.next_return_from_iso_formatted_time(seed, "Lunar")
+        entries.append(_return_entry(natal, return_subject, False, DEFAULT_THEME, "lunar_return", aspects))
+    return entries
+
+
+def render_lunar_calendar(p: dict, natal: dict, chunks: list[list[dict]], pretty: bool = False) -> bytes:
+    """JSON body of a lunar return calendar from its computed chunks, in order."""
+    with metrics.stage("serialize"):
+        return dumps(
+            {
+                "start": p["start"],
+                "end": p["end"],
+                "natal": natal,
+                "returns": [entry for chunk in chunks for entry in chunk],
+            },
+            pretty=pretty,
+        )
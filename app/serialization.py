@@ -0,0 +1,24 @@
+"""JSON encoding for chart bodies.
+
+Uses ``orjson`` when it is installed and the standard library otherwise;
+both produce the same document.  Output is compact UTF-8 bytes by default,
+ready to cache and send; ``pretty=True`` indents by two spaces.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+
+def dumps(data, pretty: bool = False) -> bytes:
+    """Serialize *data* to UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
@@ -0,0 +1,61 @@
+"""Coalescing of concurrent identical cache misses."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time.
+
+    The first caller for a key (the leader) starts the computation as its
+    own task; it and every caller arriving while it is in flight await that
+    task through :func:`asyncio.shield`, so a caller that is cancelled (a
+    client disconnect, a cancelled batch) stops waiting without cancelling
+    the computation for the others.  Errors propagate to every waiter.
+    Followers give up after ``timeout`` seconds; the computation keeps
+    running and still completes for the others.
+    """
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        self.leaders += 1
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def info(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "timeout_seconds": self.timeout,
+        }
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Retrieving the exception also keeps an error nobody awaited from being logged as unhandled.
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
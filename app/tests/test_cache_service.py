@@ -0,0 +1,236 @@
+import asyncio
+import threading
+
+import pytest
+
+from cache_backends import MemoryBackend, SQLiteBackend, backend_from_env
+from cache_service import CacheService
+from compression import encode
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def factory(**kwargs):
+        if request.param == "sqlite":
+            kwargs["backend"] = SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+        return CacheService(**kwargs)
+    return factory
+
+
+def test_lru_eviction_order(make_cache):
+    cache = make_cache(max_items=2)
+    cache.put("a", "1", "application/json")
+    cache.put("b", "2", "application/json")
+    assert cache.get("a") is not None
+    cache.put("c", "3", "application/json")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.info(include_details=True)["access_order"] == ["a", "c"]
+
+
+def test_size_counts_encoded_bytes(make_cache):
+    cache = make_cache(encodings=("identity",))
+    cache.put("ascii", "abcd", "application/json")
+    cache.put("utf8", "☉☽", "image/svg+xml")
+    cache.put("raw", b"\x00\x01\x02", "application/octet-stream")
+    assert cache.size_bytes == 4 + 6 + 3
+
+
+def test_overwrite_and_clear_keep_running_total_exact(make_cache):
+    cache = make_cache(encodings=("identity",))
+    cache.put("a", "x" * 100, "application/json")
+    cache.put("a", "x" * 10, "application/json")
+    assert cache.size_bytes == 10
+    assert cache.info()["cache_items"] == 1
+
+    cache.clear()
+    assert cache.size_bytes == 0
+
+
+def test_evicts_by_size(make_cache):
+    cache = make_cache(max_items=100, max_size_mb=1 / 1024, encodings=("identity",))  # 1 KiB
+    for i in range(4):
+        cache.put(str(i), "x" * 400, "application/json")
+    assert cache.size_bytes <= 1024
+    assert cache.get("0") is None
+    assert cache.get("3") is not None
+
+
+def test_stores_compressed_variants_and_counts_compressed_bytes(make_cache):
+    import gzip
+
+    svg = "<svg>" + "<circle r='1'/>" * 1000 + "</svg>"
+    cache = make_cache(encodings=("gzip", "identity"))
+    entry = cache.put("chart", svg, "image/svg+xml")
+
+    hit = cache.get("chart")
+    assert set(hit["variants"]) == {"gzip", "identity"}
+    assert gzip.decompress(hit["variants"]["gzip"]) == svg.encode()
+    assert cache.size_bytes == entry["size"] == len(hit["variants"]["gzip"]) + len(svg)
+    assert CacheService.content(hit) == svg.encode()
+
+
+def test_encoded_body_negotiates_without_recompressing(make_cache):
+    cache = make_cache(encodings=("gzip",))
+    cache.put("k", "x" * 1000, "application/json")
+    hit = cache.get("k")
+
+    body, encoding = CacheService.encoded_body(hit, "gzip, deflate, br")
+    assert encoding == "gzip"
+    assert body == hit["variants"]["gzip"]
+
+    body, encoding = CacheService.encoded_body(hit, None)
+    assert (body, encoding) == (b"x" * 1000, None)
+
+    body, encoding = CacheService.encoded_body(hit, "gzip;q=0")
+    assert (body, encoding) == (b"x" * 1000, None)
+
+
+def test_gds_keeps_expensive_entries_over_recent_cheap_ones(make_cache):
+    cache = make_cache(max_items=2, encodings=("identity",))
+    cache.update_config(None, None, policy="gds")
+    cache.put("slow", "x" * 100, "application/json", cost=2.0)
+    cache.put("cheap", "x" * 100, "application/json", cost=0.01)
+    cache.put("new", "x" * 100, "application/json", cost=0.05)
+
+    assert cache.get("slow") is not None
+    assert cache.get("cheap") is None
+    assert cache.get("new") is not None
+    assert cache.info()["policy"] == "gds"
+
+
+def test_gds_weighs_cost_against_size(make_cache):
+    cache = make_cache(max_items=2, encodings=("identity",))
+    cache.update_config(None, None, policy="gds")
+    cache.put("big", "x" * 10_000, "application/json", cost=1.0)
+    cache.put("small", "x" * 100, "application/json", cost=0.1)
+    cache.put("new", "x" * 100, "application/json", cost=0.1)
+
+    assert cache.get("big") is None
+    assert cache.get("small") is not None
+
+
+def test_ttl_entries_expire(make_cache, monkeypatch):
+    import time
+
+    cache = make_cache(encodings=("identity",))
+    cache.put("sky", "{}", "application/json", ttl=60)
+    cache.put("natal", "{}", "application/json")
+    assert cache.get("sky") is not None
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    if isinstance(cache.backend, MemoryBackend):
+        cache.backend.clock = lambda: later
+    assert cache.get("sky") is None
+    assert cache.get("natal") is not None
+    cache.put("other", "{}", "application/json")
+    assert cache.info()["cache_items"] == 2
+
+
+def test_unknown_policy_is_rejected(make_cache):
+    cache = make_cache()
+    with pytest.raises(ValueError):
+        cache.update_config(None, None, policy="random")
+    assert cache.info()["policy"] == "lru"
+
+
+def test_sqlite_backend_resets_older_schema(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, content BLOB, media_type TEXT, size INTEGER, last_used REAL)")
+    conn.execute("INSERT INTO entries VALUES ('k', 'raw text', 'application/json', 8, 0)")
+    conn.commit()
+    conn.close()
+
+    cache = CacheService(backend=SQLiteBackend(path))
+    assert cache.get("k") is None
+    cache.put("k", "{}", "application/json")
+    assert CacheService.content(cache.get("k")) == b"{}"
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    worker_a = CacheService(backend=SQLiteBackend(path))
+    worker_b = CacheService(backend=SQLiteBackend(path))
+
+    worker_a.put("chart", "<svg/>", "image/svg+xml")
+    hit = worker_b.get("chart")
+    assert CacheService.content(hit) == b"<svg/>"
+    assert hit["media_type"] == "image/svg+xml"
+    assert worker_b.info()["cache_items"] == 1
+
+    info = worker_b.info()
+    assert info["backend"] == "sqlite"
+    assert info["backend_stats"]["process_hits"] == 1
+
+
+def test_sqlite_config_changes_apply_to_every_worker(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    worker_a = CacheService(backend=SQLiteBackend(path))
+    worker_b = CacheService(backend=SQLiteBackend(path))
+
+    worker_a.update_config(max_items=2, max_size_mb=None, policy="gds")
+    info = worker_b.info()
+    assert (info["max_items"], info["max_size_mb"], info["policy"]) == (2, 100, "gds")
+
+    for key in "abc":
+        worker_b.put(key, "{}", "application/json")
+    assert len(worker_b.backend) == 2
+
+    # A worker started later picks the stored settings up as well.
+    worker_c = CacheService(backend=SQLiteBackend(path, policy="lru"))
+    assert worker_c.info()["policy"] == "gds" and worker_c.limits() == (2, 100)
+
+
+def test_sqlite_backend_is_used_off_the_event_loop(tmp_path):
+    service = CacheService(backend=SQLiteBackend(str(tmp_path / "loop.sqlite3")))
+    threads = []
+    get, put = service.backend.get, service.backend.put
+    service.backend.get = lambda key: threads.append(threading.get_ident()) or get(key)
+    service.backend.put = lambda key, entry: threads.append(threading.get_ident()) or put(key, entry)
+
+    async def scenario():
+        entry = await service.aput_encoded("chart", encode("<svg/>", service.encodings), "image/svg+xml")
+        await service.aput_entry("copy", entry)
+        return await service.aget("chart"), threading.get_ident()
+
+    hit, loop_thread = asyncio.run(scenario())
+    assert CacheService.content(hit) == b"<svg/>"
+    assert CacheService.content(service.get("copy")) == b"<svg/>"
+    assert len(threads) >= 3 and loop_thread not in threads[:3]
+
+    memory = CacheService()
+    entry = asyncio.run(memory.aput_encoded("chart", encode("{}", memory.encodings), "application/json"))
+    assert CacheService.content(entry) == b"{}"
+
+
+def test_backend_selected_by_env(monkeypatch, tmp_path):
+    monkeypatch.delenv("CACHE_BACKEND", raising=False)
+    assert isinstance(backend_from_env(), MemoryBackend)
+
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_SQLITE_PATH", str(tmp_path / "env.sqlite3"))
+    assert isinstance(backend_from_env(), SQLiteBackend)
+
+    monkeypatch.setenv("CACHE_BACKEND", "bogus")
+    with pytest.raises(ValueError):
+        backend_from_env()
+
+
+def test_trace_records_lookups_and_stores(tmp_path):
+    import json
+
+    path = tmp_path / "trace.jsonl"
+    cache = CacheService(trace_path=str(path), encodings=("identity",))
+    cache.get("k")
+    cache.put("k", "{}", "application/json", cost=0.5, ttl=30)
+    cache.get("k")
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(r["op"], r.get("hit")) for r in records] == [("get", False), ("put", None), ("get", True)]
+    assert records[1]["size"] == 2 and records[1]["cost"] == 0.5 and records[1]["ttl"] == 30
@@ -0,0 +1,102 @@
+import io
+
+import pytest
+
+from cache_backends import MemoryBackend, SQLiteBackend
+from cache_service import CacheService
+from cache_snapshot import SnapshotError, SnapshotReader, dump, read_file
+
+
+def _snapshot(cache: CacheService, namespace: str = "v1") -> bytes:
+    return b"".join(dump(cache.entries(), namespace))
+
+
+def test_round_trip_keeps_variants_and_order():
+    source = CacheService(encodings=("gzip", "identity"))
+    source.put("a", "first", "application/json")
+    source.put("b", "<svg/>", "image/svg+xml")
+    source.get("a")  # a is now the most recently used
+
+    entries = list(read_file(io.BytesIO(_snapshot(source)), "v1"))
+    assert [key for key, _ in entries] == ["b", "a"]
+    assert entries[0][1]["variants"] == source.backend.get("b")["variants"]
+    assert entries[0][1]["media_type"] == "image/svg+xml"
+
+
+def test_reader_accepts_arbitrary_chunking():
+    source = CacheService()
+    for i in range(5):
+        source.put(str(i), "x" * (100 * i), "application/json")
+    data = _snapshot(source)
+
+    reader = SnapshotReader("v1")
+    keys = []
+    for i in range(0, len(data), 7):
+        keys += [key for key, _ in reader.feed(data[i:i + 7])]
+    reader.close()
+    assert keys == ["0", "1", "2", "3", "4"]
+
+
+def test_loading_respects_limits_and_keeps_hottest():
+    source = CacheService(encodings=("identity",))
+    for key in "abcd":
+        source.put(key, "x" * 10, "application/json")
+
+    target = CacheService(max_items=2, encodings=("identity",))
+    for key, entry in read_file(io.BytesIO(_snapshot(source)), "v1"):
+        target.put_entry(key, entry)
+    assert list(target.backend.keys()) == ["c", "d"]
+    assert target.size_bytes == 20
+
+
+def test_rejects_other_namespace_and_truncation():
+    source = CacheService()
+    source.put("a", "body", "application/json")
+    data = _snapshot(source, "v1")
+
+    with pytest.raises(SnapshotError, match="v1"):
+        list(read_file(io.BytesIO(data), "v2"))
+    with pytest.raises(SnapshotError, match="truncated"):
+        list(read_file(io.BytesIO(data[:-3]), "v1"))
+    with pytest.raises(SnapshotError, match="Not a cache snapshot"):
+        list(read_file(io.BytesIO(b"x" * 64), "v1"))
+
+
+def test_export_leaves_recency_and_priority_alone():
+    source = CacheService(max_items=2, backend=MemoryBackend(policy="gds"), encodings=("identity",))
+    for key, cost in (("a", 1.0), ("b", 2.0), ("c", 3.0)):
+        source.put(key, "x" * 10, "application/json", cost=cost)
+    priorities = dict(source.backend._priorities)
+    last_used = [entry["last_used"] for _, entry in source.entries()]
+
+    _snapshot(source)
+    assert list(source.backend.keys()) == ["b", "c"]
+    assert source.backend._priorities == priorities
+    assert [entry["last_used"] for _, entry in source.entries()] == last_used
+
+
+def test_export_survives_evictions_while_streaming():
+    source = CacheService(max_items=3, encodings=("identity",))
+    for key in "abc":
+        source.put(key, "x" * 10, "application/json")
+
+    chunks = dump(source.entries(), "v1")
+    first = [next(chunks), next(chunks)]
+    for key in "def":
+        source.put(key, "y" * 10, "application/json")
+    data = b"".join(first + list(chunks))
+    assert [key for key, _ in read_file(io.BytesIO(data), "v1")] == ["a", "b", "c"]
+    assert list(source.backend.keys()) == ["d", "e", "f"]
+
+
+def test_sqlite_export_is_read_only(tmp_path):
+    source = CacheService(backend=SQLiteBackend(str(tmp_path / "cache.db")), encodings=("identity",))
+    source.put("a", "first", "application/json")
+    source.put("b", "second", "application/json")
+
+    last_used = [entry["last_used"] for _, entry in source.entries()]
+
+    entries = list(read_file(io.BytesIO(_snapshot(source)), "v1"))
+    assert [key for key, _ in entries] == ["a", "b"]
+    assert entries[0][1]["variants"] == {"identity": b"first"}
+    assert [entry["last_used"] for _, entry in source.entries()] == last_used
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import chart_builders
+from chart_builders import build_chart, chart_data_cache, compute_chart
+
+BIRTH = {
+    "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10, "hour": 6, "minute": 0,
+    "city": "London", "nation": " ", "lng": -0.1278, "lat": 51.5074, "tz_str": "Europe/London",
+}
+PAIR = {
+    **{f"{k}1": v for k, v in BIRTH.items()},
+    **{f"{k}2": v for k, v in {**BIRTH, "name": "Charles Babbage", "year": 1791, "day": 26}.items()},
+}
+
+
+def test_positions_only_skips_aspects_context_and_houses(monkeypatch):
+    chart_data_cache.clear()
+    monkeypatch.setattr(chart_builders, "to_context", lambda s: pytest.fail("context computed"))
+
+    data = json.loads(build_chart("birth", BIRTH, svg=False, include=frozenset({"positions"})))
+
+    assert "sun" in data and "ascendant" in data
+    assert data["name"] == "Ada Lovelace"
+    assert "first_house" not in data and "houses_names_list" not in data
+    assert "aspects" not in data and "context" not in data
+    assert compute_chart("birth", BIRTH)._aspects is None
+    assert compute_chart("birth", BIRTH)._chart_data is None
+
+
+def test_full_output_is_unchanged_by_default():
+    full = json.loads(build_chart("synastry", PAIR, svg=False))
+    assert {"subject1", "subject2", "aspects", "context"} <= set(full)
+    assert "first_house" in full["subject1"] and "sun" in full["subject1"]
+
+    houses = json.loads(build_chart("synastry", PAIR, svg=False, include=frozenset({"houses", "aspects"})))
+    assert set(houses) == {"subject1", "subject2", "aspects"}
+    assert "first_house" in houses["subject2"] and "sun" not in houses["subject2"]
+    assert houses["aspects"] == full["aspects"]
+
+
+def test_composite_trims_embedded_subjects():
+    data = json.loads(build_chart("composite", PAIR, svg=False, include=frozenset({"houses"})))
+    composite = data["composite_subject"]
+    assert "first_house" in composite and "sun" not in composite
+    assert "sun" not in composite["first_subject"]
+    assert "first_house" in composite["first_subject"]
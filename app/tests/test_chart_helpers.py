@@ -0,0 +1,54 @@
+from kerykeion.chart_data_factory import ChartDataFactory
+
+import chart_helpers
+from chart_helpers import MemoCache, create_subject, generate_svg, subject_cache
+
+BIRTH = dict(year=1990, month=1, day=1, hour=12, minute=0, lng=-0.1278, lat=51.5074, tz_str="Europe/London")
+
+
+def test_create_subject_reuses_computation_across_labels():
+    subject_cache.clear()
+    hits_before = subject_cache.hits
+
+    first = create_subject(name="Romeo", city="London", nation="UK", **BIRTH)
+    second = create_subject(name="Juliet", city="Londres", nation="GB", **BIRTH)
+
+    assert subject_cache.hits == hits_before + 1
+    assert (first.name, first.city, first.nation) == ("Romeo", "London", "UK")
+    assert (second.name, second.city, second.nation) == ("Juliet", "Londres", "GB")
+    assert first.sun.abs_pos == second.sun.abs_pos
+    assert first.first_house.abs_pos == second.first_house.abs_pos
+
+
+def test_create_subject_keys_on_house_system():
+    subject_cache.clear()
+    placidus = create_subject(name="A", city="London", nation="UK", **BIRTH)
+    whole_sign = create_subject(name="A", city="London", nation="UK", houses_system_identifier="W", **BIRTH)
+
+    assert subject_cache.info()["items"] == 2
+    assert placidus.houses_system_identifier == "P"
+    assert whole_sign.houses_system_identifier == "W"
+
+
+def test_memo_cache_evicts_least_recently_used():
+    memo = MemoCache(max_items=2)
+    memo.put("a", 1)
+    memo.put("b", 2)
+    assert memo.get("a") == 1
+    memo.put("c", 3)
+
+    assert memo.get("b") is None
+    assert memo.info() == {"items": 2, "max_items": 2, "hits": 1, "misses": 1, "evictions": 1}
+
+
+def test_generate_svg_in_memory_matches_file_path_without_touching_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(chart_helpers, "BASE_OUTPUT_DIR", str(tmp_path / "output"))
+    subject = create_subject(name="Ada", city="London", nation="UK", **BIRTH)
+    chart_data = ChartDataFactory.create_natal_chart_data(subject)
+
+    in_memory = generate_svg(chart_data, render_mode="memory")
+    assert not (tmp_path / "output").exists()
+
+    via_file = generate_svg(chart_data, render_mode="file")
+    assert in_memory == via_file
+    assert list((tmp_path / "output").iterdir()) == []
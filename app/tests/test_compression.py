@@ -0,0 +1,39 @@
+import pytest
+
+from compression import compress, decompress, encodings_from_env, negotiate, parse_accept_encoding
+
+
+def test_parse_accept_encoding_q_values():
+    assert parse_accept_encoding("gzip;q=0.5, br, identity;q=0") == {"gzip": 0.5, "br": 1.0, "identity": 0.0}
+    assert parse_accept_encoding("") == {}
+
+
+@pytest.mark.parametrize(
+    "header, offered, expected",
+    [
+        ("gzip, deflate, br", ("br", "gzip"), "br"),
+        ("gzip, deflate", ("br", "gzip"), "gzip"),
+        ("gzip;q=0.2, br;q=0.8", ("gzip", "br"), "br"),
+        ("deflate", ("gzip",), None),
+        (None, ("gzip", "identity"), "identity"),
+        ("*", ("gzip",), "gzip"),
+        ("*;q=0", ("gzip", "identity"), None),
+        ("identity;q=0, gzip", ("identity", "gzip"), "gzip"),
+    ],
+)
+def test_negotiate(header, offered, expected):
+    assert negotiate(header, offered) == expected
+
+
+def test_gzip_round_trip_is_deterministic():
+    data = b"<svg/>" * 100
+    assert compress(data, "gzip") == compress(data, "gzip")
+    assert decompress(compress(data, "gzip"), "gzip") == data
+    assert compress(data, "identity") is data
+
+
+def test_encodings_from_env_drops_unavailable(monkeypatch):
+    monkeypatch.setenv("CACHE_ENCODINGS", "nope, gzip")
+    assert encodings_from_env() == ("gzip",)
+    monkeypatch.setenv("CACHE_ENCODINGS", "nope")
+    assert encodings_from_env() == ("identity",)
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import HTTPException
+
+from compute_pool import ComputeError, ComputePool, PoolSaturatedError
+
+
+def test_pool_runs_jobs_off_the_loop():
+    pool = ComputePool(max_workers=1, max_queue=0)
+
+    async def scenario():
+        return await pool.run(threading.get_ident)
+
+    try:
+        assert asyncio.run(scenario()) != threading.get_ident()
+        assert pool.info()["completed"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_pool_rejects_when_saturated():
+    pool = ComputePool(max_workers=1, max_queue=1, retry_after=3)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.queue_depth == 1
+        with pytest.raises(PoolSaturatedError) as exc_info:
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+        return exc_info.value
+
+    try:
+        exc = asyncio.run(scenario())
+        assert exc.retry_after == 3
+        assert pool.info()["rejected"] == 1
+        assert pool.info()["in_flight"] == 0
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_cancelled_caller_keeps_the_job_counted_until_it_finishes():
+    pool = ComputePool(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        waiter = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        assert pool.in_flight == 1
+        with pytest.raises(PoolSaturatedError):
+            await pool.run(release.wait)
+        release.set()
+        for _ in range(100):
+            if pool.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+
+    try:
+        asyncio.run(scenario())
+        assert pool.info()["in_flight"] == 0
+        assert pool.info()["completed"] == 1
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def _raise_http_error():
+    raise HTTPException(status_code=500, detail="SVG generation failed")
+
+
+def _die():
+    os._exit(1)
+
+
+def test_process_pool_survives_unpicklable_errors_and_dead_workers():
+    pool = ComputePool(kind="process", max_workers=1, max_queue=0)
+
+    async def scenario():
+        with pytest.raises(ComputeError) as exc_info:
+            await pool.run(_raise_http_error)
+        assert (exc_info.value.status_code, exc_info.value.detail) == (500, "SVG generation failed")
+        assert await pool.run(abs, -1) == 1
+
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(_die)
+        assert await pool.run(abs, -2) == 2
+
+    try:
+        asyncio.run(scenario())
+        assert pool.info()["in_flight"] == 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import threading
+
+from cache_service import CacheService
+import disk_cache
+from disk_cache import DiskCache
+import metrics
+
+
+def _entry(body: bytes, media_type: str = "application/json") -> dict:
+    return {"variants": {"identity": body}, "media_type": media_type, "last_used": 0.0, "size": len(body)}
+
+
+def test_entries_survive_a_restart(tmp_path):
+    disk = DiskCache(str(tmp_path), namespace="v1")
+    disk.put("ab12", _entry(b'{"a":1}'))
+    disk.put("cd34", _entry(b"<svg/>", "image/svg+xml"))
+    disk.flush()
+
+    reopened = DiskCache(str(tmp_path), namespace="v1")
+    assert len(reopened) == 2
+    entry = reopened.get("cd34")
+    assert entry["variants"] == {"identity": b"<svg/>"}
+    assert entry["media_type"] == "image/svg+xml"
+    assert entry["size"] == 6
+    assert reopened.get("ffff") is None
+    assert reopened.info()["hits"] == 1 and reopened.info()["misses"] == 1
+
+
+def test_other_namespaces_are_removed(tmp_path):
+    old = DiskCache(str(tmp_path), namespace="v1")
+    old.put("ab12", _entry(b"old"))
+    old.flush()
+
+    unrelated = tmp_path / "other_app_data"
+    unrelated.mkdir()
+    (unrelated / "keep.txt").write_text("not ours")
+
+    new = DiskCache(str(tmp_path), namespace="v2")
+    assert len(new) == 0
+    assert new.get("ab12") is None
+    assert not (tmp_path / "v1").exists()
+    assert (unrelated / "keep.txt").read_text() == "not ours"
+
+    new.clear()
+    new.flush()
+    DiskCache(str(tmp_path), namespace="v3")
+    assert not (tmp_path / "v2").exists()
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    disk = DiskCache(str(tmp_path), max_bytes=2500)
+    for key in ("aa", "bb", "cc"):
+        disk.put(key, _entry(b"x" * 1000))
+        disk.flush()
+        if key == "bb":
+            assert disk.get("aa") is not None  # aa becomes more recent than bb
+    assert disk.get("bb") is None
+    assert disk.get("aa") is not None and disk.get("cc") is not None
+    assert disk.size_bytes <= 2500
+    assert disk.info()["evictions"] == 1
+
+
+def test_corrupt_files_are_misses_and_removed(tmp_path):
+    disk = DiskCache(str(tmp_path), namespace="v1")
+    disk.put("ab12", _entry(b"data"))
+    disk.flush()
+    path = tmp_path / "v1" / "ab" / "ab12.entry"
+    path.write_bytes(path.read_bytes()[:-2])
+
+    assert disk.get("ab12") is None
+    disk.flush()
+    assert not path.exists()
+    assert disk.info()["errors"] == 1
+
+
+def test_full_write_queue_drops_instead_of_blocking(tmp_path):
+    disk = DiskCache(str(tmp_path), queue_size=1)
+    results = [disk.put(f"k{i:02d}", _entry(b"x")) for i in range(200)]
+    disk.flush()
+    assert not all(results)
+    assert disk.info()["dropped_writes"] == results.count(False)
+    assert len(disk) == results.count(True)
+
+
+def test_cache_service_falls_through_to_disk_and_promotes(tmp_path):
+    cache = CacheService(max_items=1, disk=DiskCache(str(tmp_path)))
+    cache.put("a" * 32, "first", "application/json")
+    cache.put("b" * 32, "second", "application/json")
+    cache.disk.flush()
+
+    # "a" was evicted from memory but is still on disk.
+    assert len(cache.backend) == 1
+    entry = cache.get("a" * 32)
+    assert CacheService.content(entry) == b"first"
+    assert list(cache.backend.keys()) == ["a" * 32]
+
+    # A new process (empty memory) finds both.
+    restarted = CacheService(disk=DiskCache(str(tmp_path)))
+    assert CacheService.content(restarted.get("b" * 32)) == b"second"
+    assert restarted.info()["disk"]["items"] == 2
+
+    restarted.clear()
+    restarted.disk.flush()
+    assert restarted.get("a" * 32) is None
+    assert os.listdir(restarted.disk.path) == [disk_cache._MARKER]
+
+
+def test_async_lookups_read_the_disk_tier_off_the_loop(tmp_path):
+    cache = CacheService(max_items=1, disk=DiskCache(str(tmp_path)))
+    cache.put("a" * 32, "first", "application/json")
+    cache.put("b" * 32, "second", "application/json")
+    cache.disk.flush()
+    threads = []
+    read = cache.disk.get
+    cache.disk.get = lambda key: threads.append(threading.get_ident()) or read(key)
+    lookups = {result: metrics.CACHE_LOOKUPS.labels("response", result) for result in ("hit", "miss", "disk_hit")}
+    before = {result: counter._value.get() for result, counter in lookups.items()}
+
+    async def scenario():
+        entry = await cache.aget("a" * 32)
+        await cache.aclear()
+        return entry, threading.get_ident()
+
+    entry, loop_thread = asyncio.run(scenario())
+    assert CacheService.content(entry) == b"first"
+    assert threads and loop_thread not in threads
+    assert {result: counter._value.get() - before[result] for result, counter in lookups.items()} == {
+        "hit": 0,
+        "miss": 0,
+        "disk_hit": 1,
+    }
+    cache.disk.flush()
+    assert len(cache.backend) == 0 and len(cache.disk) == 0
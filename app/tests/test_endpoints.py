@@ -279,6 +279,46 @@ def test_cache_endpoints(client):
     assert res.json()["cache_items"] == 0
 
 
+def test_cache_policy_is_set_through_config(client):
+    import main
+
+    res = client.put("/cache/config", params={"policy": "gds"})
+    assert res.status_code == 200
+    assert res.json()["policy"] == "gds"
+    assert client.get("/cache/info").json()["policy"] == "gds"
+
+    res = client.put("/cache/config", params={"policy": "fifo"})
+    assert res.status_code == 400
+
+    client.put("/cache/config", params={"policy": "lru"})
+    assert main.cache.backend.policy == "lru"
+
+
+def test_current_sky_transits_get_a_ttl(client, monkeypatch):
+    import main
+    from datetime import datetime, timezone
+
+    monkeypatch.setattr(main, "CURRENT_SKY_TTL", 600.0)
+    now = datetime.now(timezone.utc)
+    params = {
+        "name": "Ada", "year": 1815, "month": 12, "day": 10, "hour": 6, "minute": 0,
+        "city": "London", "lng": -0.1278, "lat": 51.5074, "tz_str": "Europe/London",
+        "t_year": now.year, "t_month": now.month, "t_day": now.day, "t_hour": now.hour, "t_minute": now.minute,
+        "t_city": "London", "t_lng": -0.1278, "t_lat": 51.5074, "t_tz_str": "UTC",
+    }
+    assert main._chart_ttl("transit", params) == 600.0
+    assert main._chart_ttl("transit", {**params, "t_year": 2000}) is None
+    assert main._chart_ttl("birth", params) is None
+
+    res = client.get("/gen/transit", params=params)
+    assert res.status_code == 200
+    entries = dict(main.cache.entries())
+    assert len(entries) == 1
+    (entry,) = entries.values()
+    assert entry["expires_at"] is not None
+    assert entry["cost"] > 0
+
+
 def test_cache_details_hidden_by_default(client):
     res = client.get("/cache/info")
     assert res.status_code == 200
@@ -300,3 +340,517 @@ def test_cache_endpoints_disabled_when_admin_is_off(client, monkeypatch):
     assert res.status_code == 404
 
     monkeypatch.setenv("ENABLE_ADMIN_ENDPOINTS", "true")
+
+
+def test_saturated_pool_returns_503_but_serves_cache_hits(client, monkeypatch):
+    import main
+    from compute_pool import PoolSaturatedError
+
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London", "svg": False
+    }
+    res = client.get("/gen/birth", params=params)
+    assert res.status_code == 200
+
+    async def saturated(*args, **kwargs):
+        raise PoolSaturatedError(retry_after=2)
+
+    monkeypatch.setattr(main.compute_pool, "run", saturated)
+
+    res = client.get("/gen/birth", params=params)
+    assert res.status_code == 200
+
+    res = client.get("/gen/birth", params={**params, "minute": 1})
+    assert res.status_code == 503
+    assert res.headers["retry-after"] == "2"
+
+
+def test_json_then_svg_reuses_computed_chart(client):
+    client.delete("/cache/clear")
+    params = {
+        "name1": "Romeo", "year1": 1990, "month1": 1, "day1": 1,
+        "hour1": 12, "minute1": 0, "city1": "London", "lng1": -0.1278,
+        "lat1": 51.5074, "tz_str1": "Europe/London", "nation1": "UK",
+        "name2": "Juliet", "year2": 1995, "month2": 2, "day2": 14,
+        "hour2": 12, "minute2": 0, "city2": "Paris", "lng2": 2.3522,
+        "lat2": 48.8566, "tz_str2": "Europe/Paris", "nation2": "FR",
+    }
+    before = client.get("/cache/info").json()["chart_data_cache"]
+
+    res = client.get("/gen/composite", params={**params, "svg": False})
+    assert res.status_code == 200
+    res = client.get("/gen/composite", params={**params, "svg": True})
+    assert res.status_code == 200
+    assert "image/svg+xml" in res.headers["content-type"]
+
+    data = client.get("/cache/info").json()
+    assert data["cache_items"] == 2
+    assert data["chart_data_cache"]["misses"] == before["misses"] + 1
+    assert data["chart_data_cache"]["hits"] == before["hits"] + 1
+
+
+def test_requests_differing_past_coordinate_precision_share_a_response(client):
+    client.delete("/cache/clear")
+    params = {
+        "name": "Ada", "year": 1815, "month": 12, "day": 10, "hour": 6, "minute": 0,
+        "city": "London", "lng": -0.1278, "lat": 51.5074, "tz_str": "Europe/London",
+    }
+    first = client.get("/gen/birth", params=params)
+    second = client.get("/gen/birth", params={**params, "lng": -0.12780001})
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert 'cache;desc="hit"' in second.headers["Server-Timing"]
+
+    # A different label is a different response, but not a new computation.
+    before = client.get("/cache/info").json()["chart_data_cache"]
+    res = client.get("/gen/birth", params={**params, "city": "Marylebone", "nation": "UK"})
+    assert res.json()["city"] == "Marylebone"
+    after = client.get("/cache/info").json()["chart_data_cache"]
+    assert after["hits"] == before["hits"] + 1 and after["misses"] == before["misses"]
+
+
+def test_theme_is_validated_and_part_of_svg_cache_key(client, tmp_path, monkeypatch):
+    from themes import theme_registry
+
+    (tmp_path / "astral.css").write_text(":root { --kerykeion-color-primary: #FFD700; }", encoding="utf-8")
+    (tmp_path / "dark.css").write_text(":root { --kerykeion-color-primary: #000001; }", encoding="utf-8")
+    monkeypatch.setattr(theme_registry, "themes_dir", tmp_path)
+    theme_registry.reload()
+
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London", "svg": True
+    }
+    client.delete("/cache/clear")
+    try:
+        res = client.get("/gen/birth", params={**params, "theme": "nope"})
+        assert res.status_code == 400
+
+        res = client.get("/gen/birth", params={**params, "theme": "dark"})
+        assert res.status_code == 200
+        assert "#000001" in res.text
+
+        res = client.get("/gen/birth", params=params)
+        assert res.status_code == 200
+        assert "#000001" not in res.text
+
+        assert client.get("/cache/info").json()["cache_items"] == 2
+    finally:
+        monkeypatch.undo()
+        theme_registry.reload()
+
+
+def test_svg_cache_follows_theme_reload(client, tmp_path, monkeypatch):
+    import os
+
+    from themes import theme_registry
+
+    css = tmp_path / "astral.css"
+    css.write_text(":root { --kerykeion-color-primary: #0000AA; }", encoding="utf-8")
+    monkeypatch.setattr(theme_registry, "themes_dir", tmp_path)
+    theme_registry.reload()
+
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London", "svg": True
+    }
+    client.delete("/cache/clear")
+    try:
+        first = client.get("/gen/birth", params=params)
+        assert "#0000AA" in first.text
+
+        css.write_text(":root { --kerykeion-color-primary: #0000BB; }", encoding="utf-8")
+        os.utime(css, (css.stat().st_atime, css.stat().st_mtime + 10))
+        theme_registry.reload()
+
+        second = client.get("/gen/birth", params=params)
+        assert "#0000BB" in second.text and "#0000AA" not in second.text
+        assert 'cache;desc="miss"' in second.headers["server-timing"]
+        assert second.headers["etag"] != first.headers["etag"]
+    finally:
+        monkeypatch.undo()
+        theme_registry.reload()
+
+
+def test_batch_streams_ndjson_with_per_item_errors(client):
+    import json
+
+    birth = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+    }
+    pair = {
+        "name1": "Romeo", "year1": 1990, "month1": 1, "day1": 1,
+        "hour1": 12, "minute1": 0, "city1": "London", "lng1": -0.1278,
+        "lat1": 51.5074, "tz_str1": "Europe/London",
+        "name2": "Juliet", "year2": 1995, "month2": 2, "day2": 14,
+        "hour2": 12, "minute2": 0, "city2": "Paris", "lng2": 2.3522,
+        "lat2": 48.8566, "tz_str2": "Europe/Paris",
+    }
+    client.delete("/cache/clear")
+    res = client.post("/gen/batch", json=[
+        {"id": "natal", "type": "birth", "params": birth},
+        {"id": "broken", "type": "birth", "params": {"name": "No date"}},
+        {"id": "pair", "type": "composite", "params": pair, "svg": True},
+    ])
+    assert res.status_code == 200
+    assert "application/x-ndjson" in res.headers["content-type"]
+
+    records = {r["id"]: r for r in map(json.loads, res.text.splitlines())}
+    assert sorted(r["index"] for r in records.values()) == [0, 1, 2]
+    assert records["natal"]["status"] == 200
+    assert records["natal"]["content"]["name"] == "Ada Lovelace"
+    assert records["broken"]["status"] == 422
+    assert records["pair"]["status"] == 200
+    assert records["pair"]["content"].lstrip().startswith("<")
+
+    # Batch results share the response cache with the GET endpoints.
+    assert client.get("/cache/info").json()["cache_items"] == 2
+    res = client.get("/gen/birth", params=birth)
+    assert res.status_code == 200
+    assert client.get("/cache/info").json()["cache_items"] == 2
+
+
+def test_transit_timeline(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+        "start": "2024-01-01", "end": "2024-03-01", "step_hours": 24,
+    }
+    res = client.get("/gen/transit/timeline", params=params)
+    assert res.status_code == 200
+    data = res.json()
+    assert data["range"]["samples"] == 61
+    assert data["warnings"]
+
+    res = client.get("/gen/transit/timeline", params={k: v for k, v in params.items() if k != "step_hours"})
+    assert res.json()["range"]["step_hours"] == 1.5
+    assert res.json()["warnings"] == []
+    assert data["events"] and {"transit", "natal_point", "aspect", "entry", "exact", "exit"} <= set(data["events"][0])
+
+    res = client.get("/gen/transit/timeline", params={**params, "output": "columnar", "max_orb": 1})
+    assert res.status_code == 200
+    assert set(res.json()["orbs"].values()) == {1.0}
+
+    res = client.get("/gen/transit/timeline", params={**params, "end": "2100-01-01", "step_hours": 0.1})
+    assert res.status_code == 400
+
+
+def test_solar_return_series(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+        "start_year": 2024, "end_year": 2026,
+    }
+    res = client.get("/gen/solar-return/series", params=params)
+    assert res.status_code == 200
+    assert 'cache;desc="miss"' in res.headers["Server-Timing"]
+    returns = res.json()["returns"]
+    assert [entry["year"] for entry in returns] == [2024, 2025, 2026]
+    assert "svg" not in returns[0]
+
+    res = client.get("/gen/solar-return/series", params=params)
+    assert 'cache;desc="hit"' in res.headers["Server-Timing"]
+
+    res = client.get("/gen/solar-return/series", params={**params, "end_year": 2024, "svg": True})
+    assert "<svg" in res.json()["returns"][0]["svg"]
+
+    res = client.get("/gen/solar-return/series", params={**params, "end_year": 2023})
+    assert res.status_code == 400
+
+
+def test_lunar_return_calendar(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+        "start": "2024-01-01", "end": "2024-03-31",
+    }
+    res = client.get("/gen/lunar-return/calendar", params=params)
+    assert res.status_code == 200
+    assert 'cache;desc="miss"' in res.headers["Server-Timing"]
+    data = res.json()
+    assert len(data["returns"]) == 3
+    assert "Moon" in data["natal"]["points"]
+    assert "aspects" not in data["returns"][0]
+
+    res = client.get("/gen/lunar-return/calendar", params=params)
+    assert 'cache;desc="hit"' in res.headers["Server-Timing"]
+
+    res = client.get("/gen/lunar-return/calendar", params={**params, "aspects": True})
+    assert 'cache;desc="miss"' in res.headers["Server-Timing"]
+    assert res.json()["returns"][0]["aspects"]
+
+    res = client.get("/gen/lunar-return/calendar", params={**params, "end": "2023-12-31"})
+    assert res.status_code == 400
+
+
+def test_responses_are_compressed_off_the_event_loop(client, monkeypatch):
+    import threading
+
+    import compression
+
+    threads = []
+    gzip_compress = compression._COMPRESSORS["gzip"]
+
+    def recording_compress(data):
+        threads.append(threading.current_thread().name)
+        return gzip_compress(data)
+
+    monkeypatch.setitem(compression._COMPRESSORS, "gzip", recording_compress)
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London", "svg": True,
+    }
+    client.delete("/cache/clear")
+    assert client.get("/gen/birth", params=params).status_code == 200
+    assert threads and all(name.startswith("chart-compute") for name in threads)
+
+
+def test_cached_responses_are_served_precompressed(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London", "svg": True
+    }
+    res = client.get("/gen/birth", params=params, headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["vary"]
+    assert int(res.headers["content-length"]) < len(res.content) / 3
+    assert res.text.lstrip().startswith("<")
+
+    res = client.get("/gen/birth", params=params, headers={"Accept-Encoding": "identity"})
+    assert res.status_code == 200
+    assert "content-encoding" not in res.headers
+    assert int(res.headers["content-length"]) == len(res.content)
+
+
+def test_etag_and_conditional_get(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+    }
+    gzip_only = {"Accept-Encoding": "gzip"}
+    res = client.get("/gen/birth", params=params, headers=gzip_only)
+    assert res.status_code == 200
+    etag = res.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert "max-age" in res.headers["cache-control"]
+
+    svg = client.get("/gen/birth", params={**params, "svg": True}, headers=gzip_only)
+    plain = client.get("/gen/birth", params=params, headers={"Accept-Encoding": "identity"})
+    assert len({etag, svg.headers["etag"], plain.headers["etag"]}) == 3
+
+    # A matching validator is answered before the cache or the compute pool is consulted.
+    client.delete("/cache/clear")
+    completed = client.get("/cache/info").json()["compute_pool"]["completed"]
+    for validator in (etag, f"W/{etag}", f'"other", {etag}'):
+        res = client.get("/gen/birth", params=params, headers={**gzip_only, "If-None-Match": validator})
+        assert res.status_code == 304
+        assert res.headers["etag"] == etag
+        assert res.content == b""
+    info = client.get("/cache/info").json()
+    assert info["cache_items"] == 0
+    assert info["compute_pool"]["completed"] == completed
+
+    res = client.get("/gen/birth", params=params, headers={**gzip_only, "If-None-Match": '"stale"'})
+    assert res.status_code == 200
+    assert res.headers["etag"] == etag
+
+
+def test_json_is_compact_unless_pretty(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+    }
+    compact = client.get("/gen/birth", params=params)
+    pretty = client.get("/gen/birth", params={**params, "pretty": True})
+    assert compact.status_code == pretty.status_code == 200
+    assert b"\n" not in compact.content
+    assert pretty.content.startswith(b'{\n  "')
+    assert compact.json() == pretty.json()
+    assert compact.headers["etag"] != pretty.headers["etag"]
+
+
+def test_include_selects_sections_and_keys_the_cache(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+    }
+    client.delete("/cache/clear")
+    res = client.get("/gen/birth", params={**params, "include": "positions"})
+    assert res.status_code == 200
+    assert "sun" in res.json() and "aspects" not in res.json()
+
+    res = client.get("/gen/birth", params={**params, "include": "aspects, context"})
+    assert set(res.json()) >= {"aspects", "context"} and "sun" not in res.json()
+    assert client.get("/cache/info").json()["cache_items"] == 2
+
+    # Asking for every section is the default response.
+    everything = client.get("/gen/birth", params={**params, "include": "positions,houses,aspects,context"})
+    default = client.get("/gen/birth", params=params)
+    assert everything.headers["etag"] == default.headers["etag"]
+
+    assert client.get("/gen/birth", params={**params, "include": "planets"}).status_code == 400
+
+
+def test_metrics_endpoint(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+    }
+    client.delete("/cache/clear")
+    assert client.get("/gen/birth", params={**params, "svg": True}).status_code == 200
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    body = res.text
+    assert 'astral_request_duration_seconds_count{endpoint="/gen/birth",format="svg",status="200"}' in body
+    for stage in ("chart_data", "svg_render", "css_embed"):
+        assert f'astral_stage_duration_seconds_count{{stage="{stage}"}}' in body
+    assert 'astral_cache_lookups_total{cache="response",result="miss"}' in body
+    assert 'astral_pool_queue_depth{pool="compute"}' in body
+    assert "astral_cache_bytes" in body
+
+
+def test_server_timing_reports_stages_and_cache_result(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London", "svg": True,
+    }
+    client.delete("/cache/clear")
+    miss = client.get("/gen/birth", params=params).headers["server-timing"]
+    assert 'cache;desc="miss"' in miss
+    for stage in ("subject", "chart_data", "svg_render", "compute", "cache_put", "total"):
+        assert f"{stage};dur=" in miss
+
+    hit = client.get("/gen/birth", params=params)
+    timing = hit.headers["server-timing"]
+    assert 'cache;desc="hit"' in timing
+    assert "svg_render" not in timing
+
+    not_modified = client.get("/gen/birth", params=params, headers={"If-None-Match": hit.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert 'cache;desc="not-modified"' in not_modified.headers["server-timing"]
+
+
+def test_profile_header_captures_a_downloadable_profile(client, tmp_path, monkeypatch):
+    import profiling
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+    }
+    client.get("/gen/birth", params=params)  # cached, but profiling bypasses the cache
+
+    res = client.get("/gen/birth", params=params, headers={"X-Profile": "1"})
+    assert res.status_code == 200
+    assert res.json()["name"] == "Ada Lovelace"
+    assert 'cache;desc="bypass"' in res.headers["server-timing"]
+    assert res.headers["cache-control"] == "no-store"
+
+    raw = client.get(res.headers["x-profile-url"])
+    assert raw.status_code == 200
+    assert raw.content
+    text = client.get(res.headers["x-profile-url"], params={"format": "text"})
+    assert "build_chart" in text.text
+    assert client.get("/profiles/" + "0" * 32).status_code == 404
+
+    monkeypatch.setenv("ENABLE_ADMIN_ENDPOINTS", "false")
+    res = client.get("/gen/birth", params=params, headers={"X-Profile": "1"})
+    assert res.status_code == 200
+    assert "x-profile-id" not in res.headers
+    assert client.get(raw.url.path).status_code == 404
+
+
+def test_cache_snapshot_round_trip(client):
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+    }
+    client.delete("/cache/clear")
+    first = client.get("/gen/birth", params=params)
+    client.get("/gen/birth", params={**params, "svg": True})
+
+    snapshot = client.get("/cache/snapshot")
+    assert snapshot.status_code == 200
+    assert snapshot.headers["content-type"] == "application/octet-stream"
+
+    client.delete("/cache/clear")
+    res = client.post("/cache/snapshot", content=snapshot.content)
+    assert res.status_code == 200
+    assert res.json()["imported"] == 2
+    hit = client.get("/gen/birth", params=params)
+    assert 'cache;desc="hit"' in hit.headers["server-timing"]
+    assert hit.content == first.content
+
+    assert client.post("/cache/snapshot", content=b"not a snapshot").status_code == 400
+    assert client.post("/cache/snapshot", content=snapshot.content[:-10]).status_code == 400
+
+
+def test_cache_snapshot_startup_hook(client, tmp_path):
+    import main
+
+    params = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London", "svg": True,
+    }
+    client.delete("/cache/clear")
+    client.get("/gen/birth", params=params)
+    path = tmp_path / "cache.snapshot"
+    path.write_bytes(client.get("/cache/snapshot").content)
+    client.delete("/cache/clear")
+
+    main._load_snapshot_file(str(path))
+    main._load_snapshot_file(str(tmp_path / "missing.snapshot"))
+    assert client.get("/cache/info").json()["cache_items"] == 1
+
+
+def test_prefetch_job_precomputes_in_background(client):
+    import time
+
+    client.delete("/cache/clear")
+    subject = {
+        "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+        "hour": 6, "minute": 0, "city": "London", "lng": -0.1278,
+        "lat": 51.5074, "tz_str": "Europe/London",
+    }
+    items = [
+        {"type": "birth", "params": subject},
+        {"type": "birth", "params": subject},
+        {"type": "birth", "params": {"name": "missing fields"}},
+    ]
+    res = client.post("/cache/prefetch", json=items)
+    assert res.status_code == 202
+    job_id = res.json()["id"]
+
+    for _ in range(200):
+        job = client.get(f"/cache/prefetch/{job_id}").json()
+        if job["state"] == "done":
+            break
+        time.sleep(0.05)
+    assert job["state"] == "done"
+    assert (job["computed"], job["cached"], job["failed"]) == (1, 1, 1)
+    assert job["errors"][0]["index"] == 2 and job["errors"][0]["error"]["status"] == 422
+
+    hit = client.get("/gen/birth", params=subject)
+    assert 'cache;desc="hit"' in hit.headers["server-timing"]
+    assert client.get("/cache/prefetch/unknown").status_code == 404
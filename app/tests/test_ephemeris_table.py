@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import swisseph as swe
+
+import ephemeris_table
+from ephemeris_table import BODIES, ERROR_BOUNDS_ARCSEC, EphemerisTable, build_table, max_error_arcsec, swe_longitudes
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    path = tmp_path_factory.mktemp("ephemeris") / "table.bin"
+    build_table(str(path), 2023, 2025)
+    return EphemerisTable(str(path))
+
+
+def _errors_arcsec(table, jds):
+    bodies = list(BODIES)
+    diff = table.longitudes(jds, bodies) - swe_longitudes(jds, bodies)
+    return dict(zip(bodies, np.abs((diff + 180.0) % 360.0 - 180.0).max(axis=1) * 3600))
+
+
+def test_interpolation_matches_swiss_ephemeris(table):
+    errors = max_error_arcsec(table, samples=500)
+    assert set(errors) == set(BODIES)
+    for body, error in errors.items():
+        assert error < ERROR_BOUNDS_ARCSEC[body], body
+
+
+# The worst Moshier kink found for these bodies in 1800-2100.
+@pytest.mark.parametrize(
+    "body, year, month, day",
+    [
+        ("Neptune", 1920, 8, 4),
+        ("Saturn", 2079, 1, 14),
+        ("Uranus", 1946, 6, 8),
+        ("Jupiter", 1949, 1, 1),
+        ("Pluto", 1930, 7, 12),
+    ],
+)
+def test_error_stays_within_documented_bound_at_kinks(tmp_path, body, year, month, day):
+    path = tmp_path / "table.bin"
+    build_table(str(path), year, year + 1)
+    table = EphemerisTable(str(path))
+    center = swe.julday(year, month, day, 0.0)
+    jds = np.clip(np.arange(center - 3, center + 4, 1 / 48), table.start_jd, table.end_jd - 1e-6)
+
+    errors = _errors_arcsec(table, jds)
+    assert errors[body] > 2.0  # the kink is really in this window
+    for name, error in errors.items():
+        assert error < ERROR_BOUNDS_ARCSEC[name], name
+
+
+def test_sample_instants_are_exact(table):
+    jds = table.start_jd + table.step * np.arange(0, 100, 7)
+    bodies = ["Sun", "Moon", "Pluto"]
+    np.testing.assert_allclose(table.longitudes(jds, bodies), swe_longitudes(jds, bodies), atol=1e-9)
+
+
+def test_longitudes_falls_back_outside_table_or_when_precise(table, monkeypatch):
+    monkeypatch.setattr(ephemeris_table, "get_table", lambda: table)
+    calls = []
+    real = ephemeris_table.swe_longitudes
+    monkeypatch.setattr(ephemeris_table, "swe_longitudes", lambda jds, bodies: calls.append(len(jds)) or real(jds, bodies))
+
+    inside = np.linspace(table.start_jd + 10, table.start_jd + 20, 5)
+    ephemeris_table.longitudes(inside, ["Moon"])
+    assert calls == []
+
+    ephemeris_table.longitudes(inside, ["Moon"], precise=True)
+    ephemeris_table.longitudes(np.array([table.end_jd + 1]), ["Moon"])
+    assert calls == [5, 1]
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "junk.bin"
+    path.write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        EphemerisTable(str(path))
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import metrics
+
+
+def test_stage_records_duration():
+    before = metrics.STAGE_LATENCY.labels("test_stage")._sum.get()
+    with metrics.stage("test_stage"):
+        pass
+    assert metrics.STAGE_LATENCY.labels("test_stage")._sum.get() > before
+
+
+def test_multiprocess_mode_aggregates_worker_processes(tmp_path):
+    # metrics reads PROMETHEUS_MULTIPROC_DIR at import, so run in a fresh interpreter.
+    script = textwrap.dedent(
+        """
+        import multiprocessing
+
+        def work():
+            import metrics
+            metrics.CACHE_LOOKUPS.labels("response", "hit").inc(2)
+            metrics.STAGE_LATENCY.labels("subject").observe(0.01)
+
+        if __name__ == "__main__":
+            ctx = multiprocessing.get_context("spawn")
+            workers = [ctx.Process(target=work) for _ in range(2)]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            import metrics
+            body, _ = metrics.render()
+            print(body.decode())
+        """
+    )
+    script_path = tmp_path / "workers.py"
+    script_path.write_text(script)
+    metrics_dir = tmp_path / "metrics"
+    metrics_dir.mkdir()
+    env = {"PROMETHEUS_MULTIPROC_DIR": str(metrics_dir), "PYTHONPATH": os.pathsep.join(sys.path)}
+    out = subprocess.run(
+        [sys.executable, str(script_path)], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    assert 'astral_cache_lookups_total{cache="response",result="hit"} 4.0' in out
+    assert 'astral_stage_duration_seconds_count{stage="subject"} 2.0' in out
+
+
+def test_collect_timings_gathers_stages_from_pool_threads():
+    import asyncio
+
+    from compute_pool import ComputePool
+
+    def work():
+        with metrics.stage("pooled"):
+            pass
+
+    async def run():
+        pool = ComputePool(kind="thread", max_workers=1, name="test")
+        try:
+            with metrics.collect_timings() as timings:
+                timings.note("cache", "miss")
+                await pool.run(work)
+            return timings
+        finally:
+            pool.shutdown()
+
+    timings = asyncio.run(run())
+    assert "pooled" in timings.durations
+    header = timings.header(total=0.002)
+    assert header.startswith('cache;desc="miss", pooled;dur=')
+    assert header.endswith("total;dur=2.000")
+    assert metrics.current_timings() is None
@@ -0,0 +1,72 @@
+import json
+
+from chart_builders import build_chart, chart_data_cache, compute_chart
+from normalization import normalize, relabel, round_coordinates, token
+
+BIRTH = {
+    "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10, "hour": 6, "minute": 0,
+    "city": "London", "nation": " ", "lng": -0.1278, "lat": 51.5074, "tz_str": "Europe/London",
+}
+OTHER = {**BIRTH, "name": "Charles Babbage", "year": 1791, "day": 26, "city": "Walworth", "nation": "UK"}
+
+
+def _pair(first: dict, second: dict) -> dict:
+    return {**{f"{k}1": v for k, v in first.items()}, **{f"{k}2": v for k, v in second.items()}}
+
+
+def test_rounds_coordinates_and_splits_labels():
+    normalized = normalize({**BIRTH, "lng": -0.12780001, "t_lat": 48.856613})
+    assert normalized.compute["lng"] == -0.1278
+    assert normalized.compute["t_lat"] == 48.8566
+    assert normalized.compute["name"] == token("name")
+    assert normalized.labels == {"name": "Ada Lovelace", "city": "London", "nation": " "}
+    assert round_coordinates({"lat2": 1.23456789, "year2": 1990}) == {"lat2": 1.2346, "year2": 1990}
+
+
+def test_symmetric_pairs_share_canonical_inputs():
+    ab = normalize(_pair(BIRTH, OTHER), symmetric=True)
+    ba = normalize(_pair(OTHER, BIRTH), symmetric=True)
+    assert ab.compute == ba.compute
+    assert ab.swapped != ba.swapped
+    assert normalize(_pair(BIRTH, OTHER)).compute != normalize(_pair(OTHER, BIRTH)).compute
+
+
+def test_relabel_substitutes_derived_strings_and_shares_untouched_parts():
+    untouched = ["Sun", 1.0]
+    obj = {"owner": f"{token('name')} Solar Return", "points": untouched}
+    result = relabel(obj, {"name": "Ada"})
+    assert result == {"owner": "Ada Solar Return", "points": ["Sun", 1.0]}
+    assert result["points"] is untouched
+    assert obj["owner"] != result["owner"]
+
+
+def test_labels_do_not_change_the_computation():
+    chart_data_cache.clear()
+    first = json.loads(build_chart("solar_return", {**BIRTH, "return_year": 2024}, svg=False))
+    relabelled = {**BIRTH, "name": "Augusta", "city": "Marylebone", "nation": "GB", "lng": -0.12780004}
+    second = json.loads(build_chart("solar_return", {**relabelled, "return_year": 2024}, svg=False))
+
+    assert chart_data_cache.info()["items"] == 1
+    assert second["natal"]["name"] == "Augusta"
+    assert second["natal"]["city"] == "Marylebone"
+    assert second["solar_return"]["name"] == "Augusta Solar Return"
+    assert {a["p1_owner"] for a in second["aspects"]} == {"Augusta"}
+    assert second["solar_return"]["sun"] == first["solar_return"]["sun"]
+
+
+def test_composite_order_is_canonical_but_output_keeps_request_order():
+    chart_data_cache.clear()
+    ab = json.loads(build_chart("composite", _pair(BIRTH, OTHER), svg=False))
+    ba = json.loads(build_chart("composite", _pair(OTHER, BIRTH), svg=False))
+
+    assert chart_data_cache.info()["items"] == 1
+    assert ab["composite_subject"]["name"] == "Ada Lovelace and Charles Babbage Composite Chart"
+    assert ba["composite_subject"]["name"] == "Charles Babbage and Ada Lovelace Composite Chart"
+    assert ab["composite_subject"]["first_subject"]["name"] == "Ada Lovelace"
+    assert ba["composite_subject"]["first_subject"]["name"] == "Charles Babbage"
+    assert ba["composite_subject"]["first_subject"]["year"] == 1791
+    assert ab["composite_subject"]["sun"] == ba["composite_subject"]["sun"]
+
+    svg = build_chart("composite", _pair(OTHER, BIRTH), svg=True)
+    assert "Charles Babbage" in svg and "\ue000" not in svg
+    assert compute_chart("composite", _pair(OTHER, BIRTH)).chart_data.subject.first_subject.name == "Charles Babbage"
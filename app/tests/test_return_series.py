@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import return_series
+from chart_builders import build_chart
+from compute_pool import ComputeError
+from return_series import (
+    build_lunar_chunk,
+    build_solar_chunk,
+    check_year_range,
+    chunk_seeds,
+    lunar_range,
+    lunar_seeds,
+    render_lunar_calendar,
+    render_solar_series,
+    solar_seeds,
+)
+
+NATAL = {
+    "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+    "hour": 6, "minute": 0, "city": "London", "nation": " ",
+    "lng": -0.1278, "lat": 51.5074, "tz_str": "Europe/London",
+}
+
+
+def _series(params: dict, parts: int = 1) -> dict:
+    chunks = [build_solar_chunk(params, chunk) for chunk in chunk_seeds(solar_seeds(params), parts)]
+    return json.loads(render_solar_series(params, chunks))
+
+
+def test_series_matches_single_year_returns():
+    params = {**NATAL, "start_year": 2024, "end_year": 2026}
+    series = _series(params)
+    assert [entry["year"] for entry in series["returns"]] == [2024, 2025, 2026]
+    for entry in series["returns"]:
+        single = json.loads(build_chart("solar_return", {**NATAL, "return_year": entry["year"]}, svg=False))
+        assert entry["julian_day"] == pytest.approx(single["solar_return"]["julian_day"])
+        assert entry["points"]["Sun"]["abs_pos"] == pytest.approx(single["natal"]["sun"]["abs_pos"], abs=1e-4)
+
+
+def test_chunks_merge_to_the_same_series(monkeypatch):
+    monkeypatch.setattr(return_series, "CHUNK_YEARS", 2)
+    params = {**NATAL, "start_year": 2020, "end_year": 2026}
+    assert len(chunk_seeds(solar_seeds(params), 3)) == 3
+    assert _series(params, parts=3) == _series(params)
+
+
+def test_new_year_birthday_never_repeats_a_return():
+    params = {**NATAL, "month": 12, "day": 31, "hour": 23, "minute": 50, "start_year": 2000, "end_year": 2011}
+    moments = [entry["moment"] for entry in _series(params)["returns"]]
+    assert len(set(moments)) == len(moments) == 12
+    assert moments == sorted(moments)
+
+
+def test_check_year_range():
+    check_year_range({"start_year": 2024, "end_year": 2024})
+    for start, end in [(2025, 2024), (1900, 1900 + return_series.MAX_SERIES_YEARS)]:
+        with pytest.raises(ComputeError) as exc:
+            check_year_range({"start_year": start, "end_year": end})
+        assert exc.value.status_code == 400
+
+
+def test_lunar_calendar_finds_every_return_in_the_range():
+    params = {**NATAL, "start": "2024-01-01", "end": "2024-12-31"}
+    natal, seeds = lunar_seeds(params)
+    chunks = [build_lunar_chunk(params, chunk, aspects=True) for chunk in chunk_seeds(seeds, 2, 5)]
+    calendar = json.loads(render_lunar_calendar(params, natal, chunks))
+
+    moments = [entry["moment"] for entry in calendar["returns"]]
+    assert len(moments) == 13
+    assert moments == sorted(moments) and "2024-01-01" < moments[0] and moments[-1] < "2024-12-31"
+    for entry in calendar["returns"]:
+        assert entry["points"]["Moon"]["abs_pos"] == pytest.approx(natal["points"]["Moon"]["abs_pos"], abs=1e-3)
+        assert entry["aspects"] and {"natal_point", "return_point", "aspect", "orb"} == set(entry["aspects"][0])
+
+    first = calendar["returns"][0]["moment"]
+    search = {"return_year": 2024, "return_month": 1, "return_day": 1}
+    single = json.loads(build_chart("lunar_return", {**NATAL, **search}, svg=False))
+    assert single["lunar_return"]["iso_formatted_utc_datetime"] == first
+
+
+def test_lunar_range():
+    assert lunar_range({"start": "2024-01-01", "end": "2024-01-01"})[0] == pytest.approx(2460310.5)
+    for start, end in [("2024-02-01", "2024-01-01"), ("2024-01-01", "soon"), ("1900-01-01", "2100-01-01")]:
+        with pytest.raises(ComputeError) as exc:
+            lunar_range({"start": start, "end": end})
+        assert exc.value.status_code == 400
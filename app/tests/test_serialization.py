@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+import serialization
+from serialization import dumps
+
+DATA = {"name": "Ada Lovelace", "sun": {"abs_pos": 257.68, "sign": "Sag"}, "aspects": [1, 2.5, None, True], "glyph": "☉"}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson not installed")
+    return request.param
+
+
+def test_compact_by_default(encoder):
+    body = dumps(DATA)
+    assert isinstance(body, bytes)
+    assert b"\n" not in body and b": " not in body
+    assert "☉".encode() in body
+    assert json.loads(body) == DATA
+
+
+def test_pretty_is_indented(encoder):
+    body = dumps(DATA, pretty=True)
+    assert body.startswith(b'{\n  "name": "Ada Lovelace"')
+    assert json.loads(body) == DATA
+
+
+def test_encoders_agree():
+    if serialization.orjson is None:
+        pytest.skip("orjson not installed")
+    assert dumps(DATA) == json.dumps(DATA, separators=(",", ":"), ensure_ascii=False).encode()
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "chart"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == ["chart"] * 10
+    assert calls == 1
+    assert flight.info()["leaders"] == 1
+    assert flight.info()["coalesced"] == 9
+    assert flight.info()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.info()["errors"] == 1
+
+
+def test_followers_time_out_but_leader_completes():
+    flight = SingleFlight(timeout=0.01)
+
+    async def compute():
+        await asyncio.sleep(0.1)
+        return "chart"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do("key", compute)
+        return await leader
+
+    assert asyncio.run(scenario()) == "chart"
+    assert flight.info()["timeouts"] == 1
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "chart"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "chart"
+    assert calls == 1
+    assert flight.info()["in_flight"] == 0
@@ -0,0 +1,40 @@
+import os
+
+from themes import ThemeRegistry
+
+
+def test_registry_loads_all_css_files(tmp_path):
+    (tmp_path / "astral.css").write_text(":root { --a: 1; }", encoding="utf-8")
+    (tmp_path / "dark.css").write_text(":root { --a: 2; }", encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("ignored", encoding="utf-8")
+
+    registry = ThemeRegistry(str(tmp_path))
+    assert registry.names() == ["astral", "dark"]
+    assert registry.get("dark").css == ":root { --a: 2; }"
+    assert registry.get("missing") is None
+
+
+def test_registry_reloads_only_changed_files(tmp_path):
+    path = tmp_path / "astral.css"
+    path.write_text(":root { --a: 1; }", encoding="utf-8")
+    registry = ThemeRegistry(str(tmp_path), check_interval=0)
+    first = registry.get("astral")
+
+    assert registry.get("astral") is first
+
+    path.write_text(":root { --a: 3; }", encoding="utf-8")
+    os.utime(path, (first.mtime + 10, first.mtime + 10))
+    reloaded = registry.get("astral")
+    assert reloaded.css == ":root { --a: 3; }"
+    assert reloaded.digest != first.digest
+
+
+def test_bundled_theme_is_injected_into_existing_style_block():
+    from chart_helpers import embed_css_in_svg
+
+    svg = "<svg><style>.x{}</style><g/></svg>"
+    themed = embed_css_in_svg(svg)
+    assert themed.startswith("<svg><style>.x{}\n")
+    assert "--kerykeion-color-primary" in themed
+    assert themed.endswith("\n</style><g/></svg>")
+    assert embed_css_in_svg(svg, theme="missing") == svg
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import transit_timeline
+from compute_pool import ComputeError
+from transit_timeline import build_transit_timeline, find_aspect_intervals, sample_times
+
+NATAL = {
+    "name": "Ada Lovelace", "year": 1815, "month": 12, "day": 10,
+    "hour": 6, "minute": 0, "city": "London", "nation": " ",
+    "lng": -0.1278, "lat": 51.5074, "tz_str": "Europe/London",
+}
+
+
+def test_find_aspect_intervals_linear_motion():
+    # One body moving 1 degree per day past a natal point at 10 degrees.
+    jds = np.arange(0.0, 30.0, 1.0)
+    transit = (jds * 1.0)[None, :]
+    intervals = find_aspect_intervals(jds, transit, np.array([10.0]), np.array([0.0]), np.array([2.5]))
+
+    assert len(intervals) == 1
+    k, t, p, entry, exact, exit_, min_orb = intervals[0]
+    assert (k, t, p) == (0, 0, 0)
+    assert entry == pytest.approx(7.5)
+    assert exact == pytest.approx(10.0)
+    assert exit_ == pytest.approx(12.5)
+    assert min_orb == pytest.approx(0.0)
+
+
+def test_find_aspect_intervals_opposition_across_wrap():
+    # Perfecting an opposition where the signed separation flips from +180 to -180.
+    jds = np.arange(0.0, 10.0, 1.0)
+    transit = (188.0 + jds * 1.0)[None, :] % 360.0
+    intervals = find_aspect_intervals(jds, transit, np.array([10.0]), np.array([180.0]), np.array([3.0]))
+
+    (_, _, _, entry, exact, exit_, _), = intervals
+    assert entry is None  # already in orb at the start of the range
+    assert exact == pytest.approx(2.0)
+    assert exit_ == pytest.approx(5.0)
+
+
+def test_find_aspect_intervals_station_without_exact():
+    # Approaches to within 1 degree, turns back and never perfects.
+    jds = np.arange(0.0, 21.0, 1.0)
+    transit = (9.0 - np.abs(jds - 10.0) * 0.5)[None, :]
+    (interval,) = find_aspect_intervals(jds, transit, np.array([10.0]), np.array([0.0]), np.array([3.0]))
+
+    assert interval[4] is None
+    assert interval[6] == pytest.approx(1.0)
+
+
+def test_sample_times_rejects_bad_ranges(monkeypatch):
+    with pytest.raises(ComputeError) as exc:
+        sample_times({"start": "2024-02-01", "end": "2024-01-01", "step_hours": 24})
+    assert exc.value.status_code == 400
+
+    monkeypatch.setattr(transit_timeline, "MAX_CELLS", 720 * 100)
+    with pytest.raises(ComputeError) as exc:
+        sample_times({"start": "2024-01-01", "end": "2025-01-01", "step_hours": 1})
+    assert exc.value.status_code == 400
+
+    # Without an explicit step, a long range gets a coarser one that fits instead.
+    jds, step_hours = sample_times({"start": "2024-01-01", "end": "2025-01-01", "step_hours": None})
+    assert len(jds) <= 100
+    assert step_hours > transit_timeline.default_step_hours({})
+
+
+def test_default_step_catches_short_moon_windows():
+    step = transit_timeline.default_step_hours({})
+    # The Moon is within a 1 degree quintile orb for about three hours.
+    assert step == 1.5
+    assert transit_timeline.sampling_warnings({}, step) == []
+    assert transit_timeline.default_step_hours({"max_orb": 0.5}) == 0.75
+
+    warnings = transit_timeline.sampling_warnings({}, 24.0)
+    assert [w.split()[6] for w in warnings] == ["Moon", "Mercury"]
+    assert "quintile" in warnings[0]
+
+
+def test_build_transit_timeline_finds_solar_return():
+    import json
+
+    params = {**NATAL, "start": "2024-11-01", "end": "2025-01-31", "step_hours": 24, "max_orb": None, "output": "events"}
+    data = json.loads(build_transit_timeline(params))
+    assert data["warnings"] and "Moon" in data["warnings"][0]
+
+    (sun,) = [e for e in data["events"] if (e["transit"], e["natal_point"], e["aspect"]) == ("Sun", "Sun", "conjunction")]
+    # Same instant as PlanetaryReturnFactory's 2024 solar return (2024-12-08T23:24 UTC).
+    assert sun["exact"] == "2024-12-08T23:24+00:00"
+    assert sun["entry"] < sun["exact"] < sun["exit"]
+
+    columnar = json.loads(build_transit_timeline({**params, "output": "columnar"}))
+    assert len(columnar["events"]["transit"]) == len(data["events"])
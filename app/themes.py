@@ -0,0 +1,92 @@
+"""Registry of CSS themes injected into generated SVGs."""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+THEMES_DIR = os.getenv("THEMES_DIR", "./themes")
+DEFAULT_THEME = "astral"
+
+
+@dataclass(frozen=True)
+class Theme:
+    name: str
+    css: str
+    digest: str
+    mtime: float
+
+    @property
+    def style_block(self) -> str:
+        """CSS ready to splice in front of an existing ``</style>``."""
+        return f"\n{self.css}\n"
+
+    @property
+    def style_tag(self) -> str:
+        """Standalone ``<style>`` element for SVGs that have none."""
+        return f'\n<style type="text/css">\n<![CDATA[\n{self.css}\n]]>\n</style>\n'
+
+
+class ThemeRegistry:
+    """All ``*.css`` files under a directory, loaded once and kept in memory.
+
+    The directory is re-checked at most every ``check_interval`` seconds and
+    only files whose mtime changed are re-read, so lookups are normally a
+    dict access.
+    """
+
+    def __init__(self, themes_dir: str = THEMES_DIR, check_interval: float = 2.0):
+        self.themes_dir = Path(themes_dir)
+        self.check_interval = check_interval
+        self._themes: dict[str, Theme] = {}
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self.reload()
+
+    def get(self, name: str) -> Theme | None:
+        self._maybe_reload()
+        return self._themes.get(name)
+
+    def names(self) -> list[str]:
+        self._maybe_reload()
+        return sorted(self._themes)
+
+    def reload(self) -> None:
+        """Re-scan the directory, re-reading only new or modified files."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            themes: dict[str, Theme] = {}
+            try:
+                paths = sorted(self.themes_dir.glob("*.css"))
+            except OSError:
+                paths = []
+            for path in paths:
+                try:
+                    mtime = path.stat().st_mtime
+                    current = self._themes.get(path.stem)
+                    if current is not None and current.mtime == mtime:
+                        themes[path.stem] = current
+                        continue
+                    css = path.read_text(encoding="utf-8")
+                except OSError:
+                    continue
+                themes[path.stem] = Theme(
+                    name=path.stem,
+                    css=css,
+                    digest=hashlib.sha256(css.encode("utf-8")).hexdigest()[:16],
+                    mtime=mtime,
+                )
+                logger.info("Loaded theme %r from %s", path.stem, path)
+            self._themes = themes
+
+    def _maybe_reload(self) -> None:
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.reload()
+
+
+theme_registry = ThemeRegistry()
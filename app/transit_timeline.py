@@ -0,0 +1,280 @@
+"""Transit timelines: aspect hit intervals between the moving sky and a natal chart.
+
+Instead of building one full transit subject per sample, the transiting
+longitudes for the whole range are sampled into NumPy arrays in one pass and
+scanned one (transiting body, aspect) row at a time against every natal
+point, so scratch memory stays at a few arrays of ``natal points x samples``.
+The natal subject is computed a single time, and the longitudes come from
+the precomputed ephemeris table when one covers the range.
+
+The size of a request is bounded by the cells it scans (aspects x bodies x
+natal points x samples), ``TIMELINE_MAX_CELLS``.  Without an explicit step,
+the sampling step is derived from the fastest body and the narrowest orb so
+no aspect window falls between two samples; a coarser step gets a warning
+naming the bodies whose short windows it can miss.
+"""
+
+import math
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from kerykeion.settings.config_constants import DEFAULT_ACTIVE_ASPECTS
+
+from chart_helpers import create_subject
+from compute_pool import ComputeError
+from ephemeris_table import BODIES, longitudes
+from serialization import dumps
+
+# About 70k samples (eight years at one hour, 190 at one day) for 10 bodies x 12 points x 6 aspects.
+MAX_CELLS = int(os.getenv("TIMELINE_MAX_CELLS", "50000000"))
+
+TRANSIT_BODIES = BODIES
+
+# Fastest geocentric motion of each body, degrees per day.
+MAX_SPEEDS = {
+    "Sun": 1.02, "Moon": 15.4, "Mercury": 2.2, "Venus": 1.26, "Mars": 0.8,
+    "Jupiter": 0.25, "Saturn": 0.13, "Uranus": 0.07, "Neptune": 0.04, "Pluto": 0.04,
+}
+
+# Natal point name -> attribute on the kerykeion subject.
+NATAL_POINTS = {
+    **{name: name.lower() for name in TRANSIT_BODIES},
+    "Ascendant": "ascendant",
+    "Medium_Coeli": "medium_coeli",
+}
+
+ASPECT_ANGLES = {
+    "conjunction": 0.0,
+    "opposition": 180.0,
+    "trine": 120.0,
+    "square": 90.0,
+    "sextile": 60.0,
+    "quintile": 72.0,
+}
+
+DEFAULT_ORBS = {a["name"]: float(a["orb"]) for a in DEFAULT_ACTIVE_ASPECTS if a["name"] in ASPECT_ANGLES}
+
+_UNIX_EPOCH_JD = 2440587.5
+
+
+def julian_day(moment: datetime) -> float:
+    """UT Julian day of an aware or naive-UTC datetime."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return _UNIX_EPOCH_JD + (moment - datetime(1970, 1, 1)).total_seconds() / 86400.0
+
+
+def iso_from_jd(jd: float) -> str:
+    moment = datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(days=jd - _UNIX_EPOCH_JD)
+    return moment.isoformat(timespec="minutes")
+
+
+def _cells_per_sample() -> int:
+    return len(ASPECT_ANGLES) * len(TRANSIT_BODIES) * len(NATAL_POINTS)
+
+
+def _orbs(p: dict) -> dict[str, float]:
+    orbs = {a: DEFAULT_ORBS.get(a, 1.0) for a in ASPECT_ANGLES}
+    if p.get("max_orb") is not None:
+        orbs = {a: min(orb, p["max_orb"]) for a, orb in orbs.items()}
+    return orbs
+
+
+def _window_hours(body: str, orb: float) -> float:
+    """Shortest time *body* spends within *orb* of an exact aspect."""
+    return 2 * orb / MAX_SPEEDS[body] * 24.0
+
+
+def _step_for(window_hours: float) -> float:
+    """Largest quarter-hour step that puts two samples in a window of *window_hours*."""
+    return max(0.25, math.floor(window_hours / 2 * 4) / 4)
+
+
+def default_step_hours(p: dict) -> float:
+    """Step that puts two samples in the shortest aspect window of any body."""
+    return _step_for(min(_window_hours(body, min(_orbs(p).values())) for body in TRANSIT_BODIES))
+
+
+def sampling_warnings(p: dict, step_hours: float) -> list[str]:
+    """Bodies whose narrowest aspect window is shorter than *step_hours*, so hits can be missed."""
+    aspect, orb = min(_orbs(p).items(), key=lambda item: item[1])
+    return [
+        f"A {step_hours:g} h step can miss {body} aspects: a {aspect} is within orb for as little "
+        f"as {_window_hours(body, orb):.1f} h; use step_hours <= {_step_for(_window_hours(body, orb)):g}"
+        for body in TRANSIT_BODIES
+        if _window_hours(body, orb) < step_hours
+    ]
+
+
+def sample_times(p: dict) -> tuple[np.ndarray, float]:
+    """Julian days sampled from ``p["start"]`` to ``p["end"]``, and the step in hours.
+
+    The step is ``p["step_hours"]``, or :func:`default_step_hours` when it
+    is None, widened to fit ``MAX_CELLS`` if the range is too long for it.
+    Raises a 400 for an unparseable or empty range, or an explicit step
+    that would scan more than ``MAX_CELLS`` cells.
+    """
+    try:
+        start_jd = julian_day(datetime.fromisoformat(p["start"]))
+        end_jd = julian_day(datetime.fromisoformat(p["end"]))
+    except ValueError as e:
+        raise ComputeError(400, f"Invalid date: {e}")
+    step_hours = p.get("step_hours")
+    if (step_hours is not None and step_hours <= 0) or end_jd < start_jd:
+        raise ComputeError(400, "Expected start <= end and a positive step")
+    max_samples = max(2, MAX_CELLS // _cells_per_sample())
+    if step_hours is None:
+        step_hours = default_step_hours(p)
+        if (end_jd - start_jd) * 24.0 / step_hours + 1 > max_samples:
+            step_hours = math.ceil((end_jd - start_jd) * 24.0 / (max_samples - 1) * 4) / 4
+    step = step_hours / 24.0
+    samples = int((end_jd - start_jd) / step) + 1
+    if samples > max_samples:
+        raise ComputeError(
+            400, f"Range needs {samples} samples (max {max_samples} for TIMELINE_MAX_CELLS); use a larger step"
+        )
+    return start_jd + step * np.arange(samples), step_hours
+
+
+def _crossing(jds: np.ndarray, values: np.ndarray, i: int, level: float) -> float:
+    """Linear interpolation of when *values* crosses *level* between samples i-1 and i."""
+    a, b = values[i - 1], values[i]
+    if a == b:
+        return float(jds[i])
+    frac = (a - level) / (a - b)
+    return float(jds[i - 1] + frac * (jds[i] - jds[i - 1]))
+
+
+def _aspect_distance(diff: np.ndarray, angle: float) -> tuple[np.ndarray, np.ndarray]:
+    """Signed and absolute distance of the separations *diff* from an exact *angle* aspect.
+
+    The signed distance changes sign exactly when the aspect perfects: at a
+    separation of 0 for a conjunction, across +/-180 for an opposition and
+    at +/-angle otherwise.  Orbs are narrower than the angle (and than
+    180 - angle), so it never changes sign elsewhere inside an orb.
+    """
+    if angle == 0.0:
+        signed = diff
+    elif angle == 180.0:
+        signed = np.abs(diff)
+        np.subtract(180.0, signed, out=signed)
+        np.copysign(signed, diff, out=signed)
+    else:
+        signed = np.abs(diff)
+        signed -= angle
+    return signed, np.abs(signed)
+
+
+def _interval(jds: np.ndarray, signed: np.ndarray, dev: np.ndarray, s: int, e: int, orb: float) -> tuple:
+    """``(entry, exact, exit, min_orb)`` of the in-orb run ``[s, e)`` of one row."""
+    n = len(jds)
+    entry = _crossing(jds, dev, s, orb) if s > 0 else None
+    exit_ = _crossing(jds, dev, e, orb) if e < n else None
+    lo = max(s, 1) - 1
+    # Perfection between samples i and i+1: the signed distance hits zero or changes sign.
+    segment = signed[lo:e]
+    hits = np.flatnonzero((segment[:-1] == 0) | (np.signbit(segment[:-1]) != np.signbit(segment[1:])))
+    exact = _crossing(jds, signed, lo + int(hits[0]) + 1, 0.0) if hits.size else None
+    return entry, exact, exit_, float(dev[s:e].min())
+
+
+def find_aspect_intervals(
+    jds: np.ndarray,
+    transit_lons: np.ndarray,
+    natal_lons: np.ndarray,
+    angles: np.ndarray,
+    orbs: np.ndarray,
+) -> list[tuple]:
+    """Find every interval where a transiting body is within orb of an aspect to a natal point.
+
+    Arrays: ``transit_lons`` is ``(T, N)``, ``natal_lons`` is ``(P,)``,
+    ``angles``/``orbs`` are ``(K,)``.  Returns tuples
+    ``(k, t, p, entry_jd, exact_jd, exit_jd, min_orb)`` where entry/exit are
+    None when the interval is already open at the start or still open at the
+    end of the range, and exact is None when the aspect comes within orb but
+    never perfects (e.g. around a station).
+
+    Rows are scanned one transiting body and aspect at a time, so the
+    scratch arrays are ``(P, N)``.
+    """
+    n = len(jds)
+    intervals = []
+    for t, row_lons in enumerate(transit_lons):
+        # (P, N) signed separation in [-180, 180)
+        diff = row_lons[None, :] - natal_lons[:, None]
+        diff += 180.0
+        np.mod(diff, 360.0, out=diff)
+        diff -= 180.0
+        for k, (angle, orb) in enumerate(zip(angles, orbs)):
+            signed, dev = _aspect_distance(diff, angle)
+            padded = np.zeros((dev.shape[0], n + 2), dtype=np.int8)
+            np.less_equal(dev, orb, out=padded[:, 1:-1].view(bool))
+            edges = np.diff(padded, axis=-1)
+            starts = np.argwhere(edges == 1)
+            ends = np.argwhere(edges == -1)
+            del padded, edges
+            for (p, s), (_, e) in zip(starts, ends):
+                intervals.append((k, t, int(p), *_interval(jds, signed[p], dev[p], int(s), int(e), orb)))
+    intervals.sort(key=lambda r: (r[3] if r[3] is not None else jds[0], r[1], r[2], r[0]))
+    return intervals
+
+
+def build_transit_timeline(p: dict, pretty: bool = False) -> bytes:
+    """Compute the timeline for *p* and return it as JSON bytes.
+
+    *p* holds the natal fields of ``/gen/birth`` plus ``start``/``end``
+    (ISO dates, UTC), ``step_hours``, optional ``max_orb``, ``output``
+    (``"events"`` or ``"columnar"``) and ``precise`` (skip the ephemeris
+    table and call Swiss Ephemeris for every sample).
+    """
+    natal = create_subject(
+        p["name"], p["year"], p["month"], p["day"], p["hour"], p["minute"],
+        p["city"], p["nation"], p["lng"], p["lat"], p["tz_str"],
+    )
+
+    jds, step_hours = sample_times(p)
+
+    bodies = list(TRANSIT_BODIES)
+    points = list(NATAL_POINTS)
+    aspects = list(ASPECT_ANGLES)
+    natal_lons = np.array([getattr(natal, NATAL_POINTS[name]).abs_pos for name in points])
+    angles = np.array([ASPECT_ANGLES[a] for a in aspects])
+    orbs = np.array([_orbs(p)[a] for a in aspects])
+
+    transit_lons = longitudes(jds, bodies, precise=p.get("precise", False))
+    intervals = find_aspect_intervals(jds, transit_lons, natal_lons, angles, orbs)
+
+    meta = {
+        "natal": {name: round(float(lon), 6) for name, lon in zip(points, natal_lons)},
+        "range": {"start": iso_from_jd(jds[0]), "end": iso_from_jd(jds[-1]), "step_hours": step_hours, "samples": len(jds)},
+        "orbs": dict(zip(aspects, orbs.tolist())),
+        "warnings": sampling_warnings(p, step_hours),
+    }
+
+    if p.get("output") == "columnar":
+        columns = list(zip(*intervals)) if intervals else [()] * 7
+        meta["events"] = {
+            "transit": [bodies[t] for t in columns[1]],
+            "natal_point": [points[i] for i in columns[2]],
+            "aspect": [aspects[k] for k in columns[0]],
+            "entry_jd": list(columns[3]),
+            "exact_jd": list(columns[4]),
+            "exit_jd": list(columns[5]),
+            "min_orb": [round(o, 4) for o in columns[6]],
+        }
+        return dumps(meta, pretty=pretty)
+
+    meta["events"] = [
+        {
+            "transit": bodies[t],
+            "natal_point": points[i],
+            "aspect": aspects[k],
+            "entry": iso_from_jd(entry) if entry is not None else None,
+            "exact": iso_from_jd(exact) if exact is not None else None,
+            "exit": iso_from_jd(exit_) if exit_ is not None else None,
+            "min_orb": round(min_orb, 4),
+        }
+        for k, t, i, entry, exact, exit_, min_orb in intervals
+    ]
+    return dumps(meta, pretty=pretty)